@@ -0,0 +1,217 @@
+import hashlib
+import math
+from datetime import datetime, time, timedelta
+
+import frappe
+from frappe.utils import get_datetime
+
+from kk_new_app.api.workstation_timeline import get_workstation_timeline
+
+# Bitmaps are compiled in fixed, aligned horizons so every worker caches the same blocks
+HORIZON_DAYS = 14
+HORIZON_EPOCH = datetime(2000, 1, 3)
+HORIZON_MINUTES = HORIZON_DAYS * 24 * 60
+
+# How far ahead a slot search may compile before giving up (about a year)
+MAX_HORIZONS = 26
+
+WORKING_CALENDAR_KEY = "kk_working_calendar"
+HOLIDAY_VERSION_KEY = "kk_holiday_version"
+WORKING_MASK_KEY = "kk_working_mask"
+WORKING_MASK_TTL = 24 * 60 * 60
+
+FREE = b"\x01"
+CLOSED = b"\x00"
+
+class AvailabilityMap:
+    """Minute-granularity free/closed bytes of one resource, compiled horizon by horizon
+
+    ``compile_horizon(horizon_start)`` returns the bytes of one horizon: working time
+    minus bookings. Slot searches are a single ``bytearray.find`` for a run of free
+    minutes, so shifts and holidays cost nothing extra at query time.
+    """
+
+    def __init__(self, start, compile_horizon):
+        self.start = start
+        self.bits = bytearray()
+        self.compile_horizon = compile_horizon
+        # In-memory bookings, re-applied to horizons compiled after they were made
+        self.reserved = []
+
+    @property
+    def end(self):
+        return self.start + timedelta(minutes=len(self.bits))
+
+    def _index(self, moment, round_up=False):
+        minutes = (moment - self.start).total_seconds() / 60
+        return max(0, math.ceil(minutes) if round_up else math.floor(minutes))
+
+    def _grow(self):
+        horizon_start = self.end
+        bits = bytearray(self.compile_horizon(horizon_start))
+        offset = len(self.bits)
+        self.bits += bits
+        for start, end in self.reserved:
+            if start < self.end and end > horizon_start:
+                self._close(max(start, horizon_start), end, offset)
+
+    def _close(self, start, end, minimum=0):
+        # Partly booked minutes count as booked
+        first = max(self._index(start), minimum)
+        last = min(self._index(end, round_up=True), len(self.bits))
+        if last > first:
+            self.bits[first:last] = CLOSED * (last - first)
+
+    def first_free_slot(self, not_before, duration_mins, max_horizons=MAX_HORIZONS):
+        """Earliest start >= not_before with ``duration_mins`` contiguous free minutes, or None"""
+        minutes = max(1, math.ceil(duration_mins))
+        needle = FREE * minutes
+        offset = self._index(get_datetime(not_before), round_up=True)
+
+        horizons = 0
+        while len(self.bits) < offset + minutes:
+            self._grow()
+            horizons += 1
+
+        while True:
+            index = self.bits.find(needle, offset)
+            if index >= 0:
+                return self.start + timedelta(minutes=index)
+            if horizons >= max_horizons:
+                return None
+            # A run may start in the tail of what is compiled and continue in the next horizon
+            offset = max(offset, len(self.bits) - minutes + 1)
+            self._grow()
+            horizons += 1
+
+    def last_free_slot(self, latest_end, duration_mins, not_before=None):
+        """Latest start whose ``duration_mins`` contiguous free minutes end by latest_end, or None"""
+        minutes = max(1, math.ceil(duration_mins))
+        first = self._index(get_datetime(not_before), round_up=True) if not_before else 0
+        last = self._index(get_datetime(latest_end))
+
+        while len(self.bits) < last:
+            self._grow()
+
+        index = self.bits.rfind(FREE * minutes, first, last)
+        return self.start + timedelta(minutes=index) if index >= 0 else None
+
+    def reserve(self, start, end):
+        """Book [start, end) in memory, e.g. while placing several operations in one pass"""
+        self.reserved.append((start, end))
+        self._close(start, end)
+
+def get_horizon_start(moment):
+    """Start of the aligned horizon that contains ``moment``"""
+    days = (get_datetime(moment) - HORIZON_EPOCH).days
+    return HORIZON_EPOCH + timedelta(days=days - days % HORIZON_DAYS)
+
+def get_workstation_availability(workstation, not_before, timeline=None):
+    """Availability of a workstation: its working hours and holidays minus its Job Cards
+
+    Pass ``timeline`` to use a fresh, privately loaded timeline (e.g. one that leaves
+    out the cards being rescheduled) instead of the shared cached one.
+    """
+    timeline = timeline or get_workstation_timeline(workstation)
+    working_hours, holiday_list = get_working_calendar(workstation)
+    return get_availability(timeline, not_before, working_hours, holiday_list)
+
+def get_availability(timeline, not_before, working_hours=(), holiday_list=None):
+    """AvailabilityMap over a WorkstationTimeline's bookings and a working calendar"""
+    def compile_horizon(horizon_start):
+        bits = bytearray(get_working_mask(working_hours, holiday_list, horizon_start))
+        horizon_end = horizon_start + timedelta(minutes=HORIZON_MINUTES)
+        for start, end, *_ in timeline.overlaps(horizon_start, horizon_end):
+            first = max(0, math.floor((start - horizon_start).total_seconds() / 60))
+            last = min(HORIZON_MINUTES, math.ceil((end - horizon_start).total_seconds() / 60))
+            if last > first:
+                bits[first:last] = CLOSED * (last - first)
+        return bits
+
+    return AvailabilityMap(get_horizon_start(not_before), compile_horizon)
+
+def get_working_calendar(workstation):
+    """(working hours as (start, end) timedeltas, holiday list) of a workstation, cached"""
+    def load():
+        working_hours = frappe.get_all("Workstation Working Hour",
+            filters={"parent": workstation, "parenttype": "Workstation"},
+            fields=["start_time", "end_time"], order_by="idx asc", as_list=True)
+        holiday_list = frappe.db.get_value("Workstation", workstation, "holiday_list")
+        shifts = [(to_timedelta(start), to_timedelta(end)) for start, end in working_hours
+            if start is not None and end is not None]
+        return shifts, holiday_list or get_company_holiday_list()
+
+    return frappe.cache.hget(WORKING_CALENDAR_KEY, workstation, generator=load)
+
+def get_company_holiday_list(company=None):
+    company = company or frappe.defaults.get_user_default("Company")
+    return frappe.get_cached_value("Company", company, "default_holiday_list") if company else None
+
+def get_working_mask(working_hours, holiday_list, horizon_start):
+    """Working-time bytes of one horizon for a calendar, shared through Redis"""
+    calendar_hash = hashlib.md5(repr((working_hours, holiday_list)).encode()).hexdigest()[:12]
+    cache_key = f"{WORKING_MASK_KEY}::{calendar_hash}::{get_holiday_version()}::{horizon_start:%Y%m%d}"
+
+    mask = frappe.cache.get_value(cache_key)
+    if mask is None:
+        holidays = get_holidays(holiday_list, horizon_start)
+        mask = bytes(compile_working_mask(working_hours, holidays, horizon_start))
+        frappe.cache.set_value(cache_key, mask, expires_in_sec=WORKING_MASK_TTL)
+    return mask
+
+def compile_working_mask(working_hours, holidays, horizon_start):
+    """Free minutes of a horizon: the working hours of every non-holiday day (24h if none)"""
+    bits = bytearray(HORIZON_MINUTES)
+    shifts = working_hours or [(timedelta(0), timedelta(days=1))]
+
+    # Start a day early so an overnight shift carries into the first day
+    for day_offset in range(-1, HORIZON_DAYS):
+        day_start = horizon_start + timedelta(days=day_offset)
+        if day_start.date() in holidays:
+            continue
+        for shift_start, shift_end in shifts:
+            if shift_end <= shift_start:
+                shift_end += timedelta(days=1)
+            first = max(0, int((day_start + shift_start - horizon_start).total_seconds() // 60))
+            last = min(HORIZON_MINUTES, int((day_start + shift_end - horizon_start).total_seconds() // 60))
+            if last > first:
+                bits[first:last] = FREE * (last - first)
+    return bits
+
+def get_holidays(holiday_list, horizon_start):
+    if not holiday_list:
+        return set()
+    return set(frappe.get_all("Holiday",
+        filters={
+            "parent": holiday_list,
+            "parenttype": "Holiday List",
+            # A day early for the overnight shift carried into the horizon
+            "holiday_date": ["between", [(horizon_start - timedelta(days=1)).date(),
+                (horizon_start + timedelta(days=HORIZON_DAYS)).date()]],
+        },
+        pluck="holiday_date"))
+
+def get_holiday_version():
+    version = frappe.cache.get_value(HOLIDAY_VERSION_KEY)
+    if not version:
+        version = frappe.generate_hash(length=12)
+        frappe.cache.set_value(HOLIDAY_VERSION_KEY, version)
+    return version
+
+def to_timedelta(value):
+    if isinstance(value, timedelta):
+        return value
+    if isinstance(value, time):
+        return timedelta(hours=value.hour, minutes=value.minute, seconds=value.second)
+    hours, minutes, *seconds = str(value).split(":")
+    return timedelta(hours=int(hours), minutes=int(minutes), seconds=float(seconds[0]) if seconds else 0)
+
+def invalidate_working_calendar(doc, method=None):
+    """Workstation doc event: its working hours or holiday list may have changed"""
+    frappe.cache.hdel(WORKING_CALENDAR_KEY, doc.name)
+
+def invalidate_holidays(doc, method=None):
+    """Holiday List / Company doc event: recompile every working mask on next use"""
+    frappe.cache.set_value(HOLIDAY_VERSION_KEY, frappe.generate_hash(length=12))
+    # Workstations without their own list inherit the company's
+    frappe.cache.delete_value(WORKING_CALENDAR_KEY)
@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+
+import frappe
+from frappe.utils import add_to_date, cint, get_datetime, getdate, now_datetime
+
+from kk_new_app.api.availability import get_availability, get_company_holiday_list
+from kk_new_app.api.instrumentation import instrumented
+from kk_new_app.api.schedule_snapshots import take_schedule_snapshot
+from kk_new_app.api.schedule_writer import bulk_update_schedule
+from kk_new_app.api.workstation_timeline import WorkstationTimeline
+
+BULK_SCHEDULE_EVENT = "kk_bulk_auto_schedule"
+
+# Sort keys for the order in which the backlog is placed into free gaps
+ORDERING_RULES = {
+    "delivery_date": lambda wo: (getdate(wo.expected_delivery_date) if wo.expected_delivery_date else date.max, wo.creation),
+    "creation": lambda wo: (wo.creation,),
+    "shortest_lead_time": lambda wo: (wo.lead_time or 60, wo.creation),
+}
+
+PROGRESS_EVERY = 100
+
+@frappe.whitelist()
+@instrumented
+def enqueue_bulk_auto_schedule(work_orders=None, filters=None, order_by="delivery_date", schedule_late=0):
+    """Queue a one-pass auto-schedule of many Work Orders as a background job"""
+    frappe.only_for(("Manufacturing Manager", "System Manager"))
+    if order_by not in ORDERING_RULES:
+        frappe.throw(f"Unknown ordering rule {order_by}. Use one of: {', '.join(ORDERING_RULES)}")
+
+    job = frappe.enqueue(
+        "kk_new_app.api.bulk_scheduler.bulk_auto_schedule_work_orders",
+        queue="long",
+        timeout=3600,
+        work_orders=frappe.parse_json(work_orders) if work_orders else None,
+        filters=frappe.parse_json(filters) if filters else None,
+        order_by=order_by,
+        schedule_late=cint(schedule_late),
+        user=frappe.session.user,
+    )
+    return {"job_id": job.id if job else None}
+
+def bulk_auto_schedule_work_orders(work_orders=None, filters=None, order_by="delivery_date",
+        schedule_late=0, user=None):
+    """Place every selected Work Order into the first free gap, in one pass over a gap index"""
+    candidates = get_backlog(work_orders, filters)
+    candidates.sort(key=ORDERING_RULES[order_by])
+
+    # Busy time is every already-scheduled Work Order outside the backlog
+    existing = frappe.get_all("Work Order",
+        filters={
+            "docstatus": ["<", 2],
+            "name": ["not in", [wo.name for wo in candidates] or [""]],
+            "planned_start_date": ["is", "set"],
+            "planned_end_date": ["is", "set"]
+        },
+        fields=["name", "planned_start_date", "planned_end_date"]
+    )
+    timeline = WorkstationTimeline(
+        (get_datetime(wo.planned_start_date), get_datetime(wo.planned_end_date), wo.name, None)
+        for wo in existing
+    )
+
+    # The company holiday list closes whole days; existing orders are the busy time
+    now = now_datetime()
+    availability = get_availability(timeline, now, holiday_list=get_company_holiday_list())
+    updates = []
+    missed = []
+    total = len(candidates)
+
+    for index, wo in enumerate(candidates, 1):
+        duration = timedelta(minutes=wo.lead_time or 60)
+        deadline = get_datetime(wo.expected_delivery_date) if wo.expected_delivery_date else add_to_date(now, days=7)
+
+        start = availability.first_free_slot(now, wo.lead_time or 60)
+        if not start:
+            # Longer than any working stretch: fall back to the first free time at all
+            start = timeline.first_free_slot(now, duration)
+        end = start + duration
+
+        if end > deadline:
+            missed.append({
+                "work_order": wo.name,
+                "planned_end": end,
+                "deadline": deadline,
+                "late_by_minutes": int((end - deadline).total_seconds() // 60),
+                "scheduled": bool(schedule_late)
+            })
+
+        if end <= deadline or schedule_late:
+            availability.reserve(start, end)
+            timeline.reserve(start, end, wo.name)
+            updates.append({"name": wo.name, "start": start, "end": end})
+
+        if user and (index % PROGRESS_EVERY == 0 or index == total):
+            # The event publish_progress sends, addressed to the requesting planner only
+            frappe.publish_realtime("progress", {
+                "percent": index * 100 / total,
+                "title": "Auto Scheduling Work Orders",
+                "description": f"Placed {index} of {total}",
+            }, user=user)
+
+    snapshot = take_schedule_snapshot("Work Order", updates, f"Auto schedule backlog by {order_by}")
+    bulk_update_schedule("Work Order", updates)
+    frappe.db.commit()
+
+    report = {
+        "total": total,
+        "scheduled": len(updates),
+        "snapshot": snapshot,
+        "deadline_misses": missed,
+        "order_by": order_by
+    }
+    if user:
+        frappe.publish_realtime(BULK_SCHEDULE_EVENT, report, user=user)
+    return report
+
+def get_backlog(work_orders=None, filters=None):
+    """Work Orders to schedule: an explicit list, a filter, or every unscheduled open one"""
+    if work_orders:
+        filters = {"name": ["in", work_orders]}
+    elif not filters:
+        filters = {"planned_end_date": ["is", "not set"]}
+
+    rows = frappe.get_all("Work Order",
+        filters=filters,
+        fields=["name", "docstatus", "lead_time", "expected_delivery_date", "creation",
+            "planned_start_date", "planned_end_date"]
+    )
+    # Same rule as auto_schedule_new_work_order: fully scheduled orders are left alone
+    return [wo for wo in rows
+        if wo.docstatus < 2 and not (wo.planned_start_date and wo.planned_end_date)]
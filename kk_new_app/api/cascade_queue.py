@@ -0,0 +1,127 @@
+import pickle
+import time
+
+import frappe
+
+from kk_new_app.api.work_order_scheduler import shift_following_work_orders
+
+CASCADE_QUEUE_KEY = "kk_cascade_queue"
+CASCADE_EVENT = "kk_work_order_cascade"
+
+# A burst is over once no Work Order of the company was moved for this long
+CASCADE_DEBOUNCE_SECONDS = 2.0
+# ... or after this long in any case, so constant dragging still lands
+CASCADE_MAX_WAIT_SECONDS = 15.0
+# A worker hands over to a fresh job after this long, well inside CASCADE_JOB_TIMEOUT
+CASCADE_RUN_SECONDS = 60
+CASCADE_JOB_TIMEOUT = 300
+# The worker flag is refreshed on every round and expires on its own should a worker die
+CASCADE_WORKER_TTL = 180
+
+def queue_work_order_cascade(company, work_order, previous):
+    """Queue the cascade of a moved Work Order once the move is committed
+
+    Moves wait in a per-company Redis hash; the first one of a burst starts the
+    worker job, later ones are picked up by it.
+    """
+    user = frappe.session.user
+    frappe.db.after_commit.add(lambda: add_to_cascade_queue(company, work_order, previous, user))
+
+def add_to_cascade_queue(company, work_order, previous, user):
+    key = get_queue_key(company)
+    # Moved again before its cascade ran: keep the schedule from before the first move
+    entry = frappe.cache.hget(key, work_order) or previous
+    frappe.cache.hset(key, work_order, {**entry, "queued_at": time.time(), "user": user})
+
+    if acquire_cascade_worker(company):
+        enqueue_cascade_worker(company)
+
+def enqueue_cascade_worker(company):
+    frappe.enqueue(
+        "kk_new_app.api.cascade_queue.run_cascade_queue",
+        queue="short",
+        timeout=CASCADE_JOB_TIMEOUT,
+        company=company,
+    )
+
+def run_cascade_queue(company):
+    """Background job: recompute the cascade of every queued move of ``company`` at once
+
+    Holds the worker flag while it runs. Releasing it is followed by one more look at
+    the queue, so a move queued while the flag was still held is never left behind.
+    Under constant dragging the flag is handed to a fresh job after CASCADE_RUN_SECONDS.
+    """
+    key = get_queue_key(company)
+    started = time.monotonic()
+    try:
+        while True:
+            refresh_cascade_worker(company)
+            if time.monotonic() - started > CASCADE_RUN_SECONDS and frappe.cache.hgetall(key):
+                enqueue_cascade_worker(company)
+                return
+
+            wait_for_quiet_queue(key)
+            pending = drain_cascade_queue(key)
+            if not pending:
+                release_cascade_worker(company)
+                if frappe.cache.hgetall(key) and acquire_cascade_worker(company):
+                    continue
+                return
+
+            refresh_cascade_worker(company)
+            cascade_queued_moves(company, pending)
+            frappe.db.commit()
+    except Exception:
+        release_cascade_worker(company)
+        raise
+
+def drain_cascade_queue(key):
+    """Read and empty the queue in one MULTI/EXEC, so a move queued meanwhile stays for the next round"""
+    raw_key = frappe.cache.make_key(key)
+    pipeline = frappe.cache.pipeline()
+    pipeline.hgetall(raw_key)
+    pipeline.delete(raw_key)
+    entries, _deleted = pipeline.execute()
+    # Values were pickled by frappe.cache.hset
+    return {name.decode(): pickle.loads(value) for name, value in entries.items()}
+
+def cascade_queued_moves(company, pending):
+    """One cascade for all moves of a burst, reported to every planner who made one"""
+    moves, snapshot = shift_following_work_orders(pending, company)
+
+    message = {
+        "company": company,
+        "work_orders": sorted(pending),
+        "moved": len(moves),
+        "snapshot": snapshot,
+    }
+    for user in {entry["user"] for entry in pending.values()}:
+        frappe.publish_realtime(CASCADE_EVENT, message, user=user, after_commit=True)
+    return message
+
+def wait_for_quiet_queue(key):
+    """Sleep until no move was queued for CASCADE_DEBOUNCE_SECONDS, at most CASCADE_MAX_WAIT_SECONDS"""
+    deadline = time.monotonic() + CASCADE_MAX_WAIT_SECONDS
+    while True:
+        queued = [entry["queued_at"] for entry in frappe.cache.hgetall(key).values()]
+        wait = CASCADE_DEBOUNCE_SECONDS - (time.time() - max(queued)) if queued else 0
+        wait = min(wait, deadline - time.monotonic())
+        if wait <= 0:
+            return
+        time.sleep(wait)
+
+def acquire_cascade_worker(company):
+    return bool(frappe.cache.set(frappe.cache.make_key(get_worker_key(company)), 1,
+        nx=True, ex=CASCADE_WORKER_TTL))
+
+def refresh_cascade_worker(company):
+    frappe.cache.expire(frappe.cache.make_key(get_worker_key(company)), CASCADE_WORKER_TTL)
+
+def release_cascade_worker(company):
+    frappe.cache.delete_value(get_worker_key(company))
+
+def get_queue_key(company):
+    return f"{CASCADE_QUEUE_KEY}::{company}"
+
+def get_worker_key(company):
+    return f"{CASCADE_QUEUE_KEY}::{company}::worker"
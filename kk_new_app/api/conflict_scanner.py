@@ -0,0 +1,150 @@
+import heapq
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+from kk_new_app.api.instrumentation import instrumented, span
+from kk_new_app.api.streaming import ndjson_response
+from kk_new_app.api.work_order_scheduler import get_calendar_window
+
+# Same bookings as the workstation timelines, read straight off the covering
+# kk_jc_workstation_schedule index in (workstation, start) order, so no filesort
+CONFLICT_SCAN_QUERY = """
+    SELECT workstation, name, operation, expected_start_date, expected_end_date
+    FROM `tabJob Card`
+    WHERE workstation IS NOT NULL
+    AND workstation != ''
+    AND docstatus < 2
+    AND expected_start_date IS NOT NULL
+    AND expected_end_date IS NOT NULL
+    {conditions}
+    ORDER BY workstation, expected_start_date
+"""
+
+CONFLICT_REPORT_KEY = "kk_schedule_conflict_report"
+CONFLICT_EVENT = "kk_schedule_conflicts"
+
+# Pairs kept in the cached hourly report; the endpoint always returns all of them
+REPORT_PAIRS = 500
+
+@frappe.whitelist()
+@instrumented
+def get_schedule_conflicts(workstation=None, start=None, end=None, include_past=0, format="json"):
+    """Every pair of overlapping Job Cards per workstation, with the overlap duration
+
+    ``format="ndjson"`` streams one pair per line and a closing summary line, for
+    clean-up reports over the whole shop floor.
+    """
+    frappe.has_permission("Job Card", "read", throw=True)
+    if format not in ("json", "ndjson"):
+        frappe.throw(f"Unknown conflict format {format}. Use json or ndjson")
+
+    window_start, window_end = get_calendar_window(start, end)
+    if not window_start and not cint(include_past):
+        window_start = now_datetime()
+
+    if format == "ndjson":
+        # The sweep runs while the body is written, one pair in memory at a time
+        return ndjson_response(iter_conflict_records(workstation, window_start, window_end),
+            filename="schedule_conflicts.ndjson")
+
+    with span("sweep") as sweep:
+        summary = {"job_cards": 0}
+        conflicts = list(scan_schedule_conflicts(workstation, window_start, window_end, summary))
+        sweep.rows = summary["job_cards"]
+    summary["conflicts"] = len(conflicts)
+    return {"summary": summary, "conflicts": conflicts}
+
+@frappe.whitelist()
+def get_conflict_report():
+    """The last hourly conflict scan"""
+    frappe.has_permission("Job Card", "read", throw=True)
+    return frappe.cache.get_value(CONFLICT_REPORT_KEY)
+
+def scan_schedule_conflicts(workstation=None, window_start=None, window_end=None, summary=None):
+    """Yield overlapping Job Card pairs with one ordered pass over the bookings
+
+    Rows arrive sorted by (workstation, start) through an unbuffered cursor, so memory
+    holds only the cards still running at the current start time (a heap by end):
+    O(n log n + conflicts) overall.
+    """
+    conditions = []
+    values = {}
+    if workstation:
+        conditions.append("AND workstation = %(workstation)s")
+        values["workstation"] = workstation
+    if window_start:
+        conditions.append("AND expected_end_date > %(window_start)s")
+        values["window_start"] = window_start
+    if window_end:
+        conditions.append("AND expected_start_date < %(window_end)s")
+        values["window_end"] = window_end
+
+    with frappe.db.unbuffered_cursor():
+        rows = frappe.db.sql(CONFLICT_SCAN_QUERY.format(conditions=" ".join(conditions)), values,
+            as_iterator=True)
+        yield from sweep_conflicts(rows, summary)
+
+def sweep_conflicts(rows, summary=None):
+    """Yield overlapping pairs of (workstation, name, operation, start, end) rows sorted by (workstation, start)"""
+    current_workstation = None
+    running = []
+    scanned = 0
+
+    for workstation, name, operation, start, end in rows:
+        scanned += 1
+        if workstation != current_workstation:
+            current_workstation = workstation
+            running = []
+
+        # Cards that ended by this start can no longer overlap anything after it
+        while running and running[0][0] <= start:
+            heapq.heappop(running)
+
+        for other_end, other_start, other_name, other_operation in running:
+            overlap_end = min(end, other_end)
+            if overlap_end > start:
+                yield {
+                    "workstation": workstation,
+                    "job_card": other_name,
+                    "operation": other_operation,
+                    "other_job_card": name,
+                    "other_operation": operation,
+                    "overlap_start": start,
+                    "overlap_end": overlap_end,
+                    "overlap_minutes": round((overlap_end - start).total_seconds() / 60, 1),
+                }
+
+        if end > start:
+            heapq.heappush(running, (end, start, name, operation))
+
+    if summary is not None:
+        summary["job_cards"] = scanned
+
+def iter_conflict_records(workstation=None, window_start=None, window_end=None):
+    """Every overlapping pair, then a closing summary record once the sweep is done"""
+    summary = {"job_cards": 0, "conflicts": 0}
+    for pair in scan_schedule_conflicts(workstation, window_start, window_end, summary):
+        summary["conflicts"] += 1
+        yield pair
+    yield {"summary": summary}
+
+def run_conflict_scan():
+    """Hourly job: scan current and future bookings, cache the report and tell planners"""
+    summary = {"job_cards": 0}
+    conflicts = list(scan_schedule_conflicts(window_start=now_datetime(), summary=summary))
+    conflicts.sort(key=lambda pair: pair["overlap_minutes"], reverse=True)
+
+    report = {
+        "scanned_at": now_datetime(),
+        "job_cards": summary["job_cards"],
+        "conflicts": len(conflicts),
+        "overlap_minutes": round(sum(pair["overlap_minutes"] for pair in conflicts), 1),
+        "workstations": len({pair["workstation"] for pair in conflicts}),
+        "pairs": conflicts[:REPORT_PAIRS],
+    }
+    frappe.cache.set_value(CONFLICT_REPORT_KEY, report)
+
+    if conflicts:
+        frappe.publish_realtime(CONFLICT_EVENT, {key: value for key, value in report.items() if key != "pairs"})
+    return report
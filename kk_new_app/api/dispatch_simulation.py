@@ -0,0 +1,184 @@
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import frappe
+from frappe.utils import add_to_date, cint, get_datetime, now_datetime
+
+from kk_new_app.api.instrumentation import instrumented, span
+from kk_new_app.api.workstation_timeline import WorkstationTimeline
+
+# Open Job Cards of open Work Orders, in routing order
+SNAPSHOT_QUERY = """
+    SELECT
+        jc.name,
+        jc.work_order,
+        jc.workstation,
+        jc.time_required,
+        jc.status,
+        jc.expected_start_date,
+        jc.expected_end_date,
+        wo.expected_delivery_date,
+        wo.creation as wo_creation
+    FROM `tabJob Card` jc
+    JOIN `tabWork Order` wo ON jc.work_order = wo.name
+    WHERE jc.docstatus < 2
+    AND wo.docstatus < 2
+    AND jc.status NOT IN ('Completed', 'Cancelled')
+    AND wo.status NOT IN ('Completed', 'Stopped', 'Closed', 'Cancelled')
+    ORDER BY jc.work_order, jc.sequence_id, jc.operation_id
+"""
+
+# Below this many operations a spawned pool costs more to start (each child imports
+# frappe and the app) than simulating the rules one after another
+PARALLEL_MIN_OPERATIONS = 5000
+
+# Sort keys over snapshot work orders: (work order, now) -> key, most urgent first
+DISPATCH_RULES = {
+    # Current behaviour: first come, first placed into the first free gap
+    "fifo": lambda wo, now: (wo["creation"],),
+    # Earliest due date
+    "edd": lambda wo, now: (wo["due"], wo["creation"]),
+    # Shortest total processing time
+    "spt": lambda wo, now: (wo["minutes"], wo["creation"]),
+    # Critical ratio: time left until due over work left; below 1 is already behind
+    "critical_ratio": lambda wo, now: (
+        (wo["due"] - now).total_seconds() / 60 / wo["minutes"] if wo["minutes"] else float("inf"),
+        wo["creation"],
+    ),
+}
+
+@frappe.whitelist()
+@instrumented
+def simulate_dispatch_rules(rules=None, work_orders=None, parallel=0):
+    """Compare dispatch rules on a read-only snapshot of the open schedule; writes nothing
+
+    Runs serially in the web worker unless ``parallel`` is asked for and the snapshot
+    has at least PARALLEL_MIN_OPERATIONS operations.
+    """
+    frappe.has_permission("Work Order", "read", throw=True)
+
+    rules = frappe.parse_json(rules) if rules else list(DISPATCH_RULES)
+    unknown = [rule for rule in rules if rule not in DISPATCH_RULES]
+    if unknown:
+        frappe.throw(f"Unknown dispatch rule {', '.join(unknown)}. Use one of: {', '.join(DISPATCH_RULES)}")
+
+    with span("query") as query:
+        snapshot = get_schedule_snapshot(frappe.parse_json(work_orders) if work_orders else None)
+        query.rows = sum(len(wo["operations"]) for wo in snapshot["work_orders"])
+
+    with span("simulate"):
+        results = run_simulations(snapshot, rules, parallel=cint(parallel))
+
+    return {
+        "snapshot": {
+            "taken_at": snapshot["now"],
+            "work_orders": len(snapshot["work_orders"]),
+            "job_cards": sum(len(wo["operations"]) for wo in snapshot["work_orders"]),
+            "fixed_job_cards": len(snapshot["fixed"]),
+        },
+        "results": results,
+    }
+
+def get_schedule_snapshot(work_orders=None):
+    """Plain, picklable copy of the open schedule for simulation in other processes
+
+    Job Cards in progress, and dated cards of Work Orders outside ``work_orders``, stay
+    where they are as fixed bookings; every other open card is re-dispatched.
+    """
+    now = now_datetime()
+    selected = set(work_orders) if work_orders else None
+    orders = {}
+    fixed = []
+
+    for row in frappe.db.sql(SNAPSHOT_QUERY, as_dict=True):
+        dispatched = row.status != "Work In Progress" and (selected is None or row.work_order in selected)
+        if not dispatched:
+            if row.workstation and row.expected_start_date and row.expected_end_date:
+                fixed.append((row.workstation, get_datetime(row.expected_start_date),
+                    get_datetime(row.expected_end_date), row.name))
+            continue
+
+        wo = orders.get(row.work_order)
+        if wo is None:
+            wo = orders[row.work_order] = {
+                "name": row.work_order,
+                # Same default deadline as the auto-schedulers
+                "due": get_datetime(row.expected_delivery_date) if row.expected_delivery_date else add_to_date(now, days=7),
+                "creation": get_datetime(row.wo_creation),
+                "minutes": 0,
+                "operations": [],
+            }
+        minutes = row.time_required or 60
+        wo["operations"].append((row.name, row.workstation, minutes))
+        wo["minutes"] += minutes
+
+    return {"now": now, "work_orders": list(orders.values()), "fixed": fixed}
+
+def run_simulations(snapshot, rules, parallel=True):
+    """{rule: metrics} for every rule, one process per rule when ``parallel`` and the snapshot is large"""
+    operations = sum(len(wo["operations"]) for wo in snapshot["work_orders"])
+    if not parallel or len(rules) < 2 or operations < PARALLEL_MIN_OPERATIONS:
+        return {rule: simulate(snapshot, rule) for rule in rules}
+
+    # spawn: children must not inherit this worker's database connection or Redis sockets
+    context = multiprocessing.get_context("spawn")
+    workers = min(len(rules), os.cpu_count() or 1)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {rule: pool.submit(simulate, snapshot, rule) for rule in rules}
+            return {rule: future.result() for rule, future in futures.items()}
+    except (OSError, RuntimeError):
+        # No child processes here (e.g. a daemonic worker): same answer, just serially
+        return {rule: simulate(snapshot, rule) for rule in rules}
+
+def simulate(snapshot, rule):
+    """List-schedule the snapshot in ``rule`` order, first-fit per operation, and score it
+
+    Pure function of the snapshot so it can run in a process without a site connection.
+    Time is treated as continuous; working calendars are not part of the snapshot.
+    """
+    now = snapshot["now"]
+    fixed_by_workstation = defaultdict(list)
+    for workstation, start, end, name in snapshot["fixed"]:
+        fixed_by_workstation[workstation].append((start, end, name, None))
+    timelines = {}
+
+    orders = sorted(snapshot["work_orders"], key=lambda wo: DISPATCH_RULES[rule](wo, now))
+    busy_minutes = defaultdict(float)
+    finish = now
+    late = 0
+    tardiness = 0.0
+
+    for wo in orders:
+        cursor = now
+        for name, workstation, minutes in wo["operations"]:
+            duration = timedelta(minutes=minutes)
+            start = cursor
+            if workstation:
+                timeline = timelines.get(workstation)
+                if timeline is None:
+                    timeline = timelines[workstation] = WorkstationTimeline(fixed_by_workstation[workstation])
+                start = timeline.first_free_slot(cursor, duration)
+                timeline.reserve(start, start + duration, name)
+                busy_minutes[workstation] += minutes
+            cursor = start + duration
+
+        finish = max(finish, cursor)
+        if cursor > wo["due"]:
+            late += 1
+            tardiness += (cursor - wo["due"]).total_seconds() / 60
+
+    makespan = (finish - now).total_seconds() / 60
+    capacity = len(busy_minutes) * makespan
+    return {
+        "rule": rule,
+        "makespan_minutes": round(makespan, 1),
+        "total_tardiness_minutes": round(tardiness, 1),
+        "late_work_orders": late,
+        "work_orders": len(orders),
+        "utilization": round(sum(busy_minutes.values()) * 100 / capacity, 2) if capacity else 0,
+        "finish": finish,
+    }
@@ -0,0 +1,228 @@
+import functools
+import time
+from contextlib import contextmanager
+
+import frappe
+
+METRICS_KEY = "kk_scheduler_metrics"
+TRACE_HEADER = "X-Scheduler-Trace"
+TRACE_PARAM = "scheduler_trace"
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +Inf
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class Span:
+    """Timing and counters of one endpoint or one phase inside it"""
+
+    __slots__ = ("name", "rows", "queries", "duration_ms")
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.queries = 0
+        self.duration_ms = 0.0
+
+class Trace:
+    """Everything measured during one instrumented endpoint call"""
+
+    def __init__(self, endpoint, verbose=False):
+        self.endpoint = endpoint
+        self.verbose = verbose
+        self.queries = 0
+        self.spans = []
+        self.events = []
+
+    def record(self, metric, span):
+        self.spans.append((metric, span))
+
+    def flush(self):
+        """Add this call's spans to the shared histograms with one Redis round trip"""
+        key = frappe.cache.make_key(METRICS_KEY)
+        pipe = frappe.cache.pipeline()
+        for metric, span in self.spans:
+            pipe.hincrby(key, f"{metric}|count", 1)
+            pipe.hincrbyfloat(key, f"{metric}|sum_ms", span.duration_ms)
+            pipe.hincrby(key, f"{metric}|rows", span.rows)
+            pipe.hincrby(key, f"{metric}|queries", span.queries)
+            pipe.hincrby(key, f"{metric}|le_{bucket_for(span.duration_ms)}", 1)
+        pipe.execute()
+
+    def as_dict(self):
+        return {
+            "endpoint": self.endpoint,
+            "spans": [
+                {"name": metric, "ms": round(span.duration_ms, 3), "rows": span.rows, "queries": span.queries}
+                for metric, span in self.spans
+            ],
+            "events": self.events,
+        }
+
+def bucket_for(duration_ms):
+    for bound in BUCKETS_MS:
+        if duration_ms <= bound:
+            return bound
+    return "inf"
+
+def get_trace():
+    return getattr(frappe.local, "kk_scheduler_trace", None)
+
+def instrumented(fn):
+    """Time a whitelisted endpoint, count its queries and rows, and feed the histograms"""
+    endpoint = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if get_trace() is not None:
+            # Called from another instrumented endpoint: measure it as a phase of that one
+            with span(endpoint):
+                return fn(*args, **kwargs)
+
+        trace = Trace(endpoint, verbose=is_tracing_requested())
+        total = Span(endpoint)
+        frappe.local.kk_scheduler_trace = trace
+        started = time.perf_counter()
+
+        try:
+            with count_queries():
+                result = fn(*args, **kwargs)
+            if isinstance(result, (list, tuple)):
+                total.rows = len(result)
+            return result
+        finally:
+            total.duration_ms = (time.perf_counter() - started) * 1000
+            total.queries = trace.queries
+            trace.record(endpoint, total)
+            frappe.local.kk_scheduler_trace = None
+            finish_trace(trace)
+
+    return wrapper
+
+@contextmanager
+def span(name):
+    """Measure one phase (query, gap search, serialization, save) of the current endpoint"""
+    current = Span(name)
+    trace = get_trace()
+    if trace is None:
+        # Outside an instrumented endpoint (bench execute, hooks): no bookkeeping at all
+        yield current
+        return
+
+    queries_before = trace.queries
+    started = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration_ms = (time.perf_counter() - started) * 1000
+        current.queries = trace.queries - queries_before
+        trace.record(f"{trace.endpoint}.{name}", current)
+
+def trace_event(message):
+    """Verbose detail for the current call; dropped unless tracing was asked for"""
+    trace = get_trace()
+    if trace is not None and trace.verbose:
+        trace.events.append(message)
+
+@contextmanager
+def count_queries():
+    """Count frappe.db.sql calls made inside the block
+
+    Safe to patch: frappe.db is this request's (or job's) own connection in frappe.local.
+    The patch is undone on the same object in LIFO order, so nested blocks work.
+    """
+    counter = {"queries": 0}
+    db = frappe.db
+    shadowed = "sql" in vars(db)
+    original_sql = db.sql
+    trace = get_trace()
+
+    def counting_sql(*args, **kwargs):
+        counter["queries"] += 1
+        if trace is not None:
+            trace.queries += 1
+        return original_sql(*args, **kwargs)
+
+    db.sql = counting_sql
+    try:
+        yield counter
+    finally:
+        if shadowed:
+            db.sql = original_sql
+        else:
+            # Back to the class method instead of pinning a bound copy on the instance
+            del db.sql
+
+def is_tracing_requested():
+    """Verbose tracing is opt-in per request, via header or form parameter, for System Managers"""
+    if getattr(frappe.local, "request", None) is None:
+        # bench execute, background jobs and benchmarks have no request to ask
+        return False
+    requested = frappe.get_request_header(TRACE_HEADER) or (frappe.form_dict or {}).get(TRACE_PARAM)
+    return bool(requested) and "System Manager" in frappe.get_roles()
+
+def finish_trace(trace):
+    try:
+        trace.flush()
+    except Exception:
+        # Metrics must never break the endpoint they measure
+        frappe.logger("kk_new_app.scheduler").warning("Could not record scheduler metrics", exc_info=True)
+
+    if trace.verbose:
+        details = trace.as_dict()
+        frappe.logger("kk_new_app.scheduler").info(details)
+        if getattr(frappe.local, "response", None) is not None:
+            frappe.local.response["scheduler_trace"] = details
+
+@frappe.whitelist()
+def get_scheduler_metrics(format="json"):
+    """Aggregated scheduler latency histograms, as JSON or Prometheus text"""
+    frappe.only_for("System Manager")
+
+    raw = frappe.cache.pipeline().hgetall(frappe.cache.make_key(METRICS_KEY)).execute()[0]
+    metrics = {}
+    for field, value in raw.items():
+        metric, stat = frappe.safe_decode(field).rsplit("|", 1)
+        entry = metrics.setdefault(metric, {"count": 0, "sum_ms": 0.0, "rows": 0, "queries": 0, "buckets": {}})
+        if stat.startswith("le_"):
+            entry["buckets"][stat[3:]] = int(value)
+        elif stat == "sum_ms":
+            entry["sum_ms"] = float(value)
+        else:
+            entry[stat] = int(value)
+
+    for entry in metrics.values():
+        entry["avg_ms"] = round(entry["sum_ms"] / entry["count"], 3) if entry["count"] else 0
+
+    if format == "prometheus":
+        frappe.local.response.type = "txt"
+        frappe.local.response.result = to_prometheus(metrics)
+        frappe.local.response.filename = "metrics"
+        return
+    return metrics
+
+@frappe.whitelist(methods=["POST"])
+def reset_scheduler_metrics():
+    """Clear the aggregated scheduler histograms"""
+    frappe.only_for("System Manager")
+    frappe.cache.delete_value(METRICS_KEY)
+
+def to_prometheus(metrics):
+    """Render the histograms in the Prometheus text exposition format"""
+    lines = [
+        "# HELP kk_scheduler_duration_ms Scheduler endpoint and phase latency",
+        "# TYPE kk_scheduler_duration_ms histogram",
+    ]
+    bounds = [str(bound) for bound in BUCKETS_MS] + ["inf"]
+
+    for metric in sorted(metrics):
+        entry = metrics[metric]
+        cumulative = 0
+        for bound in bounds:
+            cumulative += entry["buckets"].get(bound, 0)
+            le = "+Inf" if bound == "inf" else bound
+            lines.append(f'kk_scheduler_duration_ms_bucket{{span="{metric}",le="{le}"}} {cumulative}')
+        lines.append(f'kk_scheduler_duration_ms_sum{{span="{metric}"}} {entry["sum_ms"]}')
+        lines.append(f'kk_scheduler_duration_ms_count{{span="{metric}"}} {entry["count"]}')
+        lines.append(f'kk_scheduler_rows_total{{span="{metric}"}} {entry["rows"]}')
+        lines.append(f'kk_scheduler_queries_total{{span="{metric}"}} {entry["queries"]}')
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,121 @@
+import json
+import os
+
+import frappe
+from frappe.utils import add_to_date, now_datetime
+
+from kk_new_app.api.conflict_scanner import CONFLICT_SCAN_QUERY
+from kk_new_app.api.schedule_export import EXPORT_QUERY
+from kk_new_app.api.work_order_scheduler import JOB_CARD_EVENT_QUERY, WORK_ORDER_DASHBOARD_QUERY
+from kk_new_app.api.workstation_load import DAILY_LOAD_QUERY, LOAD_SOURCE_QUERY
+from kk_new_app.api.workstation_timeline import TIMELINE_QUERY
+
+PLANS_FILE = "kk_scheduler_query_plans.json"
+
+# Tables (and the aliases our queries give them) that must never be scanned in full
+# once the patch indexes exist
+HOT_TABLES = ("tabJob Card", "tabWork Order", "tabWorkstation Daily Load", "jc", "wo", "dl")
+
+def get_scheduler_queries():
+    """(name, sql, values) for every scheduler query, built the same way the endpoints build them"""
+    now = now_datetime()
+    window = {"window_start": now, "window_end": add_to_date(now, days=7)}
+    workstation = frappe.db.get_value("Workstation", {}, "name") or "_"
+    work_order = frappe.db.get_value("Work Order", {}, "name") or "_"
+
+    return [
+        ("job_card_window", JOB_CARD_EVENT_QUERY.format(conditions=" AND ".join([
+            "jc.docstatus < 2",
+            "jc.expected_start_date IS NOT NULL",
+            "jc.expected_end_date IS NOT NULL",
+            "jc.expected_start_date < %(window_end)s",
+            "jc.expected_end_date > %(window_start)s",
+        ])), window),
+        ("job_card_changes", JOB_CARD_EVENT_QUERY.format(conditions="jc.modified >= %(since)s"),
+            {"since": add_to_date(now, minutes=-1)}),
+        ("workstation_timeline", TIMELINE_QUERY.format(conditions=""),
+            {"workstations": (workstation,)}),
+        ("workstation_availability_window", TIMELINE_QUERY.format(
+            conditions="AND expected_start_date < %(window_end)s AND expected_end_date > %(window_start)s"),
+            {"workstations": (workstation,), **window}),
+        ("work_order_window", frappe.get_all("Work Order",
+            filters={
+                "docstatus": ["<", 2],
+                "planned_start_date": ["<", window["window_end"]],
+                "planned_end_date": [">", window["window_start"]]
+            },
+            fields=["name", "planned_start_date", "planned_end_date"], run=0), None),
+        ("work_order_cascade", frappe.get_all("Work Order",
+            filters={
+                "docstatus": ["<", 2],
+                "planned_start_date": [">=", now],
+                "planned_end_date": ["is", "set"],
+                "name": ["!=", work_order]
+            },
+            order_by="planned_start_date asc",
+            fields=["name", "planned_start_date", "planned_end_date"], run=0), None),
+        ("job_cards_for_work_order", frappe.get_all("Job Card",
+            filters={"work_order": work_order, "docstatus": ["<", 2]},
+            fields=["name", "operation", "workstation", "time_required", "sequence_id", "operation_id"],
+            order_by="sequence_id asc, operation_id asc", run=0), None),
+        ("work_order_dashboard", WORK_ORDER_DASHBOARD_QUERY, {"work_order": work_order}),
+        ("workstation_load_source", LOAD_SOURCE_QUERY, {
+            "workstations": (workstation,),
+            "window_start": now,
+            "window_end": add_to_date(now, days=1),
+            "exclude": ("",),
+        }),
+        ("workstation_utilization", DAILY_LOAD_QUERY.format(conditions=""),
+            {"from_date": now.date(), "to_date": add_to_date(now, days=90).date()}),
+        ("schedule_export_workstation", EXPORT_QUERY.format(conditions=" ".join([
+            "AND jc.expected_start_date < %(window_end)s AND jc.expected_end_date > %(window_start)s",
+            "AND jc.workstation = %(workstation)s",
+        ])), {"workstation": workstation, **window}),
+        ("schedule_conflict_scan", CONFLICT_SCAN_QUERY.format(
+            conditions="AND expected_end_date > %(window_start)s"), {"window_start": now}),
+    ]
+
+def explain_scheduler_queries():
+    """EXPLAIN every scheduler query; returns {query name: [plan rows]}"""
+    plans = {}
+    for name, query, values in get_scheduler_queries():
+        plans[name] = [
+            {key: row.get(key) for key in ("table", "type", "possible_keys", "key", "rows", "Extra")}
+            for row in frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True)
+        ]
+    return plans
+
+def check_query_plans(update=True):
+    """Record scheduler query plans and report full scans or plans worse than the last run
+
+    Run with ``bench --site <site> execute kk_new_app.api.query_plans.check_query_plans``.
+    """
+    path = frappe.get_site_path(PLANS_FILE)
+    previous = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+
+    plans = explain_scheduler_queries()
+    problems = []
+
+    for name, rows in plans.items():
+        old_rows = {row["table"]: row for row in previous.get(name, [])}
+        for row in rows:
+            if row["table"] in HOT_TABLES and (row["type"] == "ALL" or not row["key"]):
+                problems.append(f"{name}: full scan of {row['table']}")
+
+            old = old_rows.get(row["table"])
+            if old and old["key"] and old["key"] != row["key"]:
+                problems.append(f"{name}: {row['table']} index changed from {old['key']} to {row['key']}")
+
+    if update:
+        with open(path, "w") as f:
+            json.dump(plans, f, indent=2, default=str)
+
+    return {"plans": plans, "problems": problems}
+
+def record_query_plans_after_migrate():
+    """after_migrate hook: refresh the stored plans and print any regression"""
+    for problem in check_query_plans()["problems"]:
+        print(f"Scheduler query plan: {problem}")
@@ -0,0 +1,92 @@
+import hashlib
+import json
+
+import frappe
+
+RESPONSE_VERSION_KEY = "kk_schedule_response_versions"
+RESPONSE_CACHE_KEY = "kk_schedule_response"
+RECORD_VERSION_KEY = "kk_schedule_record_version"
+
+# Entries are also dropped by version change; the TTL only bounds unused windows
+RESPONSE_CACHE_TTL = 600
+
+# Doctypes whose changes make a cached calendar response stale
+CACHED_DOCTYPES = ("Work Order", "Job Card", "Workstation", "Workstation Type")
+
+def cached_response(endpoint, doctypes, params, builder, if_none_match=None, records=None):
+    """Serve ``builder()`` from the shared cache, keyed by endpoint, params and doctype versions
+
+    ``records`` ((doctype, name) pairs) add per-record versions, for responses about one
+    document that only its own changes should invalidate. Returns ``{"version", "data"}``,
+    or ``{"version", "not_modified": 1}`` when the client already holds the current version.
+    """
+    version = get_response_version(doctypes, records)
+    if if_none_match and if_none_match == version:
+        return {"version": version, "not_modified": 1}
+
+    params_hash = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    cache_key = f"{RESPONSE_CACHE_KEY}::{endpoint}::{params_hash}"
+
+    cached = frappe.cache.get_value(cache_key)
+    if cached and cached["version"] == version:
+        return cached
+
+    # The version is read before building, so a change committed meanwhile makes this entry stale
+    response = {"version": version, "data": builder()}
+    frappe.cache.set_value(cache_key, response, expires_in_sec=RESPONSE_CACHE_TTL)
+    return response
+
+def get_response_version(doctypes, records=None):
+    """Combined version token of the given doctypes and records, used as the response ETag"""
+    versions = frappe.cache.hgetall(RESPONSE_VERSION_KEY) or {}
+    missing = [doctype for doctype in doctypes if not versions.get(doctype)]
+    if missing:
+        for doctype in missing:
+            versions[doctype] = frappe.generate_hash(length=12)
+            frappe.cache.hset(RESPONSE_VERSION_KEY, doctype, versions[doctype])
+
+    combined = "|".join([versions[doctype] for doctype in doctypes]
+        + [get_record_version(doctype, name) for doctype, name in records or ()])
+    return hashlib.md5(combined.encode()).hexdigest()[:16]
+
+def bump_response_versions(doctypes):
+    """Mark every cached response built from these doctypes as stale, in every worker"""
+    for doctype in set(doctypes):
+        frappe.cache.hset(RESPONSE_VERSION_KEY, doctype, frappe.generate_hash(length=12))
+
+def get_record_version(doctype, name):
+    # Expires with the entries built from it; a missing version just means a fresh one
+    key = f"{RECORD_VERSION_KEY}::{doctype}::{name}"
+    version = frappe.cache.get_value(key)
+    if not version:
+        version = frappe.generate_hash(length=12)
+        frappe.cache.set_value(key, version, expires_in_sec=RESPONSE_CACHE_TTL)
+    return version
+
+def bump_record_versions(doctype, names):
+    """Mark cached responses about these records as stale"""
+    keys = [f"{RECORD_VERSION_KEY}::{doctype}::{name}" for name in set(names) if name]
+    if keys:
+        frappe.cache.delete_value(keys)
+
+def invalidate_response_cache(doc, method=None, *args):
+    """Doc event for the cached doctypes: bump the doctype's version now and after commit"""
+    work_orders = get_affected_work_orders(doc)
+    bump_response_versions([doc.doctype])
+    bump_record_versions("Work Order", work_orders)
+
+    def bump_after_commit():
+        bump_response_versions([doc.doctype])
+        bump_record_versions("Work Order", work_orders)
+
+    # Bump again after commit so no response built from pre-commit data survives
+    frappe.db.after_commit.add(bump_after_commit)
+
+def get_affected_work_orders(doc):
+    """Work Orders whose per-record responses (the form dashboard) a change of ``doc`` touches"""
+    if doc.doctype == "Work Order":
+        return [doc.name]
+    if doc.doctype == "Job Card":
+        before = doc.get_doc_before_save()
+        return [doc.work_order, before.work_order if before else None]
+    return []
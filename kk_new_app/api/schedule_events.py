@@ -0,0 +1,63 @@
+import frappe
+from frappe.realtime import get_site_room
+
+from kk_new_app.api.work_order_scheduler import (
+    get_job_card_event,
+    get_job_card_rows,
+    get_work_order_event,
+)
+
+SCHEDULE_UPDATE_EVENT = "kk_schedule_update"
+
+def publish_schedule_change(doc, method=None):
+    """Doc event hook: push a compact schedule-change message to everyone on this site"""
+    upserts = []
+    if method not in ("on_cancel", "on_trash") and doc.docstatus < 2:
+        event = get_schedule_event(doc)
+        if event:
+            upserts.append(event)
+
+    removed = [] if upserts else [doc.name]
+    publish_schedule_message(doc.doctype, upserts, removed)
+
+def publish_schedule_changes(doctype, names):
+    """Publish one message covering many rows written without a document save"""
+    if not names:
+        return
+
+    names = list(names)
+    if doctype == "Job Card":
+        rows = get_job_card_rows(["jc.name IN %(names)s"], {"names": tuple(names)})
+        events = {jc.name: get_job_card_event(jc) for jc in rows
+            if jc.docstatus < 2 and jc.expected_start_date and jc.expected_end_date}
+    else:
+        rows = frappe.get_all("Work Order", filters={"name": ["in", names]},
+            fields=["name", "docstatus", "planned_start_date", "planned_end_date", "production_item",
+                "qty", "expected_delivery_date"])
+        events = {wo.name: get_work_order_event(wo) for wo in rows
+            if wo.docstatus < 2 and wo.planned_start_date and wo.planned_end_date}
+
+    removed = [name for name in names if name not in events]
+    publish_schedule_message(doctype, list(events.values()), removed)
+
+def publish_schedule_message(doctype, upserts, removed):
+    """Send upserts/removals in the same shape the delta-sync endpoint returns"""
+    message = {
+        "kind": "operations" if doctype == "Job Card" else "work_orders",
+        "upserts": upserts,
+        "removed": removed,
+    }
+    # after_commit: planners must never see a move that gets rolled back
+    frappe.publish_realtime(SCHEDULE_UPDATE_EVENT, message, room=get_site_room(), after_commit=True)
+
+def get_schedule_event(doc):
+    """Build the calendar event for a saved Work Order or Job Card, or None if unscheduled"""
+    if doc.doctype == "Job Card":
+        if not (doc.expected_start_date and doc.expected_end_date):
+            return None
+        rows = get_job_card_rows(["jc.name = %(name)s"], {"name": doc.name})
+        return get_job_card_event(rows[0]) if rows else None
+
+    if not (doc.planned_start_date and doc.planned_end_date):
+        return None
+    return get_work_order_event(doc)
@@ -0,0 +1,161 @@
+import csv
+import io
+
+import frappe
+from frappe.utils import get_url, now_datetime
+
+from kk_new_app.api.instrumentation import instrumented
+from kk_new_app.api.streaming import ndjson_response, stream_response
+from kk_new_app.api.work_order_scheduler import get_calendar_window
+
+# Ordered like the workstation schedule index so per-workstation exports need no filesort
+EXPORT_QUERY = """
+    SELECT
+        jc.name,
+        jc.workstation,
+        jc.operation,
+        jc.work_order,
+        wo.production_item,
+        jc.status,
+        jc.expected_start_date,
+        jc.expected_end_date,
+        jc.for_quantity,
+        jc.total_completed_qty
+    FROM `tabJob Card` jc
+    LEFT JOIN `tabWork Order` wo ON jc.work_order = wo.name
+    LEFT JOIN `tabWorkstation` ws ON jc.workstation = ws.name
+    WHERE jc.docstatus < 2
+    AND jc.expected_start_date IS NOT NULL
+    AND jc.expected_end_date IS NOT NULL
+    {conditions}
+    ORDER BY jc.workstation, jc.expected_start_date
+"""
+
+EXPORT_COLUMNS = (
+    "name", "workstation", "operation", "work_order", "production_item", "status",
+    "expected_start_date", "expected_end_date", "for_quantity", "total_completed_qty",
+)
+
+# Rows per written chunk (CSV) or per columnar record
+EXPORT_CHUNK_ROWS = 1000
+
+@frappe.whitelist()
+@instrumented
+def export_schedule(format="csv", start=None, end=None, workstation=None, workstation_type=None):
+    """Stream scheduled Job Cards as CSV, an iCalendar feed of one workstation, or columnar NDJSON
+
+    Rows are read through an unbuffered cursor while the response is written, so
+    memory stays flat however long the date range is.
+    """
+    frappe.has_permission("Job Card", "read", throw=True)
+    if format not in ("csv", "ics", "columnar"):
+        frappe.throw(f"Unknown export format {format}. Use csv, ics or columnar")
+    if format == "ics" and not workstation:
+        frappe.throw("An iCalendar export is per workstation; pass workstation")
+
+    window_start, window_end = get_calendar_window(start, end)
+    rows = iter_export_rows(window_start, window_end, workstation, workstation_type)
+    filename = f"schedule_{workstation or workstation_type or 'all'}".replace(" ", "_")
+
+    if format == "csv":
+        return stream_response(iter_csv(rows), "text/csv", f"{filename}.csv")
+    if format == "ics":
+        return stream_response(iter_ics(rows, workstation), "text/calendar", f"{filename}.ics")
+    return ndjson_response(iter_columnar(rows), f"{filename}.ndjson")
+
+def iter_export_rows(window_start=None, window_end=None, workstation=None, workstation_type=None):
+    """Yield export rows as tuples in EXPORT_COLUMNS order, straight off an unbuffered cursor"""
+    conditions = []
+    values = {}
+    if window_start and window_end:
+        conditions.append("AND jc.expected_start_date < %(window_end)s AND jc.expected_end_date > %(window_start)s")
+        values["window_start"] = window_start
+        values["window_end"] = window_end
+    if workstation:
+        conditions.append("AND jc.workstation = %(workstation)s")
+        values["workstation"] = workstation
+    if workstation_type:
+        conditions.append("AND ws.workstation_type = %(workstation_type)s")
+        values["workstation_type"] = workstation_type
+
+    with frappe.db.unbuffered_cursor():
+        yield from frappe.db.sql(EXPORT_QUERY.format(conditions=" ".join(conditions)), values,
+            as_iterator=True)
+
+def iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+def iter_columnar(rows):
+    """A header record, then one record of column arrays per EXPORT_CHUNK_ROWS rows"""
+    yield {"format": "columnar", "columns": EXPORT_COLUMNS}
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield get_column_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield get_column_chunk(chunk)
+
+def get_column_chunk(rows):
+    return {"rows": len(rows), "columns": dict(zip(EXPORT_COLUMNS, (list(column) for column in zip(*rows))))}
+
+def iter_ics(rows, workstation):
+    """RFC 5545 calendar with one VEVENT per Job Card, in the site's local (floating) time"""
+    host = get_url().split("://")[-1]
+    stamp = now_datetime().strftime("%Y%m%dT%H%M%S")
+
+    yield "\r\n".join([
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//kk_new_app//Production Schedule//EN",
+        "CALSCALE:GREGORIAN",
+        fold_ics_line(f"X-WR-CALNAME:{escape_ics(workstation)}"),
+    ]) + "\r\n"
+
+    for name, _workstation, operation, work_order, item, status, start, end, qty, completed in rows:
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{escape_ics(name)}@{host}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{start:%Y%m%dT%H%M%S}",
+            f"DTEND:{end:%Y%m%dT%H%M%S}",
+            f"SUMMARY:{escape_ics(f'{operation} ({name})')}",
+            f"DESCRIPTION:{escape_ics(f'Work Order: {work_order}, Item: {item}, Qty: {completed or 0}/{qty or 0}, Status: {status}')}",
+            "END:VEVENT",
+        ]
+        yield "".join(fold_ics_line(line) + "\r\n" for line in lines)
+
+    yield "END:VCALENDAR\r\n"
+
+def escape_ics(value):
+    return (str(value or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def fold_ics_line(line, limit=75):
+    """Fold a content line to ``limit`` octets, continuation lines starting with a space"""
+    encoded = line.encode()
+    if len(encoded) <= limit:
+        return line
+
+    parts = []
+    while encoded:
+        size = limit if not parts else limit - 1
+        # Never split a UTF-8 sequence: back off to the start of a character
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        parts.append(encoded[:size].decode())
+        encoded = encoded[size:]
+    return "\r\n ".join(parts)
@@ -0,0 +1,329 @@
+import math
+import multiprocessing
+import os
+import queue
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import frappe
+from frappe.utils import cint, flt
+
+from kk_new_app.api.dispatch_simulation import DISPATCH_RULES, get_schedule_snapshot
+from kk_new_app.api.instrumentation import instrumented
+from kk_new_app.api.workstation_timeline import WorkstationTimeline
+
+OPTIMIZER_CACHE_KEY = "kk_schedule_optimizer"
+OPTIMIZER_EVENT = "kk_schedule_optimizer"
+OPTIMIZER_RESULT_TTL = 24 * 60 * 60
+
+# Chains report an improvement at most this often, so big schedules do not flood the queue
+REPORT_EVERY_SECONDS = 1.0
+
+# Starting orders of the chains, reused round-robin when there are more chains
+CHAIN_START_RULES = ("edd", "critical_ratio", "fifo", "spt")
+
+@frappe.whitelist()
+@instrumented
+def start_schedule_optimizer(budget_seconds=60, chains=None, work_orders=None, makespan_weight=0.1):
+    """Queue an anytime optimization of the open Job Card sequence; poll get_optimizer_result"""
+    frappe.only_for(("Manufacturing Manager", "System Manager"))
+
+    budget_seconds = max(1, cint(budget_seconds))
+    run_id = frappe.generate_hash(length=10)
+    save_result(run_id, {"run_id": run_id, "status": "Queued", "budget_seconds": budget_seconds})
+
+    frappe.enqueue(
+        "kk_new_app.api.schedule_optimizer.run_schedule_optimizer",
+        queue="long",
+        timeout=budget_seconds + 600,
+        run_id=run_id,
+        budget_seconds=budget_seconds,
+        chains=cint(chains) or None,
+        work_orders=frappe.parse_json(work_orders) if work_orders else None,
+        makespan_weight=flt(makespan_weight),
+        user=frappe.session.user,
+    )
+    return {"run_id": run_id}
+
+@frappe.whitelist()
+@instrumented
+def get_optimizer_result(run_id, include_schedule=0):
+    """Best schedule found so far by an optimizer run, with its metrics against the baseline"""
+    frappe.only_for(("Manufacturing Manager", "System Manager"))
+
+    result = frappe.cache.get_value(f"{OPTIMIZER_CACHE_KEY}::{run_id}")
+    if not result:
+        frappe.throw(f"Optimizer run {run_id} not found or expired")
+    if not cint(include_schedule):
+        result = {key: value for key, value in result.items() if key != "updates"}
+    return result
+
+@frappe.whitelist(methods=["POST"])
+@instrumented
+def apply_optimized_schedule(run_id, force=0):
+    """Write the best schedule of a run with one bulk update"""
+    from kk_new_app.api.schedule_snapshots import take_schedule_snapshot
+    from kk_new_app.api.schedule_writer import bulk_update_schedule
+
+    frappe.only_for(("Manufacturing Manager", "System Manager"))
+
+    result = frappe.cache.get_value(f"{OPTIMIZER_CACHE_KEY}::{run_id}")
+    if not result or not result.get("updates"):
+        frappe.throw(f"Optimizer run {run_id} has no schedule to apply")
+
+    names = [row["name"] for row in result["updates"]]
+    changed = frappe.get_all("Job Card",
+        filters={"name": ["in", names], "modified": [">", result["taken_at"]]}, pluck="name")
+    if changed and not cint(force):
+        frappe.throw(f"{len(changed)} Job Cards changed after the optimizer snapshot, e.g. "
+            f"{', '.join(changed[:5])}. Start a new run or apply with force")
+
+    snapshot = take_schedule_snapshot("Job Card", result["updates"], f"Optimizer run {run_id}")
+    bulk_update_schedule("Job Card", result["updates"])
+    result["status"] = "Applied"
+    save_result(run_id, result)
+    return {"applied": len(names), "snapshot": snapshot}
+
+def run_schedule_optimizer(run_id, budget_seconds=60, chains=None, work_orders=None,
+        makespan_weight=0.1, user=None):
+    """Background job: run annealing chains in parallel and keep the best schedule in Redis"""
+    snapshot = get_schedule_snapshot(work_orders)
+    problem = build_problem(snapshot)
+
+    baseline_order = get_start_order(problem, "fifo")
+    baseline = evaluate(problem, decode(problem, baseline_order), makespan_weight)
+    result = {
+        "run_id": run_id,
+        "status": "Running",
+        "taken_at": snapshot["now"],
+        "budget_seconds": budget_seconds,
+        "operations": len(problem["operations"]),
+        "baseline": baseline,
+        "best": baseline,
+        "best_chain": None,
+        "updates": get_updates(problem, decode(problem, baseline_order)),
+    }
+    save_result(run_id, result)
+
+    if problem["operations"]:
+        chains = chains or min(os.cpu_count() or 1, 8)
+        for chain, cost, starts in collect_chains(problem, chains, budget_seconds, makespan_weight):
+            if cost < result["best"]["cost"]:
+                result["best"] = evaluate(problem, starts, makespan_weight)
+                result["best_chain"] = chain
+                result["updates"] = get_updates(problem, starts)
+                save_result(run_id, result)
+
+    result["status"] = "Finished"
+    save_result(run_id, result)
+    if user:
+        frappe.publish_realtime(OPTIMIZER_EVENT,
+            {key: value for key, value in result.items() if key != "updates"}, user=user)
+    return run_id
+
+def collect_chains(problem, chains, budget_seconds, makespan_weight):
+    """Yield (chain, cost, starts) improvements from annealing chains as they arrive"""
+    # spawn: children must not inherit this worker's database connection or Redis sockets
+    context = multiprocessing.get_context("spawn")
+    improvements = context.Queue()
+    processes = []
+    try:
+        for chain in range(chains):
+            process = context.Process(target=run_chain, daemon=True, args=(
+                problem, chain, CHAIN_START_RULES[chain % len(CHAIN_START_RULES)],
+                budget_seconds, makespan_weight, improvements))
+            process.start()
+            processes.append(process)
+    except (OSError, RuntimeError):
+        if not processes:
+            # No child processes here: anneal in this process instead
+            yield from run_chain(problem, 0, CHAIN_START_RULES[0], budget_seconds, makespan_weight)
+            return
+
+    deadline = time.monotonic() + budget_seconds + 30
+    running = len(processes)
+    try:
+        while running and time.monotonic() < deadline:
+            try:
+                message = improvements.get(timeout=1)
+            except queue.Empty:
+                continue
+            if message[1] is None:
+                running -= 1
+            else:
+                yield message
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+def save_result(run_id, result):
+    frappe.cache.set_value(f"{OPTIMIZER_CACHE_KEY}::{run_id}", result, expires_in_sec=OPTIMIZER_RESULT_TTL)
+
+def build_problem(snapshot):
+    """Flatten a dispatch snapshot into indexed operations with routing precedence"""
+    fixed = defaultdict(list)
+    for workstation, start, end, name in snapshot["fixed"]:
+        fixed[workstation].append((start, end, name, None))
+
+    operations, routings, work_orders = [], [], []
+    for wo_index, wo in enumerate(snapshot["work_orders"]):
+        work_orders.append({"name": wo["name"], "due": wo["due"], "creation": wo["creation"],
+            "minutes": wo["minutes"]})
+        routing = []
+        for name, workstation, minutes in wo["operations"]:
+            routing.append(len(operations))
+            operations.append((name, workstation, minutes, wo_index))
+        routings.append(routing)
+
+    # Predecessor/successor within the routing, -1 at either end
+    predecessor = [-1] * len(operations)
+    successor = [-1] * len(operations)
+    for routing in routings:
+        for before, after in zip(routing, routing[1:]):
+            predecessor[after] = before
+            successor[before] = after
+
+    return {
+        "now": snapshot["now"],
+        "fixed": dict(fixed),
+        "operations": operations,
+        "work_orders": work_orders,
+        "routings": routings,
+        "predecessor": predecessor,
+        "successor": successor,
+    }
+
+def get_start_order(problem, rule):
+    """Operation order that places whole work orders in dispatch-rule order"""
+    now = problem["now"]
+    ranked = sorted(range(len(problem["work_orders"])),
+        key=lambda index: DISPATCH_RULES[rule](problem["work_orders"][index], now))
+    return [op for index in ranked for op in problem["routings"][index]]
+
+def decode(problem, order):
+    """Start time of every operation, placing them first-fit in ``order`` after their predecessor"""
+    now = problem["now"]
+    timelines = {}
+    starts = [None] * len(problem["operations"])
+    ends = [None] * len(problem["operations"])
+
+    for op in order:
+        name, workstation, minutes, _wo = problem["operations"][op]
+        duration = timedelta(minutes=minutes)
+        before = problem["predecessor"][op]
+        ready = ends[before] if before >= 0 else now
+        start = ready
+        if workstation:
+            timeline = timelines.get(workstation)
+            if timeline is None:
+                timeline = timelines[workstation] = WorkstationTimeline(problem["fixed"].get(workstation, ()))
+            start = timeline.first_free_slot(ready, duration)
+            timeline.reserve(start, start + duration, name)
+        starts[op] = start
+        ends[op] = start + duration
+
+    return starts
+
+def evaluate(problem, starts, makespan_weight):
+    """Cost (tardiness minutes + weighted makespan minutes) and metrics of a decoded schedule"""
+    now = problem["now"]
+    finish = now
+    tardiness = 0.0
+    late = 0
+
+    for index, routing in enumerate(problem["routings"]):
+        if not routing:
+            continue
+        last = routing[-1]
+        end = starts[last] + timedelta(minutes=problem["operations"][last][2])
+        finish = max(finish, end)
+        overdue = (end - problem["work_orders"][index]["due"]).total_seconds() / 60
+        if overdue > 0:
+            late += 1
+            tardiness += overdue
+
+    makespan = (finish - now).total_seconds() / 60
+    return {
+        "cost": round(tardiness + makespan_weight * makespan, 2),
+        "total_tardiness_minutes": round(tardiness, 1),
+        "makespan_minutes": round(makespan, 1),
+        "late_work_orders": late,
+    }
+
+def get_updates(problem, starts):
+    """bulk_update_schedule rows for a decoded schedule"""
+    return [
+        {"name": name, "start": starts[op], "end": starts[op] + timedelta(minutes=minutes)}
+        for op, (name, _workstation, minutes, _wo) in enumerate(problem["operations"])
+    ]
+
+def run_chain(problem, chain, start_rule, budget_seconds, makespan_weight, improvements=None):
+    """Simulated annealing over precedence-feasible operation orders
+
+    A move takes one operation and reinserts it elsewhere between its routing
+    predecessor and successor, which changes its position in its workstation's
+    sequence. Improvements go to ``improvements`` (a process queue) or, when run
+    in-process, are yielded.
+    """
+    def run():
+        rnd = random.Random(chain)
+        order = get_start_order(problem, start_rule)
+        starts = decode(problem, order)
+        cost = evaluate(problem, starts, makespan_weight)["cost"]
+        best_cost = cost
+        yield chain, best_cost, starts
+
+        size = len(order)
+        started = time.monotonic()
+        temperature_0 = max(1.0, 0.02 * cost)
+        pending = None
+        last_report = started
+
+        while size > 1:
+            elapsed = time.monotonic() - started
+            if elapsed >= budget_seconds:
+                break
+
+            position = {op: index for index, op in enumerate(order)}
+            source = rnd.randrange(size)
+            op = order[source]
+            before, after = problem["predecessor"][op], problem["successor"][op]
+            low = position[before] + 1 if before >= 0 else 0
+            high = position[after] - 1 if after >= 0 else size - 1
+            if high <= low:
+                continue
+            target = rnd.randint(low, high)
+            if target == source:
+                continue
+
+            candidate = order[:source] + order[source + 1:]
+            candidate.insert(target, op)
+            candidate_starts = decode(problem, candidate)
+            candidate_cost = evaluate(problem, candidate_starts, makespan_weight)["cost"]
+
+            temperature = temperature_0 * (1 - elapsed / budget_seconds) + 1e-9
+            delta = candidate_cost - cost
+            if delta <= 0 or rnd.random() < math.exp(-delta / temperature):
+                order, cost = candidate, candidate_cost
+                if cost < best_cost:
+                    best_cost = cost
+                    pending = (chain, best_cost, candidate_starts)
+
+            if pending and time.monotonic() - last_report >= REPORT_EVERY_SECONDS:
+                yield pending
+                pending, last_report = None, time.monotonic()
+
+        if pending:
+            yield pending
+
+    if improvements is None:
+        return run()
+
+    try:
+        for message in run():
+            improvements.put(message)
+    finally:
+        improvements.put((chain, None, None))
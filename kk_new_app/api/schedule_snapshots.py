@@ -0,0 +1,142 @@
+import json
+
+import frappe
+from frappe.utils import add_to_date, cint, get_datetime, now_datetime
+
+from kk_new_app.api.instrumentation import instrumented, span
+from kk_new_app.api.schedule_writer import (
+    BULK_UPDATE_CHUNK_SIZE,
+    RESOURCE_FIELDS,
+    SCHEDULE_FIELDS,
+    bulk_update_schedule,
+)
+
+SNAPSHOT_DOCTYPE = "Schedule Snapshot"
+
+# Snapshots older than this are deleted by the daily job
+SNAPSHOT_RETENTION_DAYS = 30
+
+def take_schedule_snapshot(doctype, updates, reason):
+    """Record the schedule the ``updates`` rows are about to replace; returns the snapshot name
+
+    Rows may carry their current values as "old_start"/"old_end" (as cascades do);
+    the others are read with one query per chunk. Rows that do not change are left out.
+    """
+    resource_field = RESOURCE_FIELDS.get(doctype)
+    missing = [row["name"] for row in updates if "old_start" not in row]
+    current = get_current_schedule(doctype, missing) if missing else {}
+
+    columns = ["name", "old_start", "old_end", "new_start", "new_end"]
+    if resource_field:
+        columns += ["old_workstation", "new_workstation"]
+
+    changes = []
+    for row in updates:
+        if "old_start" in row:
+            old = (row["old_start"], row["old_end"], row.get("old_workstation"))
+        elif row["name"] in current:
+            old = current[row["name"]]
+        else:
+            continue
+        new = (row["start"], row["end"], row.get("workstation") or old[2])
+        if to_schedule(old) == to_schedule(new):
+            continue
+
+        values = [row["name"], old[0], old[1], new[0], new[1]]
+        if resource_field:
+            values += [old[2], new[2]]
+        changes.append(values)
+
+    if not changes:
+        return None
+
+    snapshot = frappe.get_doc({
+        "doctype": SNAPSHOT_DOCTYPE,
+        "reference_doctype": doctype,
+        "reason": reason[:140],
+        "row_count": len(changes),
+        "changes": json.dumps({"columns": columns, "rows": changes}, default=str, separators=(",", ":")),
+    }).insert(ignore_permissions=True)
+    return snapshot.name
+
+@frappe.whitelist(methods=["POST"])
+@instrumented
+def restore_schedule_snapshot(snapshot, force=0):
+    """Put a snapshot's rows back on their previous schedule with one bulk update
+
+    Rows that changed again after the snapshot are reported instead of overwritten,
+    unless ``force`` is set.
+    """
+    doc = frappe.get_doc(SNAPSHOT_DOCTYPE, snapshot)
+    doctype = doc.reference_doctype
+    frappe.has_permission(doctype, "write", throw=True)
+    if doc.restored_on:
+        frappe.throw(f"Schedule Snapshot {snapshot} was already restored on {doc.restored_on}")
+
+    changes = frappe.parse_json(doc.changes)
+    rows = [dict(zip(changes["columns"], values)) for values in changes["rows"]]
+
+    with span("query") as query:
+        current = get_current_schedule(doctype, [row["name"] for row in rows])
+        query.rows = len(current)
+
+    drifted = [
+        row["name"] for row in rows
+        if row["name"] in current
+        and to_schedule(current[row["name"]]) != to_schedule((row["new_start"], row["new_end"], row.get("new_workstation")))
+    ]
+    if drifted and not cint(force):
+        frappe.throw(f"{len(drifted)} rows changed after this snapshot, e.g. {', '.join(drifted[:5])}. "
+            "Restore with force to overwrite them")
+
+    updates = []
+    for row in rows:
+        if row["name"] not in current:
+            # Deleted since the snapshot
+            continue
+        update = {"name": row["name"], "start": to_datetime(row["old_start"]), "end": to_datetime(row["old_end"])}
+        if row.get("old_workstation"):
+            update["workstation"] = row["old_workstation"]
+        updates.append(update)
+
+    workstations = None
+    if RESOURCE_FIELDS.get(doctype):
+        workstations = ({row.get("old_workstation") for row in rows} | {value[2] for value in current.values()}) - {None}
+
+    with span("save"):
+        bulk_update_schedule(doctype, updates, workstations)
+        doc.db_set({"restored_on": now_datetime(), "restored_by": frappe.session.user})
+    return {"snapshot": snapshot, "restored": len(updates), "skipped": len(rows) - len(updates)}
+
+@frappe.whitelist()
+def get_schedule_snapshots(reference_doctype=None, limit=20):
+    """Most recent snapshots, newest first"""
+    filters = {"reference_doctype": reference_doctype} if reference_doctype else {}
+    return frappe.get_list(SNAPSHOT_DOCTYPE, filters=filters,
+        fields=["name", "creation", "owner", "reference_doctype", "reason", "row_count", "restored_on"],
+        order_by="creation desc", limit_page_length=cint(limit))
+
+def get_current_schedule(doctype, names):
+    """{name: (start, end, workstation or None)} read in chunks"""
+    start_field, end_field = SCHEDULE_FIELDS[doctype]
+    resource_field = RESOURCE_FIELDS.get(doctype)
+    fields = ["name", start_field, end_field] + ([resource_field] if resource_field else [])
+
+    current = {}
+    for offset in range(0, len(names), BULK_UPDATE_CHUNK_SIZE):
+        for row in frappe.get_all(doctype, filters={"name": ["in", names[offset:offset + BULK_UPDATE_CHUNK_SIZE]]},
+                fields=fields, as_list=True):
+            current[row[0]] = (row[1], row[2], row[3] if resource_field else None)
+    return current
+
+def to_datetime(value):
+    # get_datetime(None) would mean "now"
+    return get_datetime(value) if value else None
+
+def to_schedule(values):
+    start, end, workstation = values
+    return to_datetime(start), to_datetime(end), workstation or None
+
+def delete_old_schedule_snapshots():
+    """Daily job: drop snapshots past the retention period"""
+    frappe.db.delete(SNAPSHOT_DOCTYPE, {"creation": ["<", add_to_date(now_datetime(), days=-SNAPSHOT_RETENTION_DAYS)]})
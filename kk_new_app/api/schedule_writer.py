@@ -0,0 +1,93 @@
+import frappe
+from frappe.utils import now_datetime
+
+from kk_new_app.api.response_cache import bump_record_versions, bump_response_versions
+from kk_new_app.api.schedule_events import publish_schedule_changes
+from kk_new_app.api.workstation_load import get_job_card_load_days, queue_workstation_load_refresh
+from kk_new_app.api.workstation_timeline import bump_timeline_versions
+
+SCHEDULE_FIELDS = {
+    "Job Card": ("expected_start_date", "expected_end_date"),
+    "Work Order": ("planned_start_date", "planned_end_date"),
+}
+
+# Rows may also carry a new resource under "workstation" for these doctypes
+RESOURCE_FIELDS = {
+    "Job Card": "workstation",
+}
+
+BULK_UPDATE_CHUNK_SIZE = 500
+
+def bulk_update_schedule(doctype, updates, workstations=None):
+    """Write ``{"name", "start", "end"}`` rows with bulk UPDATEs, then fire our schedule hooks
+
+    Rows that also set "workstation" move the card; pass ``workstations`` (old and new)
+    then, so both indexes are invalidated. Returns the ``modified`` stamped on the rows.
+    """
+    if not updates:
+        return
+
+    start_field, end_field = SCHEDULE_FIELDS[doctype]
+    resource_field = RESOURCE_FIELDS.get(doctype)
+    modified = now_datetime()
+
+    # Days the rows occupy before the move; the days after it are read once written
+    load_days = get_job_card_load_days([row["name"] for row in updates]) if doctype == "Job Card" else None
+
+    for offset in range(0, len(updates), BULK_UPDATE_CHUNK_SIZE):
+        chunk = updates[offset:offset + BULK_UPDATE_CHUNK_SIZE]
+        start_cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+        end_cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+        placeholders = ", ".join(["%s"] * len(chunk))
+        moved = [row for row in chunk if resource_field and row.get("workstation")]
+
+        values = []
+        for row in chunk:
+            values.extend([row["name"], row["start"]])
+        for row in chunk:
+            values.extend([row["name"], row["end"]])
+        resource_set = ""
+        if moved:
+            resource_cases = " ".join(["WHEN %s THEN %s"] * len(moved))
+            resource_set = f"`{resource_field}` = CASE name {resource_cases} ELSE `{resource_field}` END,"
+            for row in moved:
+                values.extend([row["name"], row["workstation"]])
+        values.extend([modified, frappe.session.user])
+        values.extend(row["name"] for row in chunk)
+
+        frappe.db.sql(f"""
+            UPDATE `tab{doctype}`
+            SET `{start_field}` = CASE name {start_cases} END,
+                `{end_field}` = CASE name {end_cases} END,
+                {resource_set}
+                modified = %s,
+                modified_by = %s
+            WHERE name IN ({placeholders})
+        """, values)
+
+    # The document lifecycle is skipped, so repeat what our own doc events do
+    if load_days is not None:
+        queue_workstation_load_refresh(load_days | get_job_card_load_days([row["name"] for row in updates]))
+    notify_schedule_change(doctype, [row["name"] for row in updates], workstations)
+    return modified
+
+def notify_schedule_change(doctype, names, workstations=None):
+    """Run the side effects of the schedule doc events for rows updated in bulk"""
+    if doctype == "Job Card":
+        if workstations is None:
+            workstations = frappe.get_all("Job Card", filters={"name": ["in", names]},
+                pluck="workstation", distinct=True)
+        bump_timeline_versions(workstations)
+        frappe.db.after_commit.add(lambda: bump_timeline_versions(workstations))
+
+    work_orders = names if doctype == "Work Order" else frappe.get_all("Job Card",
+        filters={"name": ["in", names]}, pluck="work_order", distinct=True)
+
+    def bump_versions():
+        bump_response_versions([doctype])
+        bump_record_versions("Work Order", work_orders)
+
+    bump_versions()
+    frappe.db.after_commit.add(bump_versions)
+
+    publish_schedule_changes(doctype, names)
@@ -0,0 +1,56 @@
+import json
+
+import frappe
+from werkzeug.wrappers import Response
+
+def stream_response(chunks, mimetype, filename=None):
+    """Response that writes an iterable of str chunks as they are produced
+
+    Whitelisted methods can return this directly. The body is written after the
+    handler returns, when frappe.destroy() has already closed the connection and
+    released frappe.local, so iteration runs inside its own site context.
+    """
+    response = Response(with_site_context(chunks), mimetype=mimetype)
+    if filename:
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+def ndjson_response(records, filename=None):
+    """Stream an iterable of dicts as newline-delimited JSON, one record per line"""
+    def generate():
+        for record in records:
+            yield json.dumps(record, default=str, separators=(",", ":")) + "\n"
+
+    return stream_response(generate(), "application/x-ndjson", filename)
+
+def with_site_context(chunks):
+    """Re-open the request's site, connection and user around a lazy iterable
+
+    Generators passed in must not have started yet: their queries run on the new
+    connection, which is closed (and frappe.local released again) when the body is
+    done or the client goes away.
+    """
+    if getattr(frappe.local, "request", None) is None:
+        # bench execute or tests: nothing is torn down after the call returns
+        return chunks
+
+    # Read now, while the request context still exists
+    site = frappe.local.site
+    sites_path = frappe.local.sites_path
+    user = frappe.session.user
+
+    def generate():
+        if getattr(frappe.local, "site", None):
+            # Iterated before the request was torn down (e.g. by a test client)
+            yield from chunks
+            return
+
+        frappe.init(site, sites_path=sites_path)
+        try:
+            frappe.connect()
+            frappe.set_user(user)
+            yield from chunks
+        finally:
+            frappe.destroy()
+
+    return generate()
@@ -1,158 +1,397 @@
 import frappe
-from frappe.utils import get_datetime, add_to_date, now_datetime, time_diff_in_hours
+from frappe.utils import get_datetime, add_to_date, now_datetime, time_diff_in_hours, cint, flt
 from frappe.utils import get_datetime
 from frappe.utils import time_diff_in_hours
 import hashlib
+import re
+from datetime import timedelta
+
+from kk_new_app.api.availability import (
+    get_availability,
+    get_company_holiday_list,
+    get_workstation_availability,
+    get_working_calendar,
+)
+from kk_new_app.api.instrumentation import instrumented, span, trace_event
+from kk_new_app.api.response_cache import cached_response
+from kk_new_app.api.workstation_load import get_load_days, get_utilization, queue_workstation_load_refresh
+from kk_new_app.api.workstation_timeline import WorkstationTimeline, get_workstation_timeline, load_workstation_timelines
+
+# Changes are re-read with a small overlap so rows saved just before the cursor but
+# committed just after it are not missed; clients apply upserts idempotently.
+SYNC_CURSOR_OVERLAP_SECONDS = 5
+
+JOB_CARD_EVENT_QUERY = """
+    SELECT 
+        jc.name,
+        jc.operation,
+        jc.workstation,
+        jc.expected_start_date,
+        jc.expected_end_date,
+        jc.actual_start_date,
+        jc.actual_end_date,
+        jc.status,
+        jc.docstatus,
+        jc.modified,
+        jc.work_order,
+        jc.total_completed_qty,
+        jc.for_quantity,
+        jc.operation_id,
+        jc.sequence_id,
+        wo.production_item,
+        wo.qty as work_order_qty,
+        wo.planned_start_date as wo_start,
+        wo.planned_end_date as wo_end,
+        ws.workstation_type,
+        ws.workstation_name
+    FROM `tabJob Card` jc
+    LEFT JOIN `tabWork Order` wo ON jc.work_order = wo.name
+    LEFT JOIN `tabWorkstation` ws ON jc.workstation = ws.name
+    WHERE {conditions}
+    ORDER BY jc.work_order, jc.sequence_id, jc.expected_start_date
+"""
+
+# A Work Order with all its Job Cards in routing order, for the form dashboard
+WORK_ORDER_DASHBOARD_QUERY = """
+    SELECT
+        wo.name as work_order,
+        wo.planned_start_date,
+        wo.planned_end_date,
+        wo.expected_delivery_date,
+        jc.name,
+        jc.operation,
+        jc.workstation,
+        jc.status,
+        jc.docstatus,
+        jc.expected_start_date,
+        jc.expected_end_date,
+        jc.actual_start_date,
+        jc.actual_end_date,
+        jc.total_completed_qty,
+        jc.for_quantity,
+        jc.sequence_id
+    FROM `tabWork Order` wo
+    LEFT JOIN `tabJob Card` jc ON jc.work_order = wo.name
+    WHERE wo.name = %(work_order)s
+    ORDER BY jc.sequence_id, jc.operation_id
+"""
+
+# Doctypes each cached calendar response is built from
+WORK_ORDER_CACHE_DOCTYPES = ("Work Order",)
+JOB_CARD_CACHE_DOCTYPES = ("Job Card", "Work Order", "Workstation")
+RESOURCE_CACHE_DOCTYPES = ("Workstation", "Workstation Type")
+
+# Workstations at or above this utilization over a Work Order's span are flagged
+OVERLOAD_UTILIZATION = 90
+
+# How far either side of a requested interval the availability check reads bookings
+AVAILABILITY_SEARCH_DAYS = 14
+
+# Job Cards in these states are history: shown read-only on the calendar and never moved
+LOCKED_JOB_CARD_STATUSES = ("Completed", "Cancelled")
 
 @frappe.whitelist()
-def get_scheduled_work_orders():
-    """Get Work Orders for calendar display - keeping existing functionality"""
-    work_orders = frappe.get_all("Work Order", filters={"docstatus": ["<", 2]},
-        fields=["name", "planned_start_date", "planned_end_date", "production_item", "qty", "expected_delivery_date"])
-    events = []
-    for wo in work_orders:
-        events.append({
-            "id": wo.name,
-            "title": wo.production_item,
-            "start": wo.planned_start_date,
-            "end": wo.planned_end_date,
-            "extendedProps": {
-                "qty": wo.qty,
-                "delivery": wo.expected_delivery_date,
-                "type": "work_order"
-            },
-            "className": "work-order-event"
-        })
-    return events
+@instrumented
+def get_scheduled_work_orders(start=None, end=None):
+    """Get Work Orders for calendar display, limited to the visible window when given"""
+    return get_work_order_events_response(start, end)["data"]
+
+def get_work_order_events_response(start=None, end=None, if_none_match=None):
+    """Versioned Work Order events of a window, shared by every planner viewing it"""
+    window = get_calendar_window(start, end)
+    return cached_response("work_orders", WORK_ORDER_CACHE_DOCTYPES, {"window": window},
+        lambda: build_work_order_events(*window), if_none_match)
+
+def build_work_order_events(window_start=None, window_end=None):
+    """Query and serialize the Work Order events overlapping the window"""
+    filters = {"docstatus": ["<", 2]}
+    if window_start and window_end:
+        # Interval overlap: planned_start < window end AND planned_end > window start
+        filters["planned_start_date"] = ["<", window_end]
+        filters["planned_end_date"] = [">", window_start]
+
+    with span("query") as query:
+        work_orders = frappe.get_all("Work Order", filters=filters,
+            fields=["name", "planned_start_date", "planned_end_date", "production_item", "qty", "expected_delivery_date"])
+        query.rows = len(work_orders)
+    with span("serialize"):
+        return [get_work_order_event(wo) for wo in work_orders]
+
+def get_work_order_event(wo):
+    """Build the calendar event dict for a Work Order row"""
+    return {
+        "id": wo.name,
+        "title": wo.production_item,
+        "start": wo.planned_start_date,
+        "end": wo.planned_end_date,
+        "extendedProps": {
+            "qty": wo.qty,
+            "delivery": wo.expected_delivery_date,
+            "type": "work_order"
+        },
+        "className": "work-order-event"
+    }
 
 @frappe.whitelist()
-def get_job_cards_with_workstations():
-    """Get Job Cards (Operations) with workstation information for resource-based calendar view"""
-    
-    # Debug: Let's see what job cards exist
-    debug_query = """
-        SELECT 
-            jc.name,
-            jc.operation,
-            jc.workstation,
-            jc.expected_start_date,
-            jc.expected_end_date,
-            jc.status,
-            jc.work_order,
-            jc.docstatus
-        FROM `tabJob Card` jc
-        ORDER BY jc.creation DESC
-        LIMIT 10
+@instrumented
+def get_job_cards_with_workstations(start=None, end=None, workstation=None, workstation_type=None,
+        format=None):
+    """Get Job Cards (Operations) overlapping the visible window for resource-based calendar view
+
+    ``format="columnar"`` returns the compact payload of ``get_job_card_columns`` instead
+    of one event dict per card.
     """
-    debug_results = frappe.db.sql(debug_query, as_dict=True)
-    print(f"DEBUG: Found {len(debug_results)} total job cards")
-    for jc in debug_results:
-        print(f"  - {jc.name}: {jc.operation}, WS: {jc.workstation}, Status: {jc.docstatus}, Dates: {jc.expected_start_date} to {jc.expected_end_date}")
-    
-    job_cards = frappe.db.sql("""
-        SELECT 
-            jc.name,
-            jc.operation,
-            jc.workstation,
-            jc.expected_start_date,
-            jc.expected_end_date,
-            jc.actual_start_date,
-            jc.actual_end_date,
-            jc.status,
-            jc.work_order,
-            jc.total_completed_qty,
-            jc.for_quantity,
-            jc.operation_id,
-            jc.sequence_id,
-            wo.production_item,
-            wo.qty as work_order_qty,
-            wo.planned_start_date as wo_start,
-            wo.planned_end_date as wo_end,
-            ws.workstation_type,
-            ws.workstation_name
-        FROM `tabJob Card` jc
-        LEFT JOIN `tabWork Order` wo ON jc.work_order = wo.name
-        LEFT JOIN `tabWorkstation` ws ON jc.workstation = ws.name
-        WHERE jc.docstatus < 2
-        AND jc.expected_start_date IS NOT NULL
-        AND jc.expected_end_date IS NOT NULL
-        ORDER BY jc.work_order, jc.sequence_id, jc.expected_start_date
-    """, as_dict=True)
-    
-    print(f"DEBUG: Found {len(job_cards)} scheduled job cards")
-    
-    events = []
+    return get_job_card_events_response(start, end, workstation, workstation_type, format=format)["data"]
+
+def get_job_card_events_response(start=None, end=None, workstation=None, workstation_type=None,
+        if_none_match=None, format=None):
+    """Versioned Job Card events of a window and filter, shared by every planner viewing it"""
+    if format not in (None, "events", "columnar"):
+        frappe.throw(f"Unknown event format {format}. Use events or columnar")
+
+    window = get_calendar_window(start, end)
+    params = {"window": window, "workstation": workstation, "workstation_type": workstation_type}
+    endpoint = "job_card_columns" if format == "columnar" else "job_cards"
+    return cached_response(endpoint, JOB_CARD_CACHE_DOCTYPES, params,
+        lambda: build_job_card_events(*window, workstation, workstation_type, format), if_none_match)
+
+def build_job_card_events(window_start=None, window_end=None, workstation=None, workstation_type=None,
+        format=None):
+    """Query and serialize the Job Card events overlapping the window"""
+    conditions = [
+        "jc.docstatus < 2",
+        "jc.expected_start_date IS NOT NULL",
+        "jc.expected_end_date IS NOT NULL",
+    ]
+    values = {}
+
+    if window_start and window_end:
+        conditions.append("jc.expected_start_date < %(window_end)s")
+        conditions.append("jc.expected_end_date > %(window_start)s")
+        values["window_start"] = window_start
+        values["window_end"] = window_end
+
+    if workstation:
+        conditions.append("jc.workstation = %(workstation)s")
+        values["workstation"] = workstation
+
+    if workstation_type:
+        conditions.append("ws.workstation_type = %(workstation_type)s")
+        values["workstation_type"] = workstation_type
+
+    with span("query") as query:
+        job_cards = get_job_card_rows(conditions, values)
+        query.rows = len(job_cards)
+    with span("serialize"):
+        if format == "columnar":
+            return get_job_card_columns(job_cards)
+        return [get_job_card_event(jc) for jc in job_cards]
+
+def get_job_card_rows(conditions, values):
+    """Run the shared Job Card calendar query with the given WHERE conditions"""
+    return frappe.db.sql(
+        JOB_CARD_EVENT_QUERY.format(conditions=" AND ".join(conditions)), values, as_dict=True
+    )
+
+def get_job_card_event(jc):
+    """Build the calendar event dict for a Job Card row"""
+    # Determine color based on status
+    color = get_job_card_color(jc.status)
+    
+    # Smart date selection: use actual for completed, expected for planning
+    if jc.status in LOCKED_JOB_CARD_STATUSES:
+        # For completed operations, show actual times (read-only for history)
+        start_date = jc.actual_start_date or jc.expected_start_date
+        end_date = jc.actual_end_date or jc.expected_end_date
+        is_editable = False  # Completed operations shouldn't be rescheduled
+    else:
+        # For ongoing/future operations, show expected times (editable for planning)
+        start_date = jc.expected_start_date
+        end_date = jc.expected_end_date  
+        is_editable = True
+    
+    # Create title showing actual job card name and operation
+    title = f"{jc.name}: {jc.operation}"  # Use actual job card name
+    sequence = f"Op{jc.sequence_id or jc.operation_id or '?'}"
+    
+    return {
+        "id": jc.name,
+        "title": title,
+        "start": start_date,
+        "end": end_date,
+        "resourceId": jc.workstation,
+        "backgroundColor": color,
+        "borderColor": get_work_order_border_color(jc.work_order),
+        "borderWidth": "3px",  # Thick border to show work order relationship
+        "editable": is_editable,  # Control draggability based on status
+        "extendedProps": {
+            "type": "operation",
+            "job_card_name": jc.name,  # Add actual job card name
+            "operation": jc.operation,
+            "sequence": sequence,
+            "workstation": jc.workstation,
+            "workstation_type": jc.workstation_type,
+            "work_order": jc.work_order,
+            "production_item": jc.production_item,
+            "status": jc.status,
+            "completed_qty": jc.total_completed_qty,
+            "for_quantity": jc.for_quantity,
+            "work_order_qty": jc.work_order_qty,
+            "wo_start": jc.wo_start,
+            "wo_end": jc.wo_end,
+            "is_editable": is_editable,
+            "display_mode": "completed" if not is_editable else "planning",
+            # Version token sent back with a drag so stale writes are refused
+            "modified": jc.modified
+        }
+    }
+
+def get_job_card_columns(job_cards):
+    """Encode Job Card rows as column arrays plus lookup tables, expanded again by the calendar
+
+    Repeated strings (operations, sequences, statuses, workstations, work orders) are
+    sent once in ``lookups`` and referenced by index; per-work-order values such as the
+    border colour are computed once per payload instead of once per event.
+    """
+    lookups = {"operations": [], "sequences": [], "statuses": [], "workstations": [], "work_orders": []}
+    indexes = {table: {} for table in lookups}
+
+    def encode(table, key, build=None):
+        index = indexes[table].get(key)
+        if index is None:
+            index = indexes[table][key] = len(lookups[table])
+            lookups[table].append(build() if build else key)
+        return index
+
+    columns = {
+        "id": [], "start": [], "end": [], "operation": [], "sequence": [], "status": [],
+        "workstation": [], "work_order": [], "completed_qty": [], "for_quantity": [], "modified": [],
+    }
+
     for jc in job_cards:
-        # Determine color based on status
-        color = get_job_card_color(jc.status)
-        
-        # Smart date selection: use actual for completed, expected for planning
-        if jc.status in ['Completed', 'Cancelled']:
-            # For completed operations, show actual times (read-only for history)
+        # Same date rule as get_job_card_event: actual times for finished cards
+        if jc.status in ("Completed", "Cancelled"):
             start_date = jc.actual_start_date or jc.expected_start_date
             end_date = jc.actual_end_date or jc.expected_end_date
-            is_editable = False  # Completed operations shouldn't be rescheduled
         else:
-            # For ongoing/future operations, show expected times (editable for planning)
             start_date = jc.expected_start_date
-            end_date = jc.expected_end_date  
-            is_editable = True
-        
-        # Create title showing actual job card name and operation
-        title = f"{jc.name}: {jc.operation}"  # Use actual job card name
-        sequence = f"Op{jc.sequence_id or jc.operation_id or '?'}"
-        
-        events.append({
-            "id": jc.name,
-            "title": title,
-            "start": start_date,
-            "end": end_date,
-            "resourceId": jc.workstation,
-            "backgroundColor": color,
-            "borderColor": get_work_order_border_color(jc.work_order),
-            "borderWidth": "3px",  # Thick border to show work order relationship
-            "editable": is_editable,  # Control draggability based on status
-            "extendedProps": {
-                "type": "operation",
-                "job_card_name": jc.name,  # Add actual job card name
-                "operation": jc.operation,
-                "sequence": sequence,
-                "workstation": jc.workstation,
-                "workstation_type": jc.workstation_type,
-                "work_order": jc.work_order,
-                "production_item": jc.production_item,
-                "status": jc.status,
-                "completed_qty": jc.total_completed_qty,
-                "for_quantity": jc.for_quantity,
-                "work_order_qty": jc.work_order_qty,
-                "wo_start": jc.wo_start,
-                "wo_end": jc.wo_end,
-                "is_editable": is_editable,
-                "display_mode": "completed" if not is_editable else "planning"
-            }
-        })
-    
-    print(f"DEBUG: Returning {len(events)} operation events")
-    return events
+            end_date = jc.expected_end_date
+
+        columns["id"].append(jc.name)
+        columns["start"].append(start_date)
+        columns["end"].append(end_date)
+        columns["operation"].append(encode("operations", jc.operation))
+        columns["sequence"].append(encode("sequences", f"Op{jc.sequence_id or jc.operation_id or '?'}"))
+        columns["status"].append(encode("statuses", jc.status, lambda: {
+            "name": jc.status,
+            "color": get_job_card_color(jc.status),
+            "editable": jc.status not in LOCKED_JOB_CARD_STATUSES,
+        }))
+        columns["workstation"].append(encode("workstations", jc.workstation, lambda: {
+            "name": jc.workstation,
+            "workstation_type": jc.workstation_type,
+        }))
+        columns["work_order"].append(encode("work_orders", jc.work_order, lambda: {
+            "name": jc.work_order,
+            "production_item": jc.production_item,
+            "qty": jc.work_order_qty,
+            "start": jc.wo_start,
+            "end": jc.wo_end,
+            "border_color": get_work_order_border_color(jc.work_order) if jc.work_order else None,
+        }))
+        columns["completed_qty"].append(jc.total_completed_qty)
+        columns["for_quantity"].append(jc.for_quantity)
+        columns["modified"].append(jc.modified)
+
+    return {"format": "columnar", "count": len(job_cards), "columns": columns, "lookups": lookups}
 
 @frappe.whitelist()
-def get_workstations_resources():
-    """Get workstations grouped by type for calendar resource view"""
-    workstations = frappe.db.sql("""
-        SELECT 
-            ws.name,
-            ws.workstation_name,
-            ws.workstation_type,
-            ws.status,
-            wst.name as workstation_type_name
-        FROM `tabWorkstation` ws
-        LEFT JOIN `tabWorkstation Type` wst ON ws.workstation_type = wst.name
-        ORDER BY ws.workstation_type, ws.workstation_name
-    """, as_dict=True)
-    
-    print(f"DEBUG: Found {len(workstations)} workstations")
-    for ws in workstations:
-        print(f"  - {ws.workstation_name} ({ws.name}): Type={ws.workstation_type}, Status={ws.status}")
+@instrumented
+def get_schedule_changes(kind="operations", since=None, start=None, end=None,
+        workstation=None, workstation_type=None, if_none_match=None, format=None):
+    """Return calendar events created, changed or removed since the given cursor"""
+    cursor = now_datetime()
+
+    # Without a cursor the whole visible window is returned as upserts, or just
+    # "not_modified" when the client already holds the current version of it
+    if not since:
+        if kind == "work_orders":
+            response = get_work_order_events_response(start, end, if_none_match)
+        else:
+            response = get_job_card_events_response(start, end, workstation, workstation_type,
+                if_none_match, format)
+
+        if response.get("not_modified"):
+            return {"cursor": cursor, "version": response["version"], "not_modified": 1}
+        if format == "columnar" and kind != "work_orders":
+            return {"cursor": cursor, "version": response["version"], "columnar": response["data"], "removed": []}
+        return {"cursor": cursor, "version": response["version"], "upserts": response["data"], "removed": []}
+
+    since = add_to_date(get_datetime(since), seconds=-SYNC_CURSOR_OVERLAP_SECONDS)
+    window_start = parse_calendar_datetime(start) if start else None
+    window_end = parse_calendar_datetime(end) if end else None
+
+    def in_window(row_start, row_end):
+        if not (row_start and row_end):
+            return False
+        if window_start and window_end:
+            return get_datetime(row_start) < window_end and get_datetime(row_end) > window_start
+        return True
+
+    # "removed" covers cancelled rows and rows that moved out of the window or filters
+    upserts, removed = [], []
+
+    if kind == "work_orders":
+        doctype = "Work Order"
+        changed = frappe.get_all("Work Order", filters={"modified": [">=", since]},
+            fields=["name", "docstatus", "planned_start_date", "planned_end_date", "production_item",
+                "qty", "expected_delivery_date"])
+        for wo in changed:
+            if wo.docstatus < 2 and in_window(wo.planned_start_date, wo.planned_end_date):
+                upserts.append(get_work_order_event(wo))
+            else:
+                removed.append(wo.name)
+    else:
+        doctype = "Job Card"
+        changed = get_job_card_rows(["jc.modified >= %(since)s"], {"since": since})
+        for jc in changed:
+            matches_filters = (not workstation or jc.workstation == workstation) and (
+                not workstation_type or jc.workstation_type == workstation_type)
+            if jc.docstatus < 2 and matches_filters and in_window(jc.expected_start_date, jc.expected_end_date):
+                upserts.append(get_job_card_event(jc))
+            else:
+                removed.append(jc.name)
+
+    # Tombstones for documents deleted outright
+    removed.extend(frappe.get_all("Deleted Document",
+        filters={"deleted_doctype": doctype, "creation": [">=", since]},
+        pluck="deleted_name"))
+
+    return {"cursor": cursor, "upserts": upserts, "removed": removed}
+
+@frappe.whitelist()
+@instrumented
+def get_workstations_resources(if_none_match=None):
+    """Get workstations grouped by type for calendar resource view, as a versioned response"""
+    return cached_response("resources", RESOURCE_CACHE_DOCTYPES, {}, build_workstation_resources, if_none_match)
+
+def build_workstation_resources():
+    """Query workstations and build the FullCalendar resource tree"""
+    with span("query") as query:
+        workstations = frappe.db.sql("""
+            SELECT 
+                ws.name,
+                ws.workstation_name,
+                ws.workstation_type,
+                ws.status,
+                wst.name as workstation_type_name
+            FROM `tabWorkstation` ws
+            LEFT JOIN `tabWorkstation Type` wst ON ws.workstation_type = wst.name
+            ORDER BY ws.workstation_type, ws.workstation_name
+        """, as_dict=True)
+        query.rows = len(workstations)
+    
+    trace_event(f"Found {len(workstations)} workstations")
     
     resources = []
     workstation_types = {}
@@ -185,9 +424,20 @@ def get_workstations_resources():
                 }
             })
     
-    print(f"DEBUG: Created {len(resources)} resource groups")
+    trace_event(f"Created {len(resources)} resource groups")
     return resources
 
+def get_calendar_window(start=None, end=None):
+    """(window start, window end) parsed from the calendar, or (None, None) for no window"""
+    if not (start and end):
+        return None, None
+    return parse_calendar_datetime(start), parse_calendar_datetime(end)
+
+def parse_calendar_datetime(value):
+    """Parse an ISO datetime sent by FullCalendar, dropping any timezone offset"""
+    value = re.sub(r"(Z|[+-]\d{2}:?\d{2})$", "", str(value).strip())
+    return get_datetime(value.replace("T", " "))
+
 def get_job_card_color(status):
     """Return color based on job card status"""
     status_colors = {
@@ -219,105 +469,379 @@ def get_work_order_border_color(work_order_name):
     return f"rgb({r},{g},{b})"
 
 @frappe.whitelist()
-def update_work_order_schedule(name, new_start, new_end):
-    """Update Work Order schedule - keeping existing functionality"""
-    wo = frappe.get_doc("Work Order", name)
-    wo.planned_start_date = get_datetime(new_start.split("+")[0])
-    wo.planned_end_date = get_datetime(new_end.split("+")[0])
-    wo.save()
-    shift_following_work_orders(wo.name)
-    return "Updated"
+@instrumented
+def get_work_order_dashboard(work_order, modified=None):
+    """Job Cards, status counts, scheduled span, workstation load and delivery risks of a Work Order
+
+    Cached per Work Order ``modified`` (as the form has it) and a version of its own that
+    changes with the Work Order and its Job Cards only. Loads of shared workstations
+    may therefore lag other orders' changes by up to RESPONSE_CACHE_TTL.
+    """
+    frappe.has_permission("Work Order", "read", doc=work_order, throw=True)
+    return cached_response("work_order_dashboard", (),
+        {"work_order": work_order, "modified": modified},
+        lambda: build_work_order_dashboard(work_order), records=[("Work Order", work_order)])["data"]
+
+def build_work_order_dashboard(work_order):
+    with span("query") as query:
+        rows = frappe.db.sql(WORK_ORDER_DASHBOARD_QUERY, {"work_order": work_order}, as_dict=True)
+        query.rows = len(rows)
+    if not rows:
+        frappe.throw(f"Work Order {work_order} not found")
+
+    wo = rows[0]
+    job_cards = [row for row in rows if row.name]
+    active = [jc for jc in job_cards if jc.docstatus < 2 and jc.status != "Cancelled"]
+    scheduled = [jc for jc in active if jc.expected_start_date and jc.expected_end_date]
+
+    status_counts = {}
+    for jc in job_cards:
+        status_counts[jc.status] = status_counts.get(jc.status, 0) + 1
+
+    span_start = min((get_datetime(jc.expected_start_date) for jc in scheduled), default=None)
+    span_end = max((get_datetime(jc.expected_end_date) for jc in scheduled), default=None)
+
+    workstation_load = []
+    if scheduled and span_end > span_start:
+        with span("load"):
+            workstation_load = [
+                {key: row[key] for key in ("workstation", "workstation_name", "total_minutes",
+                    "capacity_minutes", "utilization")}
+                for row in get_utilization(span_start, span_end,
+                    workstation=sorted({jc.workstation for jc in scheduled if jc.workstation}))
+            ]
+
+    return {
+        "job_cards": [
+            {key: jc[key] for key in ("name", "operation", "workstation", "status", "expected_start_date",
+                "expected_end_date", "actual_start_date", "actual_end_date", "total_completed_qty",
+                "for_quantity", "sequence_id")}
+            for jc in job_cards
+        ],
+        "status_counts": status_counts,
+        "scheduled_span": {"start": span_start, "end": span_end} if scheduled else None,
+        "workstation_load": workstation_load,
+        "risks": get_delivery_risks(wo, active, span_end, workstation_load),
+    }
+
+def get_delivery_risks(wo, job_cards, span_end, workstation_load):
+    """Flags that put a Work Order's delivery at risk, most severe first"""
+    risks = []
+    now = now_datetime()
+    delivery = get_datetime(wo.expected_delivery_date) if wo.expected_delivery_date else None
+
+    if delivery and span_end and span_end > delivery:
+        risks.append({"flag": "operations_after_delivery", "severity": "red",
+            "message": f"Operations run until {span_end}, after the delivery date {delivery}"})
+    elif delivery and wo.planned_end_date and get_datetime(wo.planned_end_date) > delivery:
+        risks.append({"flag": "planned_after_delivery", "severity": "red",
+            "message": f"Planned end {wo.planned_end_date} is after the delivery date {delivery}"})
+
+    overdue = [jc.name for jc in job_cards if jc.status != "Completed"
+        and jc.expected_end_date and get_datetime(jc.expected_end_date) < now]
+    if overdue:
+        risks.append({"flag": "overdue_operations", "severity": "orange",
+            "message": f"{len(overdue)} operation(s) should have finished already: {', '.join(overdue[:5])}"})
+
+    unscheduled = [jc.name for jc in job_cards if not (jc.expected_start_date and jc.expected_end_date)]
+    if unscheduled:
+        risks.append({"flag": "unscheduled_operations", "severity": "orange",
+            "message": f"{len(unscheduled)} operation(s) are not scheduled"})
+
+    overloaded = [row["workstation"] for row in workstation_load if row["utilization"] >= OVERLOAD_UTILIZATION]
+    if overloaded:
+        risks.append({"flag": "overloaded_workstations", "severity": "yellow",
+            "message": f"Workstations at or above {OVERLOAD_UTILIZATION}% load: {', '.join(overloaded)}"})
+
+    return risks
 
 @frappe.whitelist()
-def update_job_card_schedule(name, new_start, new_end, new_workstation=None):
-    """Update Job Card schedule and optionally workstation"""
-    jc = frappe.get_doc("Job Card", name)
-    
-    # Allow rescheduling regardless of status for capacity planning
-    # Store original status to restore if needed
-    original_status = jc.status
-    
-    # Update dates
-    jc.expected_start_date = get_datetime(new_start.split("+")[0])
-    jc.expected_end_date = get_datetime(new_end.split("+")[0])
-    
-    # Update workstation if provided
-    if new_workstation and new_workstation != jc.workstation:
-        # Validate workstation exists and is active
-        if frappe.db.exists("Workstation", new_workstation):
-            jc.workstation = new_workstation
-        else:
-            frappe.throw(f"Workstation {new_workstation} does not exist or is inactive")
-    
-    # Validate no overlap with other job cards on same workstation
-    # Skip validation for the same job card
-    try:
-        validate_job_card_overlap(jc)
-    except Exception as e:
-        # If validation fails, provide more helpful error message
-        frappe.throw(f"Scheduling conflict: {str(e)}")
-    
-    # Save with ignore_permissions for capacity planning
-    try:
-        jc.save(ignore_permissions=True)
-        return "Job Card Updated"
-    except Exception as e:
-        frappe.throw(f"Failed to update job card: {str(e)}")
-
-def validate_job_card_overlap(job_card):
-    """Validate that job card doesn't overlap with others on same workstation"""
-    overlapping = frappe.db.sql("""
-        SELECT name, operation FROM `tabJob Card`
-        WHERE workstation = %s
-        AND name != %s
-        AND docstatus < 2
-        AND expected_start_date IS NOT NULL
-        AND expected_end_date IS NOT NULL
-        AND (
-            (expected_start_date <= %s AND expected_end_date > %s)
-            OR (expected_start_date < %s AND expected_end_date >= %s)
-            OR (expected_start_date >= %s AND expected_start_date < %s)
-        )
-    """, (
-        job_card.workstation,
-        job_card.name,
-        job_card.expected_start_date, job_card.expected_start_date,
-        job_card.expected_end_date, job_card.expected_end_date,
-        job_card.expected_start_date, job_card.expected_end_date
-    ), as_dict=True)
-    
-    if overlapping:
-        overlap_names = [f"{ov.operation} ({ov.name})" for ov in overlapping]
-        frappe.throw(f"Job Card overlaps with: {', '.join(overlap_names)} on workstation {job_card.workstation}")
+@instrumented
+def update_work_order_schedule(name, new_start, new_end, dry_run=0):
+    """Update Work Order schedule; with dry_run, only preview the cascade it would cause
 
-def shift_following_work_orders(current_name):
-    """Shift following work orders - keeping existing functionality"""
-    current = frappe.get_doc("Work Order", current_name)
-    
-    others = frappe.get_all("Work Order",
+    The cascade itself runs in the background: moves of one company made in quick
+    succession are recomputed together once the burst is over (see cascade_queue).
+    """
+    from kk_new_app.api.cascade_queue import queue_work_order_cascade
+
+    new_start = parse_calendar_datetime(new_start)
+    new_end = parse_calendar_datetime(new_end)
+
+    if cint(dry_run):
+        with span("cascade") as cascade:
+            company = frappe.db.get_value("Work Order", name, "company")
+            affected = compute_work_order_cascade({name: (new_start, new_end)}, company)
+            cascade.rows = len(affected)
+        return {"work_order": name, "affected": affected}
+
+    with span("save"):
+        wo = frappe.get_doc("Work Order", name)
+        previous = {"start": wo.planned_start_date, "end": wo.planned_end_date}
+        wo.planned_start_date = new_start
+        wo.planned_end_date = new_end
+        wo.save()
+    queue_work_order_cascade(wo.company, wo.name, previous)
+    return {"work_order": wo.name, "cascade": "queued"}
+
+@frappe.whitelist()
+@instrumented
+def update_job_card_schedule(name, new_start, new_end, new_workstation=None, modified=None):
+    """Update Job Card schedule and optionally workstation, writing only the schedule fields
+
+    ``modified`` is the version the client last saw; if the card changed since, nothing
+    is written and its current schedule is returned as a conflict instead. Callers
+    should always send it: without it the move overwrites concurrent changes (and a
+    warning is logged).
+    """
+    from kk_new_app.api.schedule_writer import bulk_update_schedule
+
+    frappe.has_permission("Job Card", "write", throw=True)
+    if not modified:
+        frappe.logger("kk_new_app.scheduler").warning(
+            f"Job Card {name} rescheduled by {frappe.session.user} without a modified stamp")
+
+    move = {"name": name, "new_start": new_start, "new_end": new_end,
+        "new_workstation": new_workstation, "modified": modified}
+
+    with span("query"):
+        current = lock_job_cards([name])
+    stale = get_stale_job_cards([move], current)
+    if stale:
+        return {"conflict": 1, "current": stale[0]}
+
+    with span("gap_search"):
+        updates, workstations = validate_job_card_moves([move], current)
+    with span("save"):
+        modified = bulk_update_schedule("Job Card", updates, workstations)
+    return {"name": name, "modified": modified}
+
+@frappe.whitelist(methods=["POST"])
+@instrumented
+def move_job_cards(moves, dry_run=0):
+    """Move several Job Cards at once: validate all moves together, then write them in one transaction
+
+    ``moves`` is a list of ``{"name", "new_start", "new_end", "new_workstation"?, "modified"?}``.
+    When any card changed since its ``modified``, nothing is written and the current
+    schedules come back under ``conflicts``.
+    """
+    from kk_new_app.api.schedule_writer import bulk_update_schedule
+
+    frappe.has_permission("Job Card", "write", throw=True)
+    moves = frappe.parse_json(moves) or []
+    if not moves:
+        return {"moved": []}
+
+    with span("query"):
+        current = lock_job_cards([move["name"] for move in moves])
+    stale = get_stale_job_cards(moves, current)
+    if stale:
+        return {"moved": [], "conflicts": stale}
+
+    with span("gap_search") as gap_search:
+        updates, workstations = validate_job_card_moves(moves, current)
+        gap_search.rows = len(updates)
+
+    if cint(dry_run):
+        return {"moved": [], "valid": [row["name"] for row in updates]}
+
+    with span("save"):
+        modified = bulk_update_schedule("Job Card", updates, workstations)
+    return {"moved": [row["name"] for row in updates], "modified": modified}
+
+def lock_job_cards(names):
+    """Lock the rows of Job Cards about to be rescheduled; returns {name: row}
+
+    Only draft cards that are not completed can be moved, the same ones the calendar
+    lets planners drag. The schedule writer skips document validation, which is
+    only safe while the card is still a draft.
+    """
+    if len(set(names)) != len(names):
+        frappe.throw("Each Job Card can only be moved once per request")
+
+    current = {
+        row.name: row
+        for row in frappe.get_all("Job Card", filters={"name": ["in", names]},
+            fields=["name", "workstation", "docstatus", "status", "modified",
+                "expected_start_date", "expected_end_date"], for_update=True)
+    }
+    missing = [name for name in names if name not in current]
+    if missing:
+        frappe.throw(f"Job Card {', '.join(missing)} not found")
+    locked = [name for name in names
+        if current[name].docstatus != 0 or current[name].status in LOCKED_JOB_CARD_STATUSES]
+    if locked:
+        frappe.throw(f"Submitted, completed or cancelled Job Card {', '.join(locked)} cannot be rescheduled")
+    return current
+
+def get_stale_job_cards(moves, current):
+    """Current schedule of the cards that changed since the ``modified`` their move was based on"""
+    stale = []
+    for move in moves:
+        row = current[move["name"]]
+        if move.get("modified") and get_datetime(move["modified"]) != row.modified:
+            stale.append({
+                "name": row.name,
+                "start": row.expected_start_date,
+                "end": row.expected_end_date,
+                "workstation": row.workstation,
+                "modified": row.modified,
+            })
+    return stale
+
+def validate_job_card_moves(moves, current):
+    """Check a batch of moves against the database and each other; returns (updates, workstations)
+
+    ``current`` comes from ``lock_job_cards``. The moved cards' own bookings are left out
+    of the overlap check, so moving a block onto the slots it frees itself is fine.
+    """
+    names = [move["name"] for move in moves]
+
+    new_workstations = {move["new_workstation"] for move in moves if move.get("new_workstation")}
+    if new_workstations:
+        existing = set(frappe.get_all("Workstation", filters={"name": ["in", list(new_workstations)]}, pluck="name"))
+        unknown = new_workstations - existing
+        if unknown:
+            frappe.throw(f"Workstation {', '.join(sorted(unknown))} does not exist or is inactive")
+
+    updates = []
+    for move in moves:
+        row = current[move["name"]]
+        start = parse_calendar_datetime(move["new_start"])
+        end = parse_calendar_datetime(move["new_end"])
+        if end <= start:
+            frappe.throw(f"Job Card {row.name} must end after it starts")
+        updates.append({"name": row.name, "start": start, "end": end,
+            "workstation": move.get("new_workstation") or row.workstation})
+
+    # One query for every target workstation, leaving out the cards being moved
+    timelines = load_workstation_timelines({row["workstation"] for row in updates}, exclude_job_cards=names)
+
+    conflicts = []
+    by_workstation = {}
+    for row in updates:
+        if not row["workstation"]:
+            continue
+        by_workstation.setdefault(row["workstation"], []).append(row)
+        for _start, _end, name, operation in timelines[row["workstation"]].overlaps(row["start"], row["end"]):
+            conflicts.append(f"{row['name']} overlaps {operation} ({name}) on {row['workstation']}")
+
+    # Sweep each workstation's moved cards in start order against each other
+    for workstation, rows in by_workstation.items():
+        rows.sort(key=lambda row: row["start"])
+        latest = None
+        for row in rows:
+            if latest and row["start"] < latest["end"]:
+                conflicts.append(f"{row['name']} overlaps {latest['name']} on {workstation}")
+            if latest is None or row["end"] > latest["end"]:
+                latest = row
+
+    if conflicts:
+        frappe.throw("Scheduling conflict: " + "; ".join(conflicts))
+
+    workstations = {row.workstation for row in current.values()} | set(by_workstation)
+    return updates, workstations
+
+def shift_following_work_orders(previous, company=None, dry_run=False):
+    """Push later Work Orders back so none starts before its predecessor ends
+
+    ``previous`` maps each moved Work Order to its {"start", "end"} before the move.
+    They stay where they were put, and go into the Schedule Snapshot taken before
+    writing, so restoring it undoes the whole burst. Returns the moves and the snapshot.
+    """
+    from kk_new_app.api.schedule_snapshots import take_schedule_snapshot
+    from kk_new_app.api.schedule_writer import bulk_update_schedule
+
+    current = frappe.get_all("Work Order",
         filters={
+            "name": ["in", list(previous)],
             "docstatus": ["<", 2],
-            "planned_start_date": [">=", current.planned_start_date],
-            "name": ["!=", current.name]
+            "planned_start_date": ["is", "set"],
+            "planned_end_date": ["is", "set"]
         },
-        order_by="planned_start_date asc",
         fields=["name", "planned_start_date", "planned_end_date"]
     )
-    
-    prev_end = current.planned_end_date
-    
-    for wo in others:
-        wo_doc = frappe.get_doc("Work Order", wo.name)
-        duration = time_diff_in_hours(wo_doc.planned_end_date, wo_doc.planned_start_date)
-        
-        if get_datetime(wo_doc.planned_start_date) < prev_end:
-            wo_doc.planned_start_date = prev_end
-            wo_doc.planned_end_date = add_to_date(prev_end, hours=duration)
-            wo_doc.save()
-            
-        prev_end = wo_doc.planned_end_date
+    if not current:
+        return [], None
+
+    pinned = {wo.name: (wo.planned_start_date, wo.planned_end_date) for wo in current}
+    moves = compute_work_order_cascade(pinned, company)
+
+    snapshot = None
+    if not dry_run:
+        origin = [
+            {"name": name, "old_start": previous[name]["start"], "old_end": previous[name]["end"],
+                "start": start, "end": end}
+            for name, (start, end) in pinned.items()
+        ]
+        snapshot = take_schedule_snapshot("Work Order", origin + moves, f"Cascade from {', '.join(sorted(pinned))}")
+        bulk_update_schedule("Work Order", moves)
+    return moves, snapshot
+
+def compute_work_order_cascade(pinned, company=None):
+    """Compute in memory which later Work Orders move, and where
+
+    ``pinned`` maps the Work Orders just placed to their (start, end); they never move.
+    Every other order starting at or after the earliest of them is pushed back by
+    ``cascade_bookings``.
+    """
+    filters = {
+        "docstatus": ["<", 2],
+        "planned_start_date": [">=", min(get_datetime(start) for start, _end in pinned.values())],
+        "planned_end_date": ["is", "set"],
+        "name": ["not in", list(pinned)]
+    }
+    if company:
+        filters["company"] = company
+    others = frappe.get_all("Work Order",
+        filters=filters,
+        order_by="planned_start_date asc",
+        fields=["name", "planned_start_date", "planned_end_date"],
+        as_list=True
+    )
+    return cascade_bookings(pinned, others)
+
+def cascade_bookings(pinned, others):
+    """Moves that clear ``others`` [(name, start, end)] off each other and the ``pinned`` orders
+
+    Bookings are walked in start order; a movable one is pushed back until it neither
+    starts before its predecessor ends nor covers a pinned order further on.
+    """
+    # Pinned orders sort first among equal starts, so they are never pushed behind one
+    bookings = sorted(
+        [(get_datetime(start), 0, name, get_datetime(end)) for name, (start, end) in pinned.items()]
+        + [(get_datetime(start), 1, name, get_datetime(end)) for name, start, end in others]
+    )
+    pinned_times = [(start, end) for start, movable, _name, end in bookings if not movable]
+
+    moves = []
+    prev_end = None
+
+    for start, movable, name, end in bookings:
+        if movable:
+            new_start = max(start, prev_end) if prev_end else start
+            duration = end - start
+            # Pinned orders further on keep their place: jump past any this one would cover
+            for pinned_start, pinned_end in pinned_times:
+                if pinned_start > start and pinned_start < new_start + duration and pinned_end > new_start:
+                    new_start = pinned_end
+
+            if new_start != start:
+                moves.append({
+                    "name": name,
+                    "old_start": start,
+                    "old_end": end,
+                    "start": new_start,
+                    "end": new_start + duration
+                })
+                end = new_start + duration
+
+        prev_end = end if prev_end is None else max(prev_end, end)
+
+    return moves
 
 @frappe.whitelist()
+@instrumented
 def auto_schedule_new_work_order(work_order_name):
     """Auto schedule work order - keeping existing functionality"""
     from frappe.utils import now_datetime, add_to_date, get_datetime
@@ -331,268 +855,318 @@ def auto_schedule_new_work_order(work_order_name):
     duration_hours = lead_mins / 60.0
     delivery_deadline = get_datetime(wo.expected_delivery_date) if wo.expected_delivery_date else add_to_date(now_datetime(), days=7)
     
-    print(f"DEBUG: Scheduling Work Order: {work_order_name}")
-    print(f"DEBUG: Lead time: {lead_mins} minutes ({duration_hours} hours)")
-    print(f"DEBUG: Delivery deadline: {delivery_deadline}")
+    trace_event(f"Scheduling Work Order: {work_order_name}")
+    trace_event(f"Lead time: {lead_mins} minutes ({duration_hours} hours)")
+    trace_event(f"Delivery deadline: {delivery_deadline}")
     
-    existing = frappe.get_all(
-        "Work Order",
-        filters={
-            "docstatus": ["<", 2],
-            "name": ["!=", wo.name],
-            "planned_start_date": ["is", "set"],
-            "planned_end_date": ["is", "set"]
-        },
-        order_by="planned_start_date asc",
-        fields=["name", "planned_start_date", "planned_end_date"]
-    )
+    with span("query") as query:
+        existing = frappe.get_all(
+            "Work Order",
+            filters={
+                "docstatus": ["<", 2],
+                "name": ["!=", wo.name],
+                "planned_start_date": ["is", "set"],
+                "planned_end_date": ["is", "set"]
+            },
+            order_by="planned_start_date asc",
+            fields=["name", "planned_start_date", "planned_end_date"]
+        )
+        query.rows = len(existing)
     
-    print(f"DEBUG: Found {len(existing)} existing work orders")
-    
-    if not existing:
-        wo.planned_start_date = now_datetime()
-        wo.planned_end_date = add_to_date(wo.planned_start_date, minutes=lead_mins)
-        wo.save()
-        print(f"DEBUG: No existing WOs, scheduled from now")
-        return wo.name
+    trace_event(f"Found {len(existing)} existing work orders")
     
     current_time = now_datetime()
-    found_slot = False
-    
-    print(f"DEBUG: Current time: {current_time}")
-    
-    if existing and get_datetime(existing[0].planned_start_date) > current_time:
-        gap_duration = time_diff_in_hours(existing[0].planned_start_date, current_time)
-        print(f"DEBUG: Gap before first WO: {gap_duration} hours")
-        if gap_duration >= duration_hours:
-            wo.planned_start_date = current_time
-            wo.planned_end_date = add_to_date(current_time, minutes=lead_mins)
-            found_slot = True
-            print(f"DEBUG: Found slot before first WO")
-    
-    if not found_slot:
-        print(f"DEBUG: Checking gaps between {len(existing)} work orders")
-        for i in range(len(existing) - 1):
-            current_end = get_datetime(existing[i].planned_end_date)
-            next_start = get_datetime(existing[i + 1].planned_start_date)
-            gap_duration = time_diff_in_hours(next_start, current_end)
-            
-            print(f"DEBUG: Gap between WO {i} and WO {i+1}: {gap_duration} hours")
-            
-            if gap_duration >= duration_hours:
-                wo.planned_start_date = current_end
-                wo.planned_end_date = add_to_date(current_end, minutes=lead_mins)
-                found_slot = True
-                print(f"DEBUG: Found suitable gap! Scheduled from {current_end} to {wo.planned_end_date}")
-                break
+    trace_event(f"Current time: {current_time}")
     
-    if not found_slot:
-        last_end = get_datetime(existing[-1].planned_end_date)
-        wo.planned_start_date = last_end
-        wo.planned_end_date = add_to_date(last_end, minutes=lead_mins)
-        print(f"DEBUG: No gaps found, scheduled after last WO: {last_end} to {wo.planned_end_date}")
+    # Existing Work Orders are the busy time and the company holiday list closes whole
+    # days; the first free run of lead_mins minutes is one scan over the bitmap
+    with span("gap_search"):
+        timeline = WorkstationTimeline(
+            (get_datetime(row.planned_start_date), get_datetime(row.planned_end_date), row.name, None)
+            for row in existing
+        )
+        holiday_list = get_company_holiday_list(wo.company)
+        availability = get_availability(timeline, current_time, holiday_list=holiday_list)
+        slot = availability.first_free_slot(current_time, lead_mins)
+        if not slot:
+            # Longer than any working stretch: fall back to the first free time at all
+            slot = timeline.first_free_slot(current_time, timedelta(minutes=lead_mins))
+            trace_event(f"No working-time slot of {lead_mins} minutes, using first free time")
+    
+        wo.planned_start_date = slot
+        wo.planned_end_date = add_to_date(slot, minutes=lead_mins)
+        trace_event(f"Holiday list: {holiday_list or 'none'}")
     
-    print(f"DEBUG: Final schedule: {wo.planned_start_date} to {wo.planned_end_date}")
+    trace_event(f"Final schedule: {wo.planned_start_date} to {wo.planned_end_date}")
     
     if wo.planned_end_date > delivery_deadline:
-        print(f"DEBUG: EXCEEDING DEADLINE! Planned end: {wo.planned_end_date}, Deadline: {delivery_deadline}")
+        trace_event(f"Exceeding deadline! Planned end: {wo.planned_end_date}, Deadline: {delivery_deadline}")
         frappe.throw("Cannot auto-schedule: no slot available before expected delivery date.")
     
-    wo.save()
-    print(f"DEBUG: Work Order saved successfully")
+    with span("save"):
+        wo.save()
+    trace_event("Work Order saved successfully")
     
     return wo.name
 
 @frappe.whitelist()
+@instrumented
 def auto_schedule_job_cards_for_work_order(work_order_name):
     """Auto schedule job cards when work order is scheduled"""
+    from kk_new_app.api.schedule_snapshots import take_schedule_snapshot
+    from kk_new_app.api.schedule_writer import bulk_update_schedule
+
     wo = frappe.get_doc("Work Order", work_order_name)
     
     if not wo.planned_start_date or not wo.planned_end_date:
         frappe.throw("Work Order must be scheduled before scheduling Job Cards")
     
     # Get job cards for this work order
-    job_cards = frappe.get_all("Job Card",
-        filters={
-            "work_order": work_order_name,
-            "docstatus": ["<", 2]
-        },
-        fields=["name", "operation", "workstation", "time_required", "operation_id"],
-        order_by="operation_id asc"
-    )
+    with span("query") as query:
+        job_cards = frappe.get_all("Job Card",
+            filters={
+                "work_order": work_order_name,
+                "docstatus": ["<", 2]
+            },
+            fields=["name", "operation", "workstation", "time_required", "sequence_id", "operation_id"],
+            order_by="sequence_id asc, operation_id asc"
+        )
+        query.rows = len(job_cards)
     
     if not job_cards:
         return "No Job Cards found"
     
-    current_start = wo.planned_start_date
-    
-    for jc_data in job_cards:
-        jc = frappe.get_doc("Job Card", jc_data.name)
-        
-        # Calculate duration (time_required is in minutes)
-        duration_mins = jc.time_required or 60
-        
-        # Find available slot for this workstation
-        available_start = find_available_workstation_slot(
-            jc.workstation, 
-            current_start, 
-            duration_mins
+    # One query for every involved workstation; the cards being (re)scheduled must not
+    # block themselves with their old slots
+    with span("load_timelines"):
+        timelines = load_workstation_timelines(
+            [jc.workstation for jc in job_cards],
+            exclude_job_cards=[jc.name for jc in job_cards]
         )
-        
-        jc.expected_start_date = available_start
-        jc.expected_end_date = add_to_date(available_start, minutes=duration_mins)
-        jc.save()
-        
-        # Next job card should start after this one
-        current_start = jc.expected_end_date
-    
-    return f"Scheduled {len(job_cards)} Job Cards"
 
-def find_available_workstation_slot(workstation, preferred_start, duration_mins):
-    """Find next available slot for workstation"""
-    # Get existing job cards for this workstation
-    existing = frappe.get_all("Job Card",
-        filters={
-            "workstation": workstation,
-            "docstatus": ["<", 2],
-            "expected_start_date": ["is", "set"],
-            "expected_end_date": ["is", "set"]
-        },
-        fields=["expected_start_date", "expected_end_date"],
-        order_by="expected_start_date asc"
-    )
-    
-    if not existing:
-        return preferred_start
+    current_start = get_datetime(wo.planned_start_date)
+    updates = []
     
-    duration_hours = duration_mins / 60.0
-    current_time = get_datetime(preferred_start)
+    with span("gap_search") as gap_search:
+        # Working hours and holidays of each workstation, over the freshly loaded bookings
+        availability = {
+            workstation: get_workstation_availability(workstation, current_start, timeline=timeline)
+            for workstation, timeline in timelines.items()
+        }
+        for jc in job_cards:
+            # Calculate duration (time_required is in minutes)
+            duration = timedelta(minutes=jc.time_required or 60)
+            
+            # Find available slot for this workstation and book it in memory
+            available_start = current_start
+            if jc.workstation:
+                timeline = timelines[jc.workstation]
+                available_start = availability[jc.workstation].first_free_slot(
+                    current_start, duration.total_seconds() / 60)
+                if not available_start:
+                    # Longer than any shift: fall back to the first free time at all
+                    available_start = timeline.first_free_slot(current_start, duration)
+                availability[jc.workstation].reserve(available_start, available_start + duration)
+                timeline.reserve(available_start, available_start + duration, jc.name, jc.operation)
+            
+            updates.append({
+                "name": jc.name,
+                "start": available_start,
+                "end": available_start + duration
+            })
+            
+            # Next job card should start after this one
+            current_start = available_start + duration
+        gap_search.rows = len(updates)
     
-    # Check if we can start at preferred time
-    first_conflict = None
-    for jc in existing:
-        if (get_datetime(jc.expected_start_date) <= current_time < get_datetime(jc.expected_end_date)):
-            first_conflict = jc
-            break
+    with span("save"):
+        take_schedule_snapshot("Job Card", updates, f"Auto schedule Job Cards of {work_order_name}")
+        bulk_update_schedule("Job Card", updates, workstations=list(timelines))
     
-    if not first_conflict:
-        # Check gaps between existing job cards
-        for i in range(len(existing) - 1):
-            current_end = get_datetime(existing[i].expected_end_date)
-            next_start = get_datetime(existing[i + 1].expected_start_date)
-            
-            if current_end >= current_time:
-                gap_duration = time_diff_in_hours(next_start, current_end)
-                if gap_duration >= duration_hours:
-                    return max(current_time, current_end)
-        
-        # Schedule after last job card
-        return max(current_time, get_datetime(existing[-1].expected_end_date))
-    else:
-        # Schedule after conflicting job card
-        return get_datetime(first_conflict.expected_end_date)
+    return f"Scheduled {len(job_cards)} Job Cards"
+
+def find_available_workstation_slot(workstation, preferred_start, duration_mins):
+    """Find next available slot for workstation within its working hours, outside holidays"""
+    preferred_start = get_datetime(preferred_start)
+    slot = get_workstation_availability(workstation, preferred_start).first_free_slot(preferred_start, duration_mins)
+    if slot:
+        return slot
+    # Longer than any shift: fall back to the first free time at all
+    return get_workstation_timeline(workstation).first_free_slot(preferred_start, timedelta(minutes=duration_mins))
+
+@frappe.whitelist()
+@instrumented
+def check_workstation_availability(workstation, start, end, job_card=None):
+    """Job Cards overlapping [start, end) on a workstation and the nearest free slots around it
+
+    Only bookings within AVAILABILITY_SEARCH_DAYS of the interval are read, with one
+    indexed range query, so the answer stays small however busy the workstation is.
+    """
+    frappe.has_permission("Job Card", "read", throw=True)
+    if not frappe.db.exists("Workstation", workstation):
+        frappe.throw(f"Workstation {workstation} not found")
+
+    # The form asks while dates are being edited: half-entered ranges get a quiet answer
+    start = parse_calendar_datetime(start) if start else None
+    end = parse_calendar_datetime(end) if end else None
+    if not start or not end or end <= start:
+        return {"available": False, "reason": "End must be after start", "conflicts": [],
+            "next_slot": None, "previous_slot": None}
+
+    duration_mins = (end - start).total_seconds() / 60
+    window = (start - timedelta(days=AVAILABILITY_SEARCH_DAYS), end + timedelta(days=AVAILABILITY_SEARCH_DAYS))
+
+    with span("query") as query:
+        timeline = load_workstation_timelines([workstation],
+            exclude_job_cards=[job_card] if job_card else None, window=window)[workstation]
+        query.rows = len(timeline.intervals)
+
+    overlapping = timeline.overlaps(start, end)
+    work_orders = {}
+    if overlapping:
+        work_orders = dict(frappe.get_all("Job Card", filters={"name": ["in", [row[2] for row in overlapping]]},
+            fields=["name", "work_order"], as_list=True))
+
+    with span("gap_search"):
+        working_hours, holiday_list = get_working_calendar(workstation)
+        availability = get_availability(timeline, window[0], working_hours, holiday_list)
+        next_start = availability.first_free_slot(start, duration_mins, max_horizons=3)
+        if not next_start:
+            # Longer than any shift: the first free time at all
+            next_start = timeline.first_free_slot(start, end - start)
+        previous_start = availability.last_free_slot(end, duration_mins, not_before=max(window[0], now_datetime()))
+
+    def slot(slot_start):
+        # Bookings past the window were not loaded, so a slot there is not known to be free
+        if slot_start and slot_start + (end - start) <= window[1]:
+            return {"start": slot_start, "end": slot_start + (end - start)}
+
+    return {
+        "available": not overlapping,
+        "conflicts": [
+            {"name": name, "operation": operation, "work_order": work_orders.get(name),
+                "start": row_start, "end": row_end}
+            for row_start, row_end, name, operation in overlapping
+        ],
+        "next_slot": slot(next_start),
+        "previous_slot": slot(previous_start),
+    }
 
 @frappe.whitelist()
+@instrumented
 def create_test_job_cards():
     """Create test job cards for demo purposes"""
-    from frappe.utils import now_datetime, add_to_date
+    from kk_new_app.benchmarks.dataset import get_standard_values, insert_rows
     
     # Get submitted work orders without job cards
     work_orders = frappe.get_all("Work Order", 
         filters={"docstatus": 1}, 
         fields=["name", "production_item", "planned_start_date", "planned_end_date"]
     )
+    with_job_cards = set(frappe.get_all("Job Card", pluck="work_order", distinct=True))
+    workstations = frappe.get_all("Workstation", pluck="name", limit=3)
+    if not workstations:
+        return "Created 0 test job cards"
+        
+    # Create 3 sample operations
+    operations = [
+        {"operation": "Cutting", "time_required": 60},
+        {"operation": "Assembly", "time_required": 45}, 
+        {"operation": "Quality Check", "time_required": 30}
+    ]
     
-    created_count = 0
+    batch = frappe.generate_hash(length=6).upper()
+    rows = []
     for wo in work_orders:
-        # Check if job cards already exist
-        existing_job_cards = frappe.get_all("Job Card", filters={"work_order": wo.name})
-        if existing_job_cards:
-            continue
-            
-        # Get workstations
-        workstations = frappe.get_all("Workstation", fields=["name"], limit=3)
-        if not workstations:
+        if wo.name in with_job_cards:
             continue
-            
-        # Create 3 sample operations
-        operations = [
-            {"operation": "Cutting", "time_required": 60},
-            {"operation": "Assembly", "time_required": 45}, 
-            {"operation": "Quality Check", "time_required": 30}
-        ]
         
-        start_time = wo.planned_start_date or now_datetime()
+        start_time = get_datetime(wo.planned_start_date) if wo.planned_start_date else now_datetime()
         
         for i, op in enumerate(operations):
-            job_card = frappe.new_doc("Job Card")
-            job_card.work_order = wo.name
-            job_card.operation = op["operation"]
-            job_card.workstation = workstations[i % len(workstations)].name
-            job_card.for_quantity = 10
-            job_card.operation_id = i + 1
-            job_card.sequence_id = i + 1
-            job_card.expected_start_date = start_time
-            job_card.expected_end_date = add_to_date(start_time, minutes=op["time_required"])
-            job_card.time_required = op["time_required"]
-            job_card.status = "Open"
-            
-            try:
-                job_card.insert()
-                created_count += 1
-                start_time = job_card.expected_end_date
-            except Exception as e:
-                print(f"Error creating job card: {e}")
-                continue
+            end_time = add_to_date(start_time, minutes=op["time_required"])
+            rows.append((
+                f"TEST-JC-{batch}-{len(rows) + 1:06d}", 0,
+                wo.name, op["operation"], workstations[i % len(workstations)],
+                10, i + 1, i + 1, start_time, end_time, op["time_required"], "Open"
+            ))
+            start_time = end_time
     
-    return f"Created {created_count} test job cards"
+    insert_rows("Job Card", get_standard_values(),
+        ["work_order", "operation", "workstation", "for_quantity", "operation_id", "sequence_id",
+            "expected_start_date", "expected_end_date", "time_required", "status"],
+        rows)
+    queue_workstation_load_refresh(get_load_days((row[4], row[8], row[9]) for row in rows))
+    
+    return f"Created {len(rows)} test job cards"
 
 @frappe.whitelist()
-def get_workstation_utilization(start_date, end_date):
-    """Get workstation utilization data for the given period"""
-    utilization_data = frappe.db.sql("""
-        SELECT 
-            jc.workstation,
-            ws.workstation_name,
-            ws.workstation_type,
-            COUNT(jc.name) as total_jobs,
-            AVG(TIMESTAMPDIFF(MINUTE, jc.expected_start_date, jc.expected_end_date)) as avg_duration,
-            SUM(TIMESTAMPDIFF(MINUTE, jc.expected_start_date, jc.expected_end_date)) as total_minutes,
-            SUM(CASE WHEN jc.status = 'Completed' THEN 1 ELSE 0 END) as completed_jobs
-        FROM `tabJob Card` jc
-        LEFT JOIN `tabWorkstation` ws ON jc.workstation = ws.name
-        WHERE jc.expected_start_date >= %s 
-        AND jc.expected_end_date <= %s
-        AND jc.docstatus < 2
-        GROUP BY jc.workstation
-        ORDER BY total_minutes DESC
-    """, (start_date, end_date), as_dict=True)
+@instrumented
+def get_workstation_utilization(start_date, end_date, bucket="day", workstation=None):
+    """Get workstation utilization for the given period, per workstation and per hour, shift or day
+
+    Job Cards are clipped at the window and bucket edges; the numbers come from the
+    Workstation Daily Load table kept current by Job Card changes.
+    """
+    with span("query") as query:
+        utilization_data = get_utilization(start_date, end_date, bucket, workstation)
+        query.rows = len(utilization_data)
     
     return utilization_data
 
 @frappe.whitelist()
-def create_bulk_test_work_orders(count=50):
-    """Create bulk work orders for performance testing"""
-    from frappe.utils import now_datetime, add_to_date
+@instrumented
+def create_bulk_test_work_orders(count=50, seed=None):
+    """Create bulk work orders for performance testing
+
+    Rows are bulk inserted with placeholder items and no BOM, so they are read-only
+    fixtures: the calendar and schedulers read them and move them with bulk schedule
+    writes, but anything that saves the document (the form, dragging the Work Order on
+    the calendar) fails ERPNext's validation.
+    """
+    from kk_new_app.benchmarks.dataset import get_standard_values, insert_rows
     import random
     
-    created_count = 0
+    rnd = random.Random(cint(seed) if seed else None)
     base_time = now_datetime()
+    company = frappe.defaults.get_user_default("Company")
+    batch = frappe.generate_hash(length=6).upper()
     
-    for i in range(count):
-        try:
-            wo = frappe.new_doc("Work Order")
-            wo.production_item = f"Test Item {i+1}"
-            wo.qty = random.randint(5, 50)
-            wo.company = frappe.defaults.get_user_default("Company")
-            wo.expected_delivery_date = add_to_date(base_time, days=random.randint(1, 30))
-            wo.lead_time = random.randint(30, 180)  # 30 minutes to 3 hours
-            
-            wo.insert()
-            created_count += 1
-            
-        except Exception as e:
-            print(f"Error creating work order {i+1}: {e}")
-            continue
+    rows = [
+        (
+            f"TEST-WO-{batch}-{i + 1:06d}", 0,
+            f"Test Item {i + 1}",
+            rnd.randint(5, 50),
+            company,
+            add_to_date(base_time, days=rnd.randint(1, 30)).date(),
+            rnd.randint(30, 180),  # 30 minutes to 3 hours
+            "Draft"
+        )
+        for i in range(cint(count))
+    ]
     
-    return f"Created {created_count} test work orders for performance testing"
\ No newline at end of file
+    insert_rows("Work Order", get_standard_values(),
+        ["production_item", "qty", "company", "expected_delivery_date", "lead_time", "status"],
+        rows)
+    
+    return f"Created {len(rows)} test work orders for performance testing"
+
+@frappe.whitelist()
+@instrumented
+def create_test_schedule(work_orders=1000, routing_depth_min=3, routing_depth_max=6, workstations=20,
+        workstation_spread=1.0, horizon_days=30, overlap_density=0.0, seed=42):
+    """Bulk-generate workstations, work orders and scheduled job cards for load tests"""
+    from kk_new_app.benchmarks.dataset import generate_fixtures
+
+    frappe.only_for("System Manager")
+    return generate_fixtures(
+        work_orders=cint(work_orders),
+        routing_depth=(cint(routing_depth_min), cint(routing_depth_max)),
+        workstations=cint(workstations),
+        workstation_spread=flt(workstation_spread),
+        horizon_days=cint(horizon_days),
+        overlap_density=flt(overlap_density),
+        seed=cint(seed),
+        prefix=f"TEST-{frappe.generate_hash(length=4).upper()}-",
+        company=frappe.defaults.get_user_default("Company")
+    )
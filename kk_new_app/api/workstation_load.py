@@ -0,0 +1,365 @@
+import json
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+import frappe
+from frappe.utils import get_datetime, getdate, now_datetime
+
+LOAD_DOCTYPE = "Workstation Daily Load"
+
+LOAD_WRITE_CHUNK_SIZE = 500
+
+# Job Cards of some workstations overlapping a span of whole days. A locking read,
+# so it sees the latest committed cards rather than this transaction's snapshot
+LOAD_SOURCE_QUERY = """
+    SELECT workstation, name, expected_start_date, expected_end_date, status
+    FROM `tabJob Card`
+    WHERE workstation IN %(workstations)s
+    AND docstatus < 2
+    AND expected_start_date < %(window_end)s
+    AND expected_end_date > %(window_start)s
+    AND name NOT IN %(exclude)s
+    LOCK IN SHARE MODE
+"""
+
+DAILY_LOAD_QUERY = """
+    SELECT
+        dl.workstation,
+        dl.load_date,
+        dl.busy_minutes,
+        dl.hourly_minutes,
+        dl.started_jobs,
+        dl.started_minutes,
+        dl.completed_jobs,
+        ws.workstation_name,
+        ws.workstation_type
+    FROM `tabWorkstation Daily Load` dl
+    LEFT JOIN `tabWorkstation` ws ON dl.workstation = ws.name
+    WHERE dl.load_date >= %(from_date)s
+    AND dl.load_date <= %(to_date)s
+    {conditions}
+    ORDER BY dl.workstation, dl.load_date
+"""
+
+# Three 8 hour shifts by start hour; the night shift runs into the next day
+SHIFTS = (("Morning", 6), ("Evening", 14), ("Night", 22))
+SHIFT_HOURS = 8
+
+BUCKET_MINUTES = {"hour": 60, "shift": SHIFT_HOURS * 60, "day": 24 * 60}
+
+def get_load_name(workstation, day):
+    return f"{workstation}-{day:%Y%m%d}"
+
+def get_load_days(rows):
+    """(workstation, day) keys touched by (workstation, start, end) intervals"""
+    keys = set()
+    for workstation, start, end in rows:
+        if not (workstation and start and end):
+            continue
+        start, end = get_datetime(start), get_datetime(end)
+        day = start.date()
+        # An interval ending exactly at midnight does not touch the next day
+        last_day = (end - timedelta(microseconds=1)).date() if end > start else day
+        while day <= last_day:
+            keys.add((workstation, day))
+            day += timedelta(days=1)
+    return keys
+
+def get_job_card_load_days(names):
+    """Load keys of the given Job Cards as they are stored right now"""
+    if not names:
+        return set()
+    rows = frappe.get_all("Job Card", filters={"name": ["in", list(names)]},
+        fields=["workstation", "expected_start_date", "expected_end_date"], as_list=True)
+    return get_load_days(rows)
+
+def compute_daily_loads(intervals, days):
+    """Per-day load of ``days`` from (start, end, status) intervals, clipped at hour edges"""
+    loads = {day: {"busy_minutes": 0.0, "hourly_minutes": [0.0] * 24, "started_jobs": 0,
+        "started_minutes": 0.0, "completed_jobs": 0} for day in days}
+    if not loads:
+        return loads
+
+    span_start = datetime.combine(min(loads), time.min)
+    span_end = datetime.combine(max(loads) + timedelta(days=1), time.min)
+
+    for start, end, status in intervals:
+        start, end = get_datetime(start), get_datetime(end)
+        started = loads.get(start.date())
+        if started is not None:
+            started["started_jobs"] += 1
+            started["started_minutes"] += (end - start).total_seconds() / 60
+            if status == "Completed":
+                started["completed_jobs"] += 1
+
+        # Walk the interval hour by hour so each piece lands in its own hour and day
+        cursor = max(start, span_start)
+        stop = min(end, span_end)
+        while cursor < stop:
+            piece_end = min(cursor.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1), stop)
+            load = loads.get(cursor.date())
+            if load is not None:
+                minutes = (piece_end - cursor).total_seconds() / 60
+                load["hourly_minutes"][cursor.hour] += minutes
+                load["busy_minutes"] += minutes
+            cursor = piece_end
+
+    return loads
+
+def queue_workstation_load_refresh(keys):
+    """Refresh the load rows of ``keys`` once the current transaction has committed
+
+    Recomputed inside the transaction, two saves on the same workstation-day would each
+    miss the other's uncommitted Job Card, and the last commit would overwrite the other's
+    total. After commit every change is visible, and refresh_workstation_load serializes
+    the refreshes on the day rows.
+    """
+    pending = getattr(frappe.local, "kk_pending_load_keys", None)
+    if not pending:
+        pending = frappe.local.kk_pending_load_keys = set()
+        frappe.db.after_commit.add(flush_workstation_load_refresh)
+        frappe.db.after_rollback.add(discard_workstation_load_refresh)
+    pending.update(keys)
+
+def flush_workstation_load_refresh():
+    keys = frappe.local.kk_pending_load_keys
+    frappe.local.kk_pending_load_keys = None
+    if keys:
+        refresh_workstation_load(keys)
+        frappe.db.commit()
+
+def discard_workstation_load_refresh():
+    frappe.local.kk_pending_load_keys = None
+
+def refresh_workstation_load(keys, exclude=None):
+    """Recompute the load rows of the given (workstation, day) keys from their Job Cards"""
+    days_by_workstation = defaultdict(set)
+    for workstation, day in keys:
+        if workstation and day:
+            days_by_workstation[workstation].add(day)
+    if not days_by_workstation:
+        return
+
+    lock_daily_loads(days_by_workstation)
+    all_days = set().union(*days_by_workstation.values())
+    rows = frappe.db.sql(LOAD_SOURCE_QUERY, {
+        "workstations": tuple(days_by_workstation),
+        "window_start": datetime.combine(min(all_days), time.min),
+        "window_end": datetime.combine(max(all_days) + timedelta(days=1), time.min),
+        "exclude": tuple(exclude or ("",)),
+    }, as_dict=True)
+
+    intervals = defaultdict(list)
+    for row in rows:
+        intervals[row.workstation].append((row.expected_start_date, row.expected_end_date, row.status))
+
+    write_daily_loads({
+        workstation: compute_daily_loads(intervals[workstation], days)
+        for workstation, days in days_by_workstation.items()
+    })
+
+def lock_daily_loads(days_by_workstation):
+    """Create the missing day rows and lock all of them, in name order
+
+    INSERT ... ON DUPLICATE KEY UPDATE takes an exclusive lock on existing rows too, so
+    concurrent refreshes of a day wait here for each other until commit. Placeholder
+    rows that stay empty are deleted again by write_daily_loads.
+    """
+    stamp = now_datetime()
+    user = frappe.session.user or "Administrator"
+    rows = sorted(
+        (get_load_name(workstation, day), stamp, stamp, user, user, 0, workstation, day)
+        for workstation, days in days_by_workstation.items() for day in days
+    )
+
+    for offset in range(0, len(rows), LOAD_WRITE_CHUNK_SIZE):
+        chunk = rows[offset:offset + LOAD_WRITE_CHUNK_SIZE]
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(chunk))
+        frappe.db.sql(f"""
+            INSERT INTO `tab{LOAD_DOCTYPE}`
+                (name, creation, modified, owner, modified_by, docstatus, workstation, load_date)
+            VALUES {placeholders}
+            ON DUPLICATE KEY UPDATE name = name
+        """, [value for row in chunk for value in row])
+
+def write_daily_loads(loads_by_workstation):
+    """Upsert non-empty day rows and delete the ones that became empty"""
+    stamp = now_datetime()
+    user = frappe.session.user or "Administrator"
+    upserts, empty = [], []
+
+    for workstation, loads in loads_by_workstation.items():
+        for day, load in loads.items():
+            name = get_load_name(workstation, day)
+            if not (load["busy_minutes"] or load["started_jobs"]):
+                empty.append(name)
+                continue
+            upserts.append((
+                name, stamp, stamp, user, user, 0, workstation, day,
+                round(load["busy_minutes"], 2),
+                json.dumps([round(minutes, 2) for minutes in load["hourly_minutes"]]),
+                load["started_jobs"], round(load["started_minutes"], 2), load["completed_jobs"]
+            ))
+
+    for offset in range(0, len(upserts), LOAD_WRITE_CHUNK_SIZE):
+        chunk = upserts[offset:offset + LOAD_WRITE_CHUNK_SIZE]
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(chunk))
+        frappe.db.sql(f"""
+            INSERT INTO `tab{LOAD_DOCTYPE}`
+                (name, creation, modified, owner, modified_by, docstatus, workstation, load_date,
+                busy_minutes, hourly_minutes, started_jobs, started_minutes, completed_jobs)
+            VALUES {placeholders}
+            ON DUPLICATE KEY UPDATE
+                modified = VALUES(modified),
+                modified_by = VALUES(modified_by),
+                busy_minutes = VALUES(busy_minutes),
+                hourly_minutes = VALUES(hourly_minutes),
+                started_jobs = VALUES(started_jobs),
+                started_minutes = VALUES(started_minutes),
+                completed_jobs = VALUES(completed_jobs)
+        """, [value for row in chunk for value in row])
+
+    for offset in range(0, len(empty), LOAD_WRITE_CHUNK_SIZE):
+        frappe.db.delete(LOAD_DOCTYPE, {"name": ["in", empty[offset:offset + LOAD_WRITE_CHUNK_SIZE]]})
+
+def update_workstation_load(doc, method=None):
+    """Job Card doc event: recompute the days its old and new interval touch"""
+    before = doc.get_doc_before_save()
+    # Saves that touch none of the load inputs (most status-less edits) need no refresh
+    fields = ("workstation", "expected_start_date", "expected_end_date", "status", "docstatus")
+    unchanged = before and all(before.get(field) == doc.get(field) for field in fields)
+    if unchanged and method in ("on_update", "on_update_after_submit"):
+        return
+
+    rows = [(doc.workstation, doc.expected_start_date, doc.expected_end_date)]
+    if before:
+        rows.append((before.workstation, before.expected_start_date, before.expected_end_date))
+
+    # Runs after commit, when a trashed card is already gone
+    queue_workstation_load_refresh(get_load_days(rows))
+
+def rebuild_workstation_load(workstations=None, chunk_days=31):
+    """Rebuild the whole load table, one month of days at a time
+
+    Run with ``bench --site <site> execute kk_new_app.api.workstation_load.rebuild_workstation_load``.
+    """
+    filters = {"docstatus": ["<", 2], "expected_start_date": ["is", "set"], "expected_end_date": ["is", "set"]}
+    if workstations:
+        filters["workstation"] = ["in", workstations]
+    else:
+        frappe.db.delete(LOAD_DOCTYPE)
+
+    bounds = frappe.get_all("Job Card", filters=filters,
+        fields=["workstation", "min(expected_start_date) as first_start", "max(expected_end_date) as last_end"],
+        group_by="workstation")
+
+    for row in bounds:
+        if not row.workstation:
+            continue
+        day = getdate(row.first_start)
+        last_day = getdate(row.last_end)
+        while day <= last_day:
+            days = [day + timedelta(days=i) for i in range(chunk_days) if day + timedelta(days=i) <= last_day]
+            refresh_workstation_load({(row.workstation, d) for d in days})
+            day += timedelta(days=chunk_days)
+
+def get_utilization(window_start, window_end, bucket="day", workstation=None):
+    """Per-workstation busy minutes and utilization in hour, shift or day buckets
+
+    Served from the daily load table; the window is rounded out to whole hours.
+    ``workstation`` may be one name or a list of them.
+    """
+    if bucket not in BUCKET_MINUTES:
+        frappe.throw(f"Unknown bucket {bucket}. Use one of: {', '.join(BUCKET_MINUTES)}")
+
+    window_start = get_datetime(window_start).replace(minute=0, second=0, microsecond=0)
+    window_end = get_datetime(window_end)
+    if window_end.minute or window_end.second or window_end.microsecond:
+        window_end = window_end.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    if window_end <= window_start:
+        frappe.throw("End must be after start")
+
+    conditions, values = "", {
+        "from_date": window_start.date(),
+        "to_date": (window_end - timedelta(microseconds=1)).date(),
+    }
+    if isinstance(workstation, (list, tuple, set)):
+        conditions = "AND dl.workstation IN %(workstations)s"
+        values["workstations"] = tuple(workstation) or ("",)
+    elif workstation:
+        conditions = "AND dl.workstation = %(workstation)s"
+        values["workstation"] = workstation
+
+    rows = frappe.db.sql(DAILY_LOAD_QUERY.format(conditions=conditions), values, as_dict=True)
+
+    window_minutes = (window_end - window_start).total_seconds() / 60
+    summaries = {}
+
+    for row in rows:
+        summary = summaries.get(row.workstation)
+        if summary is None:
+            summary = summaries[row.workstation] = {
+                "workstation": row.workstation,
+                "workstation_name": row.workstation_name,
+                "workstation_type": row.workstation_type,
+                "total_jobs": 0,
+                "completed_jobs": 0,
+                "started_minutes": 0.0,
+                "total_minutes": 0.0,
+                "capacity_minutes": window_minutes,
+                "buckets": defaultdict(float),
+            }
+
+        day_start = datetime.combine(row.load_date, time.min)
+        if window_start <= day_start < window_end:
+            summary["total_jobs"] += row.started_jobs
+            summary["completed_jobs"] += row.completed_jobs
+            summary["started_minutes"] += row.started_minutes
+
+        for hour, minutes in enumerate(frappe.parse_json(row.hourly_minutes) or []):
+            hour_start = day_start + timedelta(hours=hour)
+            if minutes and window_start <= hour_start < window_end:
+                summary["total_minutes"] += minutes
+                summary["buckets"][get_bucket_start(hour_start, bucket)] += minutes
+
+    result = []
+    for summary in summaries.values():
+        summary["avg_duration"] = (summary.pop("started_minutes") / summary["total_jobs"]
+            if summary["total_jobs"] else 0)
+        summary["utilization"] = round(summary["total_minutes"] * 100 / window_minutes, 2)
+        summary["buckets"] = [
+            get_bucket_load(start, minutes, bucket, window_start, window_end)
+            for start, minutes in sorted(summary["buckets"].items())
+        ]
+        result.append(summary)
+
+    result.sort(key=lambda summary: summary["total_minutes"], reverse=True)
+    return result
+
+def get_bucket_start(hour_start, bucket):
+    if bucket == "hour":
+        return hour_start
+    day_start = datetime.combine(hour_start.date(), time.min)
+    if bucket == "day":
+        return day_start
+
+    started = [start_hour for _shift, start_hour in SHIFTS if start_hour <= hour_start.hour]
+    if started:
+        return day_start + timedelta(hours=max(started))
+    # Early morning hours belong to the previous day's night shift
+    return day_start - timedelta(days=1) + timedelta(hours=SHIFTS[-1][1])
+
+def get_bucket_load(start, minutes, bucket, window_start, window_end):
+    """Bucket row with its capacity clipped to the window"""
+    end = start + timedelta(minutes=BUCKET_MINUTES[bucket])
+    capacity = (min(end, window_end) - max(start, window_start)).total_seconds() / 60
+    load = {
+        "start": start,
+        "end": end,
+        "busy_minutes": round(minutes, 2),
+        "capacity_minutes": capacity,
+        "utilization": round(minutes * 100 / capacity, 2) if capacity else 0,
+    }
+    if bucket == "shift":
+        load["shift"] = next(shift for shift, start_hour in SHIFTS if start_hour == start.hour)
+    return load
@@ -0,0 +1,230 @@
+import bisect
+from datetime import datetime, timedelta
+
+import frappe
+from frappe.utils import get_datetime
+
+TIMELINE_VERSION_KEY = "kk_workstation_timeline_version"
+
+TIMELINE_QUERY = """
+    SELECT workstation, name, operation, expected_start_date, expected_end_date
+    FROM `tabJob Card`
+    WHERE workstation IN %(workstations)s
+    AND docstatus < 2
+    AND expected_start_date IS NOT NULL
+    AND expected_end_date IS NOT NULL
+    {conditions}
+"""
+
+# Process-local index cache: {(site, workstation): (version token, WorkstationTimeline)}.
+# The version token lives in Redis so every worker sees an invalidation.
+_timeline_cache = {}
+
+class WorkstationTimeline:
+    """Sorted booked intervals of one workstation
+
+    Free-slot queries take O(log n). Overlap queries take O((k + 1) log n) for k overlapping
+    bookings, however long any single booking is.
+    """
+
+    def __init__(self, intervals=()):
+        # Each interval is (start, end, job_card_name, operation)
+        self.intervals = sorted(intervals, key=lambda row: (row[0], row[1]))
+        self._build()
+
+    def _build(self):
+        self.starts = [row[0] for row in self.intervals]
+        # Built on the first overlap query, so runs of reserve() do not rebuild it each time
+        self._end_tree = None
+
+        # Merge overlapping/touching bookings into busy blocks; the free gaps between
+        # them (bounded by datetime.min/max) are what slot searches walk over
+        blocks = []
+        for start, end, *_ in self.intervals:
+            if blocks and start <= blocks[-1][1]:
+                blocks[-1][1] = max(blocks[-1][1], end)
+            else:
+                blocks.append([start, end])
+
+        self.gap_starts = [datetime.min] + [block[1] for block in blocks]
+        self.gap_ends = [block[0] for block in blocks] + [datetime.max]
+        self._build_gap_tree()
+
+    def _build_end_tree(self):
+        # Max segment tree over interval ends in start order: a subtree whose latest end is
+        # not after the query start holds no overlap and is skipped whole
+        self._end_size = 1
+        while self._end_size < len(self.intervals):
+            self._end_size *= 2
+        self._end_tree = [datetime.min] * (2 * self._end_size)
+        for index, row in enumerate(self.intervals):
+            self._end_tree[self._end_size + index] = row[1]
+        for node in range(self._end_size - 1, 0, -1):
+            self._end_tree[node] = max(self._end_tree[2 * node], self._end_tree[2 * node + 1])
+
+    def _collect_overlaps(self, last, start, exclude, found, node=1, lo=0, hi=None):
+        """Append intervals[0..last] that end after ``start``, in start order"""
+        if hi is None:
+            hi = self._end_size - 1
+        if lo > last or self._end_tree[node] <= start:
+            return
+        if lo == hi:
+            if self.intervals[lo][2] != exclude:
+                found.append(self.intervals[lo])
+            return
+        mid = (lo + hi) // 2
+        self._collect_overlaps(last, start, exclude, found, 2 * node, lo, mid)
+        self._collect_overlaps(last, start, exclude, found, 2 * node + 1, mid + 1, hi)
+
+    def _build_gap_tree(self):
+        # Max segment tree over gap lengths (seconds) for "first gap >= d from index i"
+        self._size = 1
+        while self._size < len(self.gap_starts):
+            self._size *= 2
+        self._tree = [-1.0] * (2 * self._size)
+        for index in range(len(self.gap_starts)):
+            self._tree[self._size + index] = self._gap_length(index)
+        for node in range(self._size - 1, 0, -1):
+            self._tree[node] = max(self._tree[2 * node], self._tree[2 * node + 1])
+
+    def _gap_length(self, index):
+        return (self.gap_ends[index] - self.gap_starts[index]).total_seconds()
+
+    def _update_gap(self, index):
+        node = self._size + index
+        self._tree[node] = self._gap_length(index)
+        node //= 2
+        while node:
+            self._tree[node] = max(self._tree[2 * node], self._tree[2 * node + 1])
+            node //= 2
+
+    def _first_gap_from(self, index, seconds, node=1, lo=0, hi=None):
+        """Index of the first gap at or after ``index`` that is at least ``seconds`` long"""
+        if hi is None:
+            hi = self._size - 1
+        if hi < index or self._tree[node] < seconds:
+            return None
+        if lo == hi:
+            return lo
+        mid = (lo + hi) // 2
+        found = self._first_gap_from(index, seconds, 2 * node, lo, mid)
+        if found is None:
+            found = self._first_gap_from(index, seconds, 2 * node + 1, mid + 1, hi)
+        return found
+
+    def first_free_slot(self, not_before, duration):
+        """Earliest start >= not_before where a slot of ``duration`` (timedelta) is free"""
+        seconds = duration.total_seconds()
+
+        # The gap containing (or right after) not_before may be entered part-way
+        index = bisect.bisect_right(self.gap_ends, not_before)
+        start = max(self.gap_starts[index], not_before)
+        if (self.gap_ends[index] - start).total_seconds() >= seconds:
+            return start
+
+        # The trailing gap is open-ended, so a later gap always exists
+        return self.gap_starts[self._first_gap_from(index + 1, seconds)]
+
+    def overlaps(self, start, end, exclude=None):
+        """Bookings that overlap [start, end), optionally ignoring one job card"""
+        if self._end_tree is None:
+            self._build_end_tree()
+        # Only intervals starting before ``end`` can overlap; of those, the ones ending after ``start`` do
+        found = []
+        self._collect_overlaps(bisect.bisect_left(self.starts, end) - 1, start, exclude, found)
+        return found
+
+    def reserve(self, start, end, name=None, operation=None):
+        """Book [start, end) in memory, e.g. while placing several operations in one pass"""
+        row = (start, end, name, operation)
+        position = bisect.bisect_right(self.starts, start)
+        self.intervals.insert(position, row)
+        self.starts.insert(position, start)
+        self._end_tree = None
+
+        index = bisect.bisect_right(self.gap_ends, start)
+        if not (self.gap_starts[index] <= start and end <= self.gap_ends[index]):
+            # Booking over existing work: recompute the busy blocks from scratch
+            self._build()
+        elif start == self.gap_starts[index]:
+            # First-fit placements land at a gap start, so the gap just shrinks
+            self.gap_starts[index] = end
+            self._update_gap(index)
+        elif end == self.gap_ends[index]:
+            self.gap_ends[index] = start
+            self._update_gap(index)
+        else:
+            self.gap_starts.insert(index + 1, end)
+            self.gap_ends.insert(index + 1, self.gap_ends[index])
+            self.gap_ends[index] = start
+            self._build_gap_tree()
+
+def get_workstation_timeline(workstation):
+    """Cached interval index for a workstation; shared, so treat it as read-only"""
+    key = (frappe.local.site, workstation)
+    version = get_timeline_version(workstation)
+
+    cached = _timeline_cache.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    timeline = load_workstation_timelines([workstation])[workstation]
+    _timeline_cache[key] = (version, timeline)
+    return timeline
+
+def load_workstation_timelines(workstations, exclude_job_cards=None, window=None):
+    """Build fresh timelines for several workstations with a single query
+
+    With ``window`` (start, end) only the bookings overlapping it are loaded, so the
+    timelines are only complete inside that window.
+    """
+    workstations = list({ws for ws in workstations if ws})
+    rows_by_workstation = {ws: [] for ws in workstations}
+    if not workstations:
+        return rows_by_workstation
+
+    conditions = []
+    values = {"workstations": tuple(workstations)}
+    if exclude_job_cards:
+        conditions.append("AND name NOT IN %(exclude)s")
+        values["exclude"] = tuple(exclude_job_cards)
+    if window:
+        conditions.append("AND expected_start_date < %(window_end)s AND expected_end_date > %(window_start)s")
+        values["window_start"], values["window_end"] = window
+
+    rows = frappe.db.sql(TIMELINE_QUERY.format(conditions=" ".join(conditions)), values, as_dict=True)
+
+    for row in rows:
+        rows_by_workstation[row.workstation].append((
+            get_datetime(row.expected_start_date),
+            get_datetime(row.expected_end_date),
+            row.name,
+            row.operation,
+        ))
+
+    return {ws: WorkstationTimeline(intervals) for ws, intervals in rows_by_workstation.items()}
+
+def get_timeline_version(workstation):
+    """Current version token of a workstation's index, creating one if Redis has none"""
+    cache_key = f"{TIMELINE_VERSION_KEY}::{workstation}"
+    version = frappe.cache.get_value(cache_key)
+    if not version:
+        version = frappe.generate_hash(length=12)
+        frappe.cache.set_value(cache_key, version)
+    return version
+
+def bump_timeline_versions(workstations):
+    """Invalidate the cached index of the given workstations in every worker"""
+    for workstation in {ws for ws in workstations if ws}:
+        frappe.cache.set_value(f"{TIMELINE_VERSION_KEY}::{workstation}", frappe.generate_hash(length=12))
+
+def invalidate_workstation_timeline(doc, method=None):
+    """Job Card doc event: drop the cached index of its old and new workstation"""
+    workstations = {doc.workstation}
+    before = doc.get_doc_before_save()
+    if before:
+        workstations.add(before.workstation)
+
+    bump_timeline_versions(workstations)
+    # Bump again after commit so no worker keeps an index built from pre-commit data
+    frappe.db.after_commit.add(lambda: bump_timeline_versions(workstations))
@@ -0,0 +1,148 @@
+import random
+from datetime import datetime, timedelta
+
+import frappe
+from frappe.utils import now_datetime
+
+from kk_new_app.api.workstation_load import rebuild_workstation_load
+
+# Every synthetic row is named with this prefix so a dataset can be dropped again
+NAME_PREFIX = "BENCH-"
+
+# Load rows are named after their workstation, so the prefix covers them too
+BENCHMARK_DOCTYPES = ("Job Card", "Work Order", "Workstation", "Workstation Type", "Workstation Daily Load")
+
+OPERATIONS = ("Cutting", "Welding", "Assembly", "Painting", "Quality Check", "Packing")
+
+# Fixed epoch instead of now() so the same seed always yields the same rows
+DEFAULT_ORIGIN = datetime(2025, 1, 6, 6, 0)
+
+INSERT_CHUNK_SIZE = 5000
+
+def seed_dataset(job_cards=1000, operations_per_work_order=5, seed=42):
+    """Write the deterministic benchmark dataset for a given job card count"""
+    clear_dataset()
+    return generate_fixtures(
+        work_orders=max(1, job_cards // operations_per_work_order),
+        routing_depth=(operations_per_work_order, operations_per_work_order),
+        workstations=max(10, job_cards // 500),
+        horizon_days=30,
+        seed=seed,
+    )
+
+def generate_fixtures(work_orders=1000, routing_depth=(3, 6), workstations=20, workstation_spread=1.0,
+        horizon_days=30, overlap_density=0.0, seed=42, origin=None, prefix=NAME_PREFIX, company=None):
+    """Build workstations, work orders and scheduled job cards in memory and bulk insert them
+
+    ``routing_depth`` is the (min, max) operations per work order, ``workstation_spread``
+    the share of workstations one routing may use, ``horizon_days`` the span over which
+    work orders are released and ``overlap_density`` the share of job cards deliberately
+    double-booked on their workstation (0 gives a clean, non-overlapping schedule).
+
+    Work orders get placeholder items and no BOM: they are read-only fixtures that only
+    bulk schedule writes may change, since saving one fails ERPNext's validation.
+    """
+    rnd = random.Random(seed)
+    origin = origin or DEFAULT_ORIGIN
+    standard = get_standard_values()
+    min_depth, max_depth = routing_depth
+
+    type_names = [f"{prefix}TYPE-{i:03d}" for i in range(max(2, workstations // 10))]
+    workstation_names = [f"{prefix}WS-{i:04d}" for i in range(workstations)]
+
+    insert_rows("Workstation Type", standard, ["workstation_type"],
+        [(name, 0, name) for name in type_names])
+    insert_rows("Workstation", standard, ["workstation_name", "workstation_type", "status"],
+        [(name, 0, name, type_names[i % len(type_names)], "Production")
+            for i, name in enumerate(workstation_names)])
+
+    # A routing draws its stations from a contiguous "line" of the shop floor
+    line_size = max(1, round(workstations * workstation_spread))
+    horizon_minutes = max(1, horizon_days * 24 * 60)
+
+    cursors = {name: origin for name in workstation_names}
+    work_order_rows = []
+    job_card_rows = []
+
+    for wo_index in range(work_orders):
+        wo_name = f"{prefix}WO-{wo_index:06d}"
+        line_start = rnd.randrange(workstations)
+        line = [workstation_names[(line_start + i) % workstations] for i in range(line_size)]
+
+        released = origin + timedelta(minutes=rnd.randrange(horizon_minutes))
+        previous_end = released
+        wo_start = None
+
+        for sequence in range(1, rnd.randint(min_depth, max_depth) + 1):
+            workstation = rnd.choice(line)
+            duration = timedelta(minutes=rnd.randint(15, 240))
+
+            # Each workstation books work back to back from its own cursor; an
+            # "overlap" card is pulled back into the previous booking on purpose
+            start = max(previous_end, cursors[workstation])
+            if overlap_density and cursors[workstation] > origin and rnd.random() < overlap_density:
+                start = max(previous_end, cursors[workstation] - duration / 2)
+            else:
+                start += timedelta(minutes=rnd.choice((0, 0, 15, 30, 60)))
+            end = start + duration
+
+            cursors[workstation] = max(cursors[workstation], end)
+            previous_end = end
+            wo_start = wo_start or start
+
+            job_card_rows.append((
+                f"{prefix}JC-{wo_index:06d}-{sequence:02d}", 0,
+                wo_name, rnd.choice(OPERATIONS), workstation, start, end,
+                int(duration.total_seconds() // 60), sequence, sequence, 10, "Open"
+            ))
+
+        wo_start = wo_start or released
+        work_order_rows.append((
+            wo_name, 1, f"{prefix}ITEM-{wo_index % 50:03d}", rnd.randint(5, 50), company,
+            wo_start, previous_end, (previous_end + timedelta(days=rnd.randint(0, 5))).date(),
+            rnd.randint(30, 180), "Not Started"
+        ))
+
+    insert_rows("Work Order", standard,
+        ["production_item", "qty", "company", "planned_start_date", "planned_end_date",
+            "expected_delivery_date", "lead_time", "status"],
+        work_order_rows)
+    insert_rows("Job Card", standard,
+        ["work_order", "operation", "workstation", "expected_start_date", "expected_end_date",
+            "time_required", "sequence_id", "operation_id", "for_quantity", "status"],
+        job_card_rows)
+    # bulk_insert skips the Job Card doc events that maintain the load table
+    rebuild_workstation_load(workstation_names)
+
+    frappe.db.commit()
+    return {
+        "workstations": workstations,
+        "work_orders": work_orders,
+        "job_cards": len(job_card_rows),
+    }
+
+def get_standard_values():
+    """creation/modified/owner columns shared by every generated row"""
+    stamp = now_datetime()
+    user = frappe.session.user or "Administrator"
+    return {"creation": stamp, "modified": stamp, "owner": user, "modified_by": user}
+
+def insert_rows(doctype, standard, fields, rows, chunk_size=INSERT_CHUNK_SIZE):
+    """bulk_insert rows of (name, docstatus, *fields) with the standard columns filled in"""
+    if not rows:
+        return
+
+    standard_fields = list(standard)
+    standard_values = tuple(standard.values())
+    frappe.db.bulk_insert(
+        doctype,
+        ["name", "docstatus", *fields, *standard_fields],
+        [(*row, *standard_values) for row in rows],
+        chunk_size=chunk_size
+    )
+
+def clear_dataset(prefix=NAME_PREFIX):
+    """Delete every synthetic row created with the given name prefix"""
+    for doctype in BENCHMARK_DOCTYPES:
+        frappe.db.sql(f"DELETE FROM `tab{doctype}` WHERE name LIKE %s", (f"{prefix}%",))
+    frappe.db.commit()
@@ -0,0 +1,165 @@
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+
+import frappe
+from frappe.utils import now_datetime
+
+from kk_new_app.api import work_order_scheduler as scheduler
+from kk_new_app.api.instrumentation import count_queries
+from kk_new_app.benchmarks.dataset import NAME_PREFIX, clear_dataset, seed_dataset
+
+DEFAULT_SCALES = (1000, 10000, 100000)
+RESULTS_FOLDER = "kk_scheduler_benchmarks"
+
+def run(scales=DEFAULT_SCALES, iterations=20, seed=42, keep_data=False):
+    """Seed each scale, time every scheduler endpoint and store the results per commit
+
+    Run on a test site with ``allow_tests`` enabled, e.g.
+    ``bench --site test_site execute kk_new_app.benchmarks.scheduler.run --kwargs "{'scales': [1000]}"``
+    """
+    if not frappe.conf.allow_tests:
+        frappe.throw("Benchmarks write synthetic data; run them on a site with allow_tests enabled")
+
+    commit = get_commit()
+    reports = []
+
+    for scale in scales:
+        dataset = seed_dataset(job_cards=scale, seed=seed)
+        results = run_endpoints(iterations, seed)
+
+        report = {
+            "commit": commit,
+            "scale": scale,
+            "seed": seed,
+            "iterations": iterations,
+            "dataset": dataset,
+            "recorded_at": now_datetime(),
+            "results": results,
+        }
+        save_report(report)
+        reports.append(report)
+
+    if not keep_data:
+        clear_dataset()
+    return reports
+
+def run_endpoints(iterations, seed):
+    """Time each whitelisted scheduler endpoint against the seeded dataset"""
+    rnd = random.Random(seed)
+    work_orders = frappe.get_all("Work Order", filters={"name": ["like", f"{NAME_PREFIX}%"]},
+        fields=["name", "planned_start_date", "planned_end_date"], order_by="name asc")
+    job_cards = frappe.get_all("Job Card", filters={"name": ["like", f"{NAME_PREFIX}%"]},
+        fields=["name", "workstation", "expected_start_date", "expected_end_date", "modified"], order_by="name asc")
+
+    window_start = min(wo.planned_start_date for wo in work_orders)
+    window = (window_start, window_start + timedelta(days=7))
+
+    def drag_job_card():
+        jc = rnd.choice(job_cards)
+        duration = jc.expected_end_date - jc.expected_start_date
+        start = scheduler.find_available_workstation_slot(jc.workstation, jc.expected_end_date, duration.total_seconds() / 60)
+        scheduler.update_job_card_schedule(jc.name, str(start), str(start + duration), modified=str(jc.modified))
+
+    def preview_cascade():
+        wo = rnd.choice(work_orders)
+        shift = timedelta(hours=rnd.randint(1, 8))
+        scheduler.update_work_order_schedule(wo.name, str(wo.planned_start_date + shift),
+            str(wo.planned_end_date + shift), dry_run=1)
+
+    def cascade_job():
+        wo = rnd.choice(work_orders)
+        previous = {"start": wo.planned_start_date, "end": wo.planned_end_date}
+        scheduler.shift_following_work_orders({wo.name: previous}, dry_run=True)
+
+    cases = {
+        "read_job_cards": lambda: scheduler.get_job_cards_with_workstations(*window),
+        "read_work_orders": lambda: scheduler.get_scheduled_work_orders(*window),
+        "read_resources": scheduler.get_workstations_resources,
+        "drag_update_job_card": drag_job_card,
+        "auto_schedule_job_cards": lambda: scheduler.auto_schedule_job_cards_for_work_order(rnd.choice(work_orders).name),
+        "cascade_preview": preview_cascade,
+        "cascade_job": cascade_job,
+        "utilization": lambda: scheduler.get_workstation_utilization(*window),
+    }
+
+    return {name: measure(fn, iterations) for name, fn in cases.items()}
+
+def measure(fn, iterations):
+    """p50/p95 wall time, mean query count and peak traced memory of ``fn``"""
+    timings, queries = [], []
+
+    for _ in range(iterations):
+        with count_queries() as counter:
+            started = time.perf_counter()
+            try:
+                fn()
+            except Exception:
+                # A failing case fails the run rather than leaving a hole in the report
+                frappe.db.rollback()
+                raise
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter["queries"])
+
+        # Writes are rolled back so every iteration sees the same seeded data
+        frappe.db.rollback()
+
+    # Memory is traced in a separate run; tracemalloc would distort the timings
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        frappe.db.rollback()
+
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        "queries": round(statistics.mean(queries), 1),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+def save_report(report):
+    folder = frappe.get_site_path(RESULTS_FOLDER)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{report['commit']}-{report['scale']}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    return path
+
+def load_report(commit, scale):
+    path = os.path.join(frappe.get_site_path(RESULTS_FOLDER), f"{commit}-{scale}.json")
+    with open(path) as f:
+        return json.load(f)
+
+def compare(base_commit, head_commit, scale=1000):
+    """Per-endpoint ratio head/base for every metric of two stored runs"""
+    base = load_report(base_commit, scale)["results"]
+    head = load_report(head_commit, scale)["results"]
+
+    comparison = {}
+    for endpoint, metrics in head.items():
+        if endpoint not in base:
+            continue
+        comparison[endpoint] = {
+            metric: round(value / base[endpoint][metric], 2) if base[endpoint][metric] else None
+            for metric, value in metrics.items()
+        }
+    return comparison
+
+def get_commit():
+    """Short hash of the app's checked-out commit, marked dirty if there are local changes"""
+    app_path = frappe.get_app_path("kk_new_app")
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=app_path, text=True).strip()
+        dirty = subprocess.check_output(["git", "status", "--porcelain"], cwd=app_path, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
@@ -116,6 +116,9 @@ doctype_js = {
 # before_install = "kk_new_app.install.before_install"
 # after_install = "kk_new_app.install.after_install"
 
+# Record EXPLAIN plans of the scheduler queries so index regressions show up on migrate
+after_migrate = ["kk_new_app.api.query_plans.record_query_plans_after_migrate"]
+
 # Uninstallation
 # ------------
 
@@ -180,9 +183,84 @@ doctype_js = {
 #         "after_insert": "kk_new_app.api.work_order_scheduler.auto_schedule_work_order",
 #     }
 # }
+doc_events = {
+    "Work Order": {
+        "on_update": [
+            "kk_new_app.api.response_cache.invalidate_response_cache",
+            "kk_new_app.api.schedule_events.publish_schedule_change",
+        ],
+        "on_update_after_submit": [
+            "kk_new_app.api.response_cache.invalidate_response_cache",
+            "kk_new_app.api.schedule_events.publish_schedule_change",
+        ],
+        "on_cancel": [
+            "kk_new_app.api.response_cache.invalidate_response_cache",
+            "kk_new_app.api.schedule_events.publish_schedule_change",
+        ],
+        "on_trash": [
+            "kk_new_app.api.response_cache.invalidate_response_cache",
+            "kk_new_app.api.schedule_events.publish_schedule_change",
+        ],
+    },
+    "Job Card": {
+        "on_update": [
+            "kk_new_app.api.workstation_timeline.invalidate_workstation_timeline",
+            "kk_new_app.api.workstation_load.update_workstation_load",
+            "kk_new_app.api.response_cache.invalidate_response_cache",
+            "kk_new_app.api.schedule_events.publish_schedule_change",
+        ],
+        "on_update_after_submit": [
+            "kk_new_app.api.workstation_timeline.invalidate_workstation_timeline",
+            "kk_new_app.api.workstation_load.update_workstation_load",
+            "kk_new_app.api.response_cache.invalidate_response_cache",
+            "kk_new_app.api.schedule_events.publish_schedule_change",
+        ],
+        "on_cancel": [
+            "kk_new_app.api.workstation_timeline.invalidate_workstation_timeline",
+            "kk_new_app.api.workstation_load.update_workstation_load",
+            "kk_new_app.api.response_cache.invalidate_response_cache",
+            "kk_new_app.api.schedule_events.publish_schedule_change",
+        ],
+        "on_trash": [
+            "kk_new_app.api.workstation_timeline.invalidate_workstation_timeline",
+            "kk_new_app.api.workstation_load.update_workstation_load",
+            "kk_new_app.api.response_cache.invalidate_response_cache",
+            "kk_new_app.api.schedule_events.publish_schedule_change",
+        ],
+    },
+    "Workstation": {
+        "on_update": [
+            "kk_new_app.api.response_cache.invalidate_response_cache",
+            "kk_new_app.api.availability.invalidate_working_calendar",
+        ],
+        "after_rename": "kk_new_app.api.response_cache.invalidate_response_cache",
+        "on_trash": "kk_new_app.api.response_cache.invalidate_response_cache",
+    },
+    "Workstation Type": {
+        "on_update": "kk_new_app.api.response_cache.invalidate_response_cache",
+        "after_rename": "kk_new_app.api.response_cache.invalidate_response_cache",
+        "on_trash": "kk_new_app.api.response_cache.invalidate_response_cache",
+    },
+    "Holiday List": {
+        "on_update": "kk_new_app.api.availability.invalidate_holidays",
+        "on_trash": "kk_new_app.api.availability.invalidate_holidays",
+    },
+    "Company": {
+        "on_update": "kk_new_app.api.availability.invalidate_holidays",
+    },
+}
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+	"hourly": [
+		"kk_new_app.api.conflict_scanner.run_conflict_scan"
+	],
+	"daily": [
+		"kk_new_app.api.schedule_snapshots.delete_old_schedule_snapshots"
+	],
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"kk_new_app.tasks.all"
@@ -0,0 +1,8 @@
+# Copyright (c) 2026, ahmad mohammad and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+class ScheduleSnapshot(Document):
+    # Written by kk_new_app.api.schedule_snapshots before cascades and bulk scheduling
+    pass
@@ -0,0 +1,8 @@
+# Copyright (c) 2026, ahmad mohammad and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+class WorkstationDailyLoad(Document):
+    # Rows are written in bulk by kk_new_app.api.workstation_load, never through the form
+    pass
@@ -14,7 +14,12 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
                 <button class="btn btn-primary btn-sm" id="work-order-view">Work Orders</button>
                 <button class="btn btn-secondary btn-sm" id="operations-view">Operations & Workstations</button>
                 <button class="btn btn-default btn-sm" id="utilization-view">Utilization</button>
+                <button class="btn btn-default btn-sm" id="bulk-schedule-btn" title="Auto schedule all unscheduled Work Orders">Auto Schedule Backlog</button>
+                <button class="btn btn-default btn-sm" id="undo-schedule-btn" title="Put back the schedule before the last cascade or backlog run" style="display: none;">Undo Last Reschedule</button>
                 <div style="margin-left: auto; display: flex; gap: 5px;">
+                    <select id="workstation-type-filter" class="form-control form-control-sm" style="width: 170px; display: none;" title="Filter by Workstation Type">
+                        <option value="">All Workstation Types</option>
+                    </select>
                     <input type="date" id="jump-to-date" class="form-control form-control-sm" style="width: 150px;" title="Jump to Date">
                     <button class="btn btn-sm btn-default" id="zoom-out" title="Zoom Out (Ctrl+Scroll)">🔍➖</button>
                     <button class="btn btn-sm btn-default" id="zoom-in" title="Zoom In (Ctrl+Scroll)">🔍➕</button>
@@ -23,7 +28,7 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
             </div>
             <div id="workstation-summary" style="display: none; font-size: 12px; color: #666;"></div>
             <div id="zoom-indicator" style="font-size: 11px; color: #888; margin-top: 5px;">
-                Zoom: <span id="zoom-level">Normal</span> | Use Ctrl+Scroll for precision zoom
+                Zoom: <span id="zoom-level">Normal</span> | Use Ctrl+Scroll for precision zoom | Shift+Click operations to move them together
             </div>
         </div>
     `).appendTo(page.body);
@@ -59,13 +64,24 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
     let currentView = 'work_orders';
     let zoomLevel = 1;
     let workstationData = [];
+    let workstationTypeFilter = '';
+    let syncCursor = null;
+    let syncInFlight = false;
+    // Last full response per window/filter and of the resource tree, revalidated by version
+    const windowCache = {};
+    let resourceCache = null;
     let refreshInterval;
+    // Job Cards picked with Shift+click; dragging one of them moves them all
+    const selectedJobCards = new Set();
+    // Schedule Snapshot written by the last cascade or backlog run of this session
+    let lastScheduleSnapshot = null;
 
     // Enhanced initialization
     function initializeCalendar(viewType = 'work_orders') {
         if (calendar) {
             calendar.destroy();
         }
+        selectedJobCards.clear();
 
         const slotDuration = getSlotDuration();
         const calendarConfig = {
@@ -123,15 +139,20 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
                     info.el.setAttribute('data-work-order', workOrder);
                     info.el.setAttribute('data-workstation', info.event.extendedProps.workstation);
                     info.el.style.borderLeft = `5px solid ${info.event.borderColor}`;
-                    
-                    // Ensure all job cards are draggable regardless of status
-                    info.event.setProp('editable', true);
+
+                    if (selectedJobCards.has(info.event.id)) {
+                        info.el.classList.add('job-card-selected');
+                        info.el.style.outline = '2px dashed #2c3e50';
+                    }
                 }
             },
             
             eventClick: function (info) {
                 const isOperation = info.event.extendedProps.type === 'operation';
-                if (isOperation) {
+                if (isOperation && info.jsEvent.shiftKey) {
+                    info.jsEvent.preventDefault();
+                    toggleJobCardSelection(info.event, info.el);
+                } else if (isOperation) {
                     frappe.set_route("Form", "Job Card", info.event.id);
                 } else {
                     frappe.set_route("Form", "Work Order", info.event.id);
@@ -142,15 +163,16 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
             eventResize: handleEventResize
         };
 
-        // Configure view-specific settings
+        // Configure view-specific settings; events are fetched per visible window
         if (viewType === 'operations') {
             calendarConfig.initialView = 'timeGridWeek';
             calendarConfig.dayMaxEvents = false; // Show all events
+            calendarConfig.eventSources = [{ id: 'schedule', events: fetchOperationEvents }];
             loadOperationsView();
             showWorkstationSidebar();
         } else {
             calendarConfig.initialView = 'timeGridWeek';
-            loadWorkOrderView();
+            calendarConfig.eventSources = [{ id: 'schedule', events: fetchWorkOrderEvents }];
             hideWorkstationSidebar();
         }
 
@@ -236,52 +258,171 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
         }
     }
 
-    function loadWorkOrderView() {
-        frappe.call({
-            method: 'kk_new_app.api.work_order_scheduler.get_scheduled_work_orders',
-            callback: function (r) {
-                if (calendar && r.message) {
-                    calendar.removeAllEvents();
-                    calendar.addEventSource(r.message);
-                    updateWorkstationSummary([]);
+    // FullCalendar event sources: only the visible start/end window is requested.
+    // A full fetch also resets the sync cursor used for incremental updates.
+    function fetchWorkOrderEvents(fetchInfo, successCallback, failureCallback) {
+        loadWindowEvents('work_orders', fetchInfo).then(successCallback).catch(failureCallback);
+    }
+
+    function fetchOperationEvents(fetchInfo, successCallback, failureCallback) {
+        loadWindowEvents('operations', fetchInfo).then(successCallback).catch(failureCallback);
+    }
+
+    // Sends the version of the events we already hold; the server answers "not_modified"
+    // instead of the whole window when nothing in it changed
+    function loadWindowEvents(kind, fetchInfo) {
+        const key = [kind, fetchInfo.startStr, fetchInfo.endStr, kind === 'operations' ? workstationTypeFilter : ''].join('|');
+        const cached = windowCache[key];
+
+        return loadScheduleChanges(kind, null, fetchInfo.startStr, fetchInfo.endStr, cached && cached.version)
+            .then(changes => {
+                syncCursor = changes.cursor;
+                if (changes.not_modified && cached) {
+                    return cached.events;
                 }
-            }
-        });
+                const events = changes.columnar ? expandColumnarEvents(changes.columnar) : (changes.upserts || []);
+                windowCache[key] = { version: changes.version, events: events };
+                return events;
+            });
     }
 
-    function loadOperationsView() {
-        Promise.all([
-            loadWorkstationData(),
-            loadOperationData()
-        ]).then(([workstations, operations]) => {
-            workstationData = workstations;
-            
-            if (calendar && operations) {
-                calendar.removeAllEvents();
-                calendar.addEventSource(operations);
-                updateWorkstationSummary(workstations);
-                populateWorkstationSidebar(workstations);
-            }
-        });
+    // Rebuild the event dicts of get_job_card_event from the compact columnar payload
+    function expandColumnarEvents(payload) {
+        const columns = payload.columns;
+        const lookups = payload.lookups;
+        const events = new Array(payload.count);
+
+        for (let i = 0; i < payload.count; i++) {
+            const operation = lookups.operations[columns.operation[i]];
+            const status = lookups.statuses[columns.status[i]];
+            const workstation = lookups.workstations[columns.workstation[i]];
+            const workOrder = lookups.work_orders[columns.work_order[i]];
+            const id = columns.id[i];
+
+            events[i] = {
+                id: id,
+                title: `${id}: ${operation}`,
+                start: columns.start[i],
+                end: columns.end[i],
+                resourceId: workstation.name,
+                backgroundColor: status.color,
+                borderColor: workOrder.border_color,
+                borderWidth: '3px',
+                editable: status.editable,
+                extendedProps: {
+                    type: 'operation',
+                    job_card_name: id,
+                    operation: operation,
+                    sequence: lookups.sequences[columns.sequence[i]],
+                    workstation: workstation.name,
+                    workstation_type: workstation.workstation_type,
+                    work_order: workOrder.name,
+                    production_item: workOrder.production_item,
+                    status: status.name,
+                    completed_qty: columns.completed_qty[i],
+                    for_quantity: columns.for_quantity[i],
+                    work_order_qty: workOrder.qty,
+                    wo_start: workOrder.start,
+                    wo_end: workOrder.end,
+                    is_editable: status.editable,
+                    display_mode: status.editable ? 'planning' : 'completed',
+                    modified: columns.modified[i]
+                }
+            };
+        }
+        return events;
     }
 
-    function loadWorkstationData() {
-        return new Promise(resolve => {
+    function loadScheduleChanges(kind, since, start, end, ifNoneMatch) {
+        return new Promise((resolve, reject) => {
             frappe.call({
-                method: 'kk_new_app.api.work_order_scheduler.get_workstations_resources',
+                method: 'kk_new_app.api.work_order_scheduler.get_schedule_changes',
+                args: {
+                    kind: kind,
+                    since: since,
+                    start: start,
+                    end: end,
+                    workstation_type: kind === 'operations' ? (workstationTypeFilter || null) : null,
+                    if_none_match: ifNoneMatch || null,
+                    // Full operation windows can be large; ask for the compact encoding
+                    format: kind === 'operations' && !since ? 'columnar' : null
+                },
                 callback: function (r) {
-                    resolve(r.message || []);
-                }
+                    resolve(r.message || { upserts: [], removed: [] });
+                },
+                error: reject
+            });
+        });
+    }
+
+    // Pull only what changed since the last cursor and patch the event store in place
+    function syncScheduleChanges() {
+        if (!calendar || !syncCursor || syncInFlight) return;
+
+        syncInFlight = true;
+        const kind = currentView === 'operations' ? 'operations' : 'work_orders';
+        loadScheduleChanges(
+            kind,
+            syncCursor,
+            calendar.formatIso(calendar.view.activeStart),
+            calendar.formatIso(calendar.view.activeEnd)
+        ).then(changes => {
+            syncCursor = changes.cursor;
+            applyScheduleChanges(changes);
+        }).finally(() => {
+            syncInFlight = false;
+        });
+    }
+
+    function applyScheduleChanges(changes) {
+        const source = calendar.getEventSourceById('schedule');
+        const removed = changes.removed || [];
+        const upserts = changes.upserts || [];
+        if (!removed.length && !upserts.length) return;
+
+        calendar.batchRendering(() => {
+            removed.forEach(id => {
+                const event = calendar.getEventById(id);
+                if (event) event.remove();
+            });
+            upserts.forEach(data => {
+                const event = calendar.getEventById(data.id);
+                if (event) event.remove();
+                calendar.addEvent(data, source);
             });
         });
     }
 
-    function loadOperationData() {
+    function loadWorkOrderView() {
+        if (calendar) {
+            calendar.refetchEvents();
+        }
+        updateWorkstationSummary([]);
+    }
+
+    function loadOperationsView() {
+        loadWorkstationData().then(workstations => {
+            workstationData = workstations;
+            updateWorkstationSummary(workstations);
+            populateWorkstationSidebar(workstations);
+            populateWorkstationTypeFilter(workstations);
+        });
+        if (calendar) {
+            calendar.refetchEvents();
+        }
+    }
+
+    function loadWorkstationData() {
         return new Promise(resolve => {
             frappe.call({
-                method: 'kk_new_app.api.work_order_scheduler.get_job_cards_with_workstations',
+                method: 'kk_new_app.api.work_order_scheduler.get_workstations_resources',
+                args: { if_none_match: resourceCache ? resourceCache.version : null },
                 callback: function (r) {
-                    resolve(r.message || []);
+                    const response = r.message || {};
+                    if (!(response.not_modified && resourceCache)) {
+                        resourceCache = { version: response.version, data: response.data || [] };
+                    }
+                    resolve(resourceCache.data);
                 }
             });
         });
@@ -290,11 +431,25 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
     function showWorkstationSidebar() {
         sidebarDiv.show();
         $('#workstation-summary').show();
+        $('#workstation-type-filter').show();
     }
 
     function hideWorkstationSidebar() {
         sidebarDiv.hide();
         $('#workstation-summary').hide();
+        $('#workstation-type-filter').hide();
+    }
+
+    function populateWorkstationTypeFilter(workstations) {
+        const selectEl = $('#workstation-type-filter');
+        selectEl.find('option:not(:first)').remove();
+
+        workstations.forEach(wsType => {
+            // "Uncategorized" is a display-only group, not a filterable type
+            if (wsType.id === 'type_Uncategorized') return;
+            selectEl.append($('<option></option>').val(wsType.title).text(wsType.title));
+        });
+        selectEl.val(workstationTypeFilter);
     }
 
     function populateWorkstationSidebar(workstations) {
@@ -473,8 +628,105 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
         return colors[status] || '#34495e';
     }
 
+    function toggleJobCardSelection(event, el) {
+        if (selectedJobCards.has(event.id)) {
+            selectedJobCards.delete(event.id);
+            el.classList.remove('job-card-selected');
+            el.style.outline = '';
+        } else {
+            selectedJobCards.add(event.id);
+            el.classList.add('job-card-selected');
+            el.style.outline = '2px dashed #2c3e50';
+        }
+    }
+
+    function clearJobCardSelection() {
+        selectedJobCards.clear();
+        $('.job-card-selected').css('outline', '').removeClass('job-card-selected');
+    }
+
+    // Shift every selected Job Card by the drag delta and save them as one validated move
+    function moveSelectedJobCards(info) {
+        const others = [];
+        selectedJobCards.forEach(id => {
+            const event = calendar.getEventById(id);
+            if (event && id !== info.event.id) {
+                others.push({ event: event, start: event.start, end: event.end });
+            }
+        });
+        calendar.batchRendering(() => {
+            others.forEach(row => row.event.moveDates(info.delta));
+        });
+
+        const events = [info.event].concat(others.map(row => row.event));
+        const moves = events.map(event => ({
+            name: event.id,
+            new_start: event.startStr,
+            new_end: event.endStr,
+            modified: event.extendedProps.modified
+        }));
+        const revert = () => {
+            calendar.batchRendering(() => {
+                others.forEach(row => row.event.setDates(row.start, row.end));
+            });
+            info.revert();
+        };
+
+        frappe.call({
+            method: 'kk_new_app.api.work_order_scheduler.move_job_cards',
+            args: { moves: moves },
+            callback: (r) => {
+                if (r.message.conflicts) {
+                    revert();
+                    applyJobCardConflicts(r.message.conflicts);
+                    return;
+                }
+                events.forEach(event => event.setExtendedProp('modified', r.message.modified));
+                frappe.show_alert({
+                    message: `${moves.length} operations rescheduled`,
+                    indicator: 'green'
+                });
+            },
+            error: (error) => {
+                frappe.msgprint("Rescheduling failed: " + (error.message || 'Unknown error'));
+                revert();
+            }
+        });
+    }
+
+    // Someone else changed these cards since we loaded them: show where they are now
+    function applyJobCardConflicts(conflicts) {
+        calendar.batchRendering(() => {
+            conflicts.forEach(current => {
+                const event = calendar.getEventById(current.name);
+                if (event) {
+                    event.setDates(current.start, current.end);
+                    event.setExtendedProp('modified', current.modified);
+                }
+            });
+        });
+        frappe.msgprint(`${conflicts.map(current => current.name).join(', ')} changed since the calendar loaded. ` +
+            'It now shows the current schedule; please try again.');
+    }
+
+    // Single Job Card saves return a conflict instead of writing over a newer change
+    function handleJobCardSaved(info, message) {
+        if (message && message.conflict) {
+            info.revert();
+            applyJobCardConflicts([message.current]);
+            return false;
+        }
+        info.event.setExtendedProp('modified', message.modified);
+        return true;
+    }
+
     function handleEventDrop(info) {
         const isOperation = info.event.extendedProps.type === 'operation';
+
+        if (isOperation && selectedJobCards.has(info.event.id) && selectedJobCards.size > 1) {
+            moveSelectedJobCards(info);
+            return;
+        }
         
         console.log('Drag attempted:', {
             isOperation: isOperation,
@@ -487,16 +739,20 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
             'kk_new_app.api.work_order_scheduler.update_job_card_schedule' :
             'kk_new_app.api.work_order_scheduler.update_work_order_schedule';
         
-        frappe.call({
+        const save = () => frappe.call({
             method: method,
             args: {
                 name: info.event.id,
                 new_start: info.event.startStr,
-                new_end: info.event.endStr
+                new_end: info.event.endStr,
+                modified: isOperation ? info.event.extendedProps.modified : undefined
             },
-            callback: () => {
+            callback: (r) => {
+                if (isOperation && !handleJobCardSaved(info, r.message)) {
+                    return;
+                }
                 frappe.show_alert({
-                    message: `${isOperation ? 'Operation' : 'Work Order'} rescheduled successfully`,
+                    message: isOperation ? 'Operation rescheduled successfully' : 'Work Order rescheduled; following orders update shortly',
                     indicator: 'green'
                 });
             },
@@ -506,6 +762,12 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
                 info.revert();
             }
         });
+
+        if (isOperation) {
+            save();
+        } else {
+            previewWorkOrderCascade(info, save);
+        }
     }
 
     function handleEventResize(info) {
@@ -514,16 +776,20 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
             'kk_new_app.api.work_order_scheduler.update_job_card_schedule' :
             'kk_new_app.api.work_order_scheduler.update_work_order_schedule';
 
-        frappe.call({
+        const save = () => frappe.call({
             method: method,
             args: {
                 name: info.event.id,
                 new_start: info.event.startStr,
-                new_end: info.event.endStr
+                new_end: info.event.endStr,
+                modified: isOperation ? info.event.extendedProps.modified : undefined
             },
-            callback: () => {
+            callback: (r) => {
+                if (isOperation && !handleJobCardSaved(info, r.message)) {
+                    return;
+                }
                 frappe.show_alert({
-                    message: `${isOperation ? 'Operation' : 'Work Order'} duration updated`,
+                    message: isOperation ? 'Operation duration updated' : 'Work Order duration updated; following orders update shortly',
                     indicator: 'green'
                 });
             },
@@ -532,6 +798,53 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
                 info.revert();
             }
         });
+
+        if (isOperation) {
+            save();
+        } else {
+            previewWorkOrderCascade(info, save);
+        }
+    }
+
+    // Dry-run the cascade first so the planner sees which Work Orders would move
+    function previewWorkOrderCascade(info, save) {
+        frappe.call({
+            method: 'kk_new_app.api.work_order_scheduler.update_work_order_schedule',
+            args: {
+                name: info.event.id,
+                new_start: info.event.startStr,
+                new_end: info.event.endStr,
+                dry_run: 1
+            },
+            callback: (r) => {
+                const affected = (r.message && r.message.affected) || [];
+                if (!affected.length) {
+                    save();
+                    return;
+                }
+
+                const rows = affected.slice(0, 15).map(move => `
+                    <tr>
+                        <td>${move.name}</td>
+                        <td>${frappe.datetime.str_to_user(move.old_start)}</td>
+                        <td>${frappe.datetime.str_to_user(move.start)}</td>
+                    </tr>
+                `).join('');
+                const more = affected.length > 15 ? `<div>... and ${affected.length - 15} more</div>` : '';
+
+                frappe.confirm(`
+                    <div style="margin-bottom: 10px;">
+                        This move shifts <b>${affected.length}</b> following Work Order(s):
+                    </div>
+                    <table class="table table-condensed" style="font-size: 12px;">
+                        <thead><tr><th>Work Order</th><th>Current Start</th><th>New Start</th></tr></thead>
+                        <tbody>${rows}</tbody>
+                    </table>
+                    ${more}
+                `, save, () => info.revert());
+            },
+            error: () => info.revert()
+        });
     }
 
     // Event handlers
@@ -553,6 +866,16 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
         showUtilizationDialog();
     });
 
+    $('#bulk-schedule-btn').on('click', function() {
+        showBulkScheduleDialog();
+    });
+
+    $('#undo-schedule-btn').on('click', function() {
+        if (lastScheduleSnapshot) {
+            restoreScheduleSnapshot(lastScheduleSnapshot);
+        }
+    });
+
     $('#zoom-in').on('click', () => {
         zoomLevel = Math.min(5.0, zoomLevel * 1.4);
         applyZoom();
@@ -572,6 +895,13 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
         frappe.show_alert('Calendar refreshed');
     });
 
+    $('#workstation-type-filter').on('change', function() {
+        workstationTypeFilter = this.value;
+        if (calendar) {
+            calendar.refetchEvents();
+        }
+    });
+
     $('#jump-to-date').on('change', function() {
         if (calendar && this.value) {
             calendar.gotoDate(this.value);
@@ -587,6 +917,101 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
         calendar.refetchEvents();
     }
 
+    function showBulkScheduleDialog() {
+        const dialog = new frappe.ui.Dialog({
+            title: 'Auto Schedule Backlog',
+            fields: [
+                {
+                    fieldtype: 'Select',
+                    fieldname: 'order_by',
+                    label: 'Scheduling Order',
+                    options: [
+                        { value: 'delivery_date', label: 'Earliest Delivery Date' },
+                        { value: 'creation', label: 'First Created' },
+                        { value: 'shortest_lead_time', label: 'Shortest Lead Time' }
+                    ],
+                    default: 'delivery_date'
+                },
+                {
+                    fieldtype: 'Check',
+                    fieldname: 'schedule_late',
+                    label: 'Also schedule orders that will miss their delivery date'
+                }
+            ],
+            primary_action_label: 'Start',
+            primary_action: function(values) {
+                frappe.call({
+                    method: 'kk_new_app.api.bulk_scheduler.enqueue_bulk_auto_schedule',
+                    args: values,
+                    callback: () => {
+                        dialog.hide();
+                        frappe.show_alert('Backlog scheduling started in the background');
+                    }
+                });
+            }
+        });
+        dialog.show();
+    }
+
+    function rememberScheduleSnapshot(snapshot) {
+        if (!snapshot) return;
+        lastScheduleSnapshot = snapshot;
+        $('#undo-schedule-btn').show();
+    }
+
+    function restoreScheduleSnapshot(snapshot) {
+        frappe.confirm('Put back the schedule from before the last reschedule?', () => {
+            frappe.call({
+                method: 'kk_new_app.api.schedule_snapshots.restore_schedule_snapshot',
+                args: { snapshot: snapshot },
+                callback: (r) => {
+                    lastScheduleSnapshot = null;
+                    $('#undo-schedule-btn').hide();
+                    frappe.show_alert({ message: `Restored ${r.message.restored} row(s)`, indicator: 'green' });
+                    if (calendar) calendar.refetchEvents();
+                }
+            });
+        });
+    }
+
+    // A background cascade of Work Order moves landed; the events arrive via kk_schedule_update
+    function handleCascadeDone(message) {
+        rememberScheduleSnapshot(message.snapshot);
+        frappe.show_alert({
+            message: message.moved ?
+                `Moved ${message.moved} following Work Order(s) after ${message.work_orders.join(', ')}` :
+                'No following Work Orders needed to move',
+            indicator: 'blue'
+        });
+    }
+
+    function showBulkScheduleReport(report) {
+        const misses = report.deadline_misses || [];
+        let message = `Scheduled <b>${report.scheduled}</b> of <b>${report.total}</b> Work Orders.`;
+
+        if (misses.length) {
+            const rows = misses.slice(0, 20).map(miss => `
+                <tr>
+                    <td>${miss.work_order}</td>
+                    <td>${frappe.datetime.str_to_user(miss.deadline)}</td>
+                    <td>${Math.round(miss.late_by_minutes / 60)}h</td>
+                    <td>${miss.scheduled ? 'Yes' : 'No'}</td>
+                </tr>
+            `).join('');
+            message += `
+                <div style="margin-top: 10px;"><b>${misses.length}</b> deadline miss(es):</div>
+                <table class="table table-condensed" style="font-size: 12px;">
+                    <thead><tr><th>Work Order</th><th>Deadline</th><th>Late By</th><th>Scheduled</th></tr></thead>
+                    <tbody>${rows}</tbody>
+                </table>
+            `;
+        }
+
+        rememberScheduleSnapshot(report.snapshot);
+        frappe.msgprint({ title: 'Backlog Scheduling Finished', message: message, indicator: misses.length ? 'orange' : 'green' });
+        if (calendar) calendar.refetchEvents();
+    }
+
     function showUtilizationDialog() {
         const start = calendar.view.activeStart;
         const end = calendar.view.activeEnd;
@@ -629,8 +1054,9 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
                 r.message.forEach(row => {
                     const totalHours = (row.total_minutes / 60).toFixed(1);
                     const avgDuration = (row.avg_duration || 0).toFixed(0);
-                    const completionRate = ((row.completed_jobs / row.total_jobs) * 100).toFixed(1);
-                    const utilization = Math.min(100, (row.total_minutes / (8 * 60)) * 100).toFixed(1); // Assuming 8hr workday
+                    const completionRate = (row.total_jobs ? (row.completed_jobs / row.total_jobs) * 100 : 0).toFixed(1);
+                    // Booked minutes over the whole window, clipped at its edges by the server
+                    const utilization = Math.min(100, row.utilization || 0).toFixed(1);
                     
                     html += `
                         <tr>
@@ -658,19 +1084,78 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
         });
     }
 
-    // Auto-refresh
-    function startAutoRefresh() {
-        refreshInterval = setInterval(() => {
-            if (currentView === 'work_orders') {
-                loadWorkOrderView();
-            } else if (currentView === 'operations') {
-                loadOperationsView();
+    // Realtime updates pushed by the server's Work Order / Job Card doc events
+    function handleScheduleMessage(message) {
+        if (!calendar || !message) return;
+
+        const kind = currentView === 'operations' ? 'operations' : 'work_orders';
+        if (message.kind !== kind) return;
+
+        // Events pushed for other windows/filters are dropped if we happen to show them
+        const upserts = [];
+        const removed = [...(message.removed || [])];
+        (message.upserts || []).forEach(data => {
+            if (isEventVisible(data)) {
+                upserts.push(data);
+            } else {
+                removed.push(data.id);
             }
-        }, 2000);
+        });
+        applyScheduleChanges({ upserts: upserts, removed: removed });
+    }
+
+    function isEventVisible(data) {
+        if (!data || !data.start || !data.end) return false;
+        if (workstationTypeFilter && data.extendedProps &&
+            data.extendedProps.workstation_type !== workstationTypeFilter) {
+            return false;
+        }
+
+        const start = frappe.datetime.str_to_obj(data.start);
+        const end = frappe.datetime.str_to_obj(data.end);
+        return start < calendar.view.activeEnd && end > calendar.view.activeStart;
+    }
+
+    function setupRealtimeUpdates() {
+        frappe.realtime.on('kk_schedule_update', handleScheduleMessage);
+        frappe.realtime.on('kk_bulk_auto_schedule', showBulkScheduleReport);
+        frappe.realtime.on('kk_work_order_cascade', handleCascadeDone);
+
+        const socket = frappe.realtime.socket;
+        if (!socket) {
+            startAutoRefresh();
+            return;
+        }
+
+        // Slow polling only while the socket is down; catch up once it is back
+        socket.on('disconnect', startAutoRefresh);
+        socket.on('connect', () => {
+            stopAutoRefresh();
+            syncScheduleChanges();
+        });
+        if (!socket.connected) {
+            startAutoRefresh();
+        }
+    }
+
+    // Fallback polling: incremental sync instead of re-downloading every event
+    function startAutoRefresh() {
+        if (refreshInterval) return;
+        refreshInterval = setInterval(syncScheduleChanges, 30000);
+    }
+
+    function stopAutoRefresh() {
+        if (refreshInterval) {
+            clearInterval(refreshInterval);
+            refreshInterval = null;
+        }
     }
 
     // Keyboard shortcuts
     $(document).on('keydown', function(e) {
+        if (e.key === 'Escape' && selectedJobCards.size) {
+            clearJobCardSelection();
+        }
         if (e.ctrlKey) {
             switch(e.key) {
                 case '1':
@@ -691,14 +1176,17 @@ frappe.pages['work_order_calendar'].on_page_load = async function (wrapper) {
 
     // Initialize
     initializeCalendar('work_orders');
-    startAutoRefresh();
+    setupRealtimeUpdates();
     
     // Set today's date in jump-to-date
     $('#jump-to-date').val(new Date().toISOString().split('T')[0]);
 
     // Cleanup
     $(window).on('beforeunload', () => {
-        if (refreshInterval) clearInterval(refreshInterval);
+        stopAutoRefresh();
+        frappe.realtime.off('kk_schedule_update', handleScheduleMessage);
+        frappe.realtime.off('kk_bulk_auto_schedule', showBulkScheduleReport);
+        frappe.realtime.off('kk_work_order_cascade', handleCascadeDone);
     });
 };
 
@@ -65,7 +65,8 @@ frappe.ui.form.on('Work Order', {
         }
 
         // Show Job Cards section if they exist
-        if (frm.doc.name) {
+        frm.kk_dashboard = null;
+        if (frm.doc.name && !frm.doc.__islocal) {
             refresh_job_cards_view(frm);
         }
 
@@ -117,42 +118,32 @@ function update_scheduling_indicator(frm) {
         frm.dashboard.add_indicator(__('⏱️ Not Scheduled'), 'orange');
     }
     
-    // Show job cards count if any exist
-    if (frm.doc.name) {
-        frappe.call({
-            method: 'frappe.client.get_count',
-            args: {
-                doctype: 'Job Card',
-                filters: { work_order: frm.doc.name }
-            },
-            callback: function(r) {
-                if (r.message > 0) {
-                    frm.dashboard.add_indicator(__(`🔧 ${r.message} Job Cards`), 'blue');
-                }
-            }
-        });
+    // Job card count and server-side risks come with the dashboard call
+    const dashboard = frm.kk_dashboard;
+    if (dashboard) {
+        if (dashboard.job_cards.length > 0) {
+            frm.dashboard.add_indicator(__(`🔧 ${dashboard.job_cards.length} Job Cards`), 'blue');
+        }
+        dashboard.risks
+            // The planned end check above already follows unsaved edits
+            .filter(risk => risk.flag !== 'planned_after_delivery')
+            .forEach(risk => frm.dashboard.add_indicator(__(`⚠️ ${risk.message}`), risk.severity));
     }
 }
 
 function refresh_job_cards_view(frm) {
-    // Get job cards for this work order
+    // One cached call returns the job cards, counts, workstation load and risks
     frappe.call({
-        method: 'frappe.client.get_list',
+        method: 'kk_new_app.api.work_order_scheduler.get_work_order_dashboard',
         args: {
-            doctype: 'Job Card',
-            filters: {
-                work_order: frm.doc.name
-            },
-            fields: [
-                'name', 'operation', 'workstation', 'status', 
-                'expected_start_date', 'expected_end_date',
-                'actual_start_date', 'actual_end_date',
-                'total_completed_qty', 'for_quantity', 'sequence_id'
-            ],
-            order_by: 'sequence_id asc, operation_id asc'
+            work_order: frm.doc.name,
+            modified: frm.doc.modified
         },
         callback: function(r) {
-            if (r.message && r.message.length > 0) {
+            frm.kk_dashboard = r.message;
+            update_scheduling_indicator(frm);
+
+            if (r.message.job_cards.length > 0) {
                 render_job_cards_section(frm, r.message);
             } else if (frm.job_cards_wrapper) {
                 frm.job_cards_wrapper.remove();
@@ -161,7 +152,9 @@ function refresh_job_cards_view(frm) {
     });
 }
 
-function render_job_cards_section(frm, job_cards) {
+function render_job_cards_section(frm, dashboard) {
+    const job_cards = dashboard.job_cards;
+
     // Remove existing section if any
     if (frm.job_cards_wrapper) {
         frm.job_cards_wrapper.remove();
@@ -192,6 +185,34 @@ function render_job_cards_section(frm, job_cards) {
 
     // Render timeline
     render_job_cards_timeline(frm.job_cards_wrapper.find('.job-cards-timeline'), job_cards);
+    render_workstation_load(frm.job_cards_wrapper.find('.job-cards-timeline'), dashboard);
+}
+
+function render_workstation_load(container, dashboard) {
+    if (!dashboard.workstation_load.length) {
+        return;
+    }
+
+    let html = `
+        <div style="margin-top: 15px; font-size: 12px;">
+            <strong>Workstation load</strong>
+            (${frappe.datetime.str_to_user(dashboard.scheduled_span.start)} - ${frappe.datetime.str_to_user(dashboard.scheduled_span.end)})
+    `;
+    dashboard.workstation_load.forEach(row => {
+        const load = Math.min(row.utilization, 100);
+        html += `
+            <div style="display: grid; grid-template-columns: 200px 1fr 60px; gap: 10px; align-items: center; margin-top: 6px;">
+                <div>${row.workstation_name || row.workstation}</div>
+                <div class="progress" style="height: 10px; background: #e9ecef; border-radius: 5px; overflow: hidden;">
+                    <div style="width: ${load}%; background: ${getProgressColor(100 - load)}; height: 100%;"></div>
+                </div>
+                <div style="text-align: right;">${row.utilization}%</div>
+            </div>
+        `;
+    });
+    html += '</div>';
+
+    container.append(html);
 }
 
 function render_job_cards_timeline(container, job_cards) {
@@ -360,48 +381,51 @@ frappe.ui.form.on('Job Card', {
 });
 
 function check_workstation_availability(frm) {
+    // The server reads only the bookings around this interval and returns the conflicts
     frappe.call({
-        method: 'frappe.client.get_list',
+        method: 'kk_new_app.api.work_order_scheduler.check_workstation_availability',
         args: {
-            doctype: 'Job Card',
-            filters: {
-                workstation: frm.doc.workstation,
-                name: ['!=', frm.doc.name],
-                docstatus: ['<', 2]
-            },
-            fields: ['name', 'operation', 'expected_start_date', 'expected_end_date', 'work_order'],
-            order_by: 'expected_start_date asc'
+            workstation: frm.doc.workstation,
+            start: frm.doc.expected_start_date,
+            end: frm.doc.expected_end_date,
+            job_card: frm.doc.name
         },
         callback: function(r) {
-            const overlapping = [];
-            const my_start = new Date(frm.doc.expected_start_date);
-            const my_end = new Date(frm.doc.expected_end_date);
-
-            r.message.forEach(jc => {
-                if (jc.expected_start_date && jc.expected_end_date) {
-                    const other_start = new Date(jc.expected_start_date);
-                    const other_end = new Date(jc.expected_end_date);
-
-                    // Check for overlap
-                    if ((my_start < other_end && my_end > other_start)) {
-                        overlapping.push(jc);
-                    }
-                }
-            });
+            const result = r.message;
+            if (!result || result.reason) {
+                // Start/end are mid-edit; check again once both are set
+                return;
+            }
 
-            if (overlapping.length > 0) {
+            if (!result.available) {
                 let message = `<div style="color: #e74c3c;"><b>⚠️ Workstation Conflict Detected!</b></div><br>`;
-                message += `This job card overlaps with <b>${overlapping.length}</b> other job card(s) on workstation <b>${frm.doc.workstation}</b>:<br><br>`;
-                overlapping.forEach(jc => {
+                message += `This job card overlaps with <b>${result.conflicts.length}</b> other job card(s) on workstation <b>${frm.doc.workstation}</b>:<br><br>`;
+                result.conflicts.forEach(jc => {
                     message += `• <b>${jc.operation}</b> (${jc.name})<br>`;
-                    message += `&nbsp;&nbsp;${frappe.datetime.str_to_user(jc.expected_start_date)} - ${frappe.datetime.str_to_user(jc.expected_end_date)}<br>`;
+                    message += `&nbsp;&nbsp;${frappe.datetime.str_to_user(jc.start)} - ${frappe.datetime.str_to_user(jc.end)}<br>`;
                     message += `&nbsp;&nbsp;Work Order: ${jc.work_order}<br><br>`;
                 });
-                
+
+                const slots = [['Earlier free slot', result.previous_slot], ['Next free slot', result.next_slot]]
+                    .filter(([_label, slot]) => slot);
+                slots.forEach(([label, slot]) => {
+                    message += `${label}: <b>${frappe.datetime.str_to_user(slot.start)} - ${frappe.datetime.str_to_user(slot.end)}</b><br>`;
+                });
+
                 frappe.msgprint({
                     title: 'Scheduling Conflict',
                     message: message,
-                    indicator: 'red'
+                    indicator: 'red',
+                    primary_action: result.next_slot && {
+                        label: 'Use Next Free Slot',
+                        action: () => {
+                            frm.set_value({
+                                expected_start_date: result.next_slot.start,
+                                expected_end_date: result.next_slot.end
+                            });
+                            frappe.hide_msgprint();
+                        }
+                    }
                 });
             } else {
                 frappe.show_alert({
@@ -447,9 +471,16 @@ function quick_reschedule_dialog(frm) {
                     name: frm.doc.name,
                     new_start: values.new_start,
                     new_end: values.new_end,
-                    new_workstation: values.new_workstation
+                    new_workstation: values.new_workstation,
+                    modified: frm.doc.modified
                 },
                 callback: function(r) {
+                    if (r.message && r.message.conflict) {
+                        frappe.msgprint('This Job Card was changed by someone else. Reloaded the latest version; please try again.');
+                        frm.reload_doc();
+                        dialog.hide();
+                        return;
+                    }
                     frappe.show_alert('Job Card rescheduled successfully!');
                     frm.reload_doc();
                     dialog.hide();
@@ -0,0 +1,25 @@
+import frappe
+
+# Equality/range columns first, then the remaining filtered columns so MariaDB can
+# check them from the index. docstatus is always filtered with "< 2", a range, so it
+# goes after the datetime range columns instead of in front of them.
+SCHEDULER_INDEXES = {
+    "Job Card": [
+        # Per-workstation timeline loads and overlap checks (covers the selected columns)
+        ("kk_jc_workstation_schedule",
+            ["workstation", "expected_start_date", "expected_end_date", "docstatus", "operation"]),
+        # Calendar window reads: expected_start_date < window end AND expected_end_date > window start
+        ("kk_jc_schedule_window", ["expected_start_date", "expected_end_date", "docstatus"]),
+        # Job cards of a work order in routing order
+        ("kk_jc_work_order_sequence", ["work_order", "sequence_id", "docstatus"]),
+    ],
+    "Work Order": [
+        # Calendar window reads, cascades and gap searches ordered by planned start
+        ("kk_wo_planned_schedule", ["planned_start_date", "planned_end_date", "docstatus"]),
+    ],
+}
+
+def execute():
+    for doctype, indexes in SCHEDULER_INDEXES.items():
+        for index_name, fields in indexes:
+            frappe.db.add_index(doctype, fields, index_name=index_name)
@@ -0,0 +1,5 @@
+from kk_new_app.api.workstation_load import rebuild_workstation_load
+
+def execute():
+    # Job Card doc events keep the table current from here on
+    rebuild_workstation_load()
@@ -0,0 +1,94 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from kk_new_app.api.availability import (
+    CLOSED,
+    FREE,
+    HORIZON_DAYS,
+    HORIZON_MINUTES,
+    compile_working_mask,
+    get_availability,
+    get_horizon_start,
+)
+from kk_new_app.api.workstation_timeline import WorkstationTimeline
+
+HORIZON = datetime(2024, 12, 30)
+EDGE = HORIZON + timedelta(days=HORIZON_DAYS)
+DAY_SHIFT = [(timedelta(hours=8), timedelta(hours=16))]
+
+def hours(value):
+    return timedelta(hours=value)
+
+def availability(intervals=(), working_hours=(), not_before=HORIZON):
+    return get_availability(WorkstationTimeline(intervals), not_before, working_hours)
+
+class TestHorizons(unittest.TestCase):
+    def test_horizon_start_is_aligned(self):
+        self.assertEqual(get_horizon_start(datetime(2025, 1, 6, 9, 30)), HORIZON)
+        self.assertEqual(get_horizon_start(HORIZON), HORIZON)
+        self.assertEqual(get_horizon_start(EDGE - timedelta(minutes=1)), HORIZON)
+        self.assertEqual(get_horizon_start(EDGE), EDGE)
+
+    def test_working_mask_follows_shifts_and_holidays(self):
+        bits = compile_working_mask(DAY_SHIFT, {HORIZON.date() + timedelta(days=1)}, HORIZON)
+        self.assertEqual(len(bits), HORIZON_MINUTES)
+        self.assertEqual(bits[:8 * 60], CLOSED * 8 * 60)
+        self.assertEqual(bits[8 * 60:16 * 60], FREE * 8 * 60)
+        self.assertEqual(bits[16 * 60:48 * 60], CLOSED * 32 * 60)
+        self.assertEqual(bits[56 * 60:64 * 60], FREE * 8 * 60)
+
+    def test_overnight_shift_carries_into_the_first_day(self):
+        bits = compile_working_mask([(timedelta(hours=22), timedelta(hours=6))], set(), HORIZON)
+        self.assertEqual(bits[:6 * 60], FREE * 6 * 60)
+        self.assertEqual(bits[6 * 60:22 * 60], CLOSED * 16 * 60)
+
+class TestAvailabilityMap(unittest.TestCase):
+    def setUp(self):
+        # Working masks are compiled straight away instead of going through Redis
+        patcher = patch("kk_new_app.api.availability.get_working_mask",
+            lambda working_hours, holiday_list, horizon_start: compile_working_mask(working_hours, set(), horizon_start))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_first_free_slot_skips_closed_hours(self):
+        slots = availability(working_hours=DAY_SHIFT)
+        self.assertEqual(slots.first_free_slot(HORIZON, 60), HORIZON + hours(8))
+        self.assertEqual(slots.first_free_slot(HORIZON + hours(15), 120), HORIZON + hours(32))
+
+    def test_back_to_back_booking_leaves_its_end_free(self):
+        slots = availability([(HORIZON + hours(8), HORIZON + hours(10), "JC-1", None)], DAY_SHIFT)
+        self.assertEqual(slots.first_free_slot(HORIZON, 60), HORIZON + hours(10))
+
+    def test_partly_booked_minutes_count_as_booked(self):
+        slots = availability([(HORIZON, HORIZON + timedelta(minutes=10, seconds=30), "JC-1", None)])
+        self.assertEqual(slots.first_free_slot(HORIZON, 1), HORIZON + timedelta(minutes=11))
+
+    def test_free_run_across_the_horizon_edge(self):
+        slots = availability([(HORIZON, EDGE - hours(1), "JC-1", None)])
+        self.assertEqual(slots.first_free_slot(HORIZON, 120), EDGE - hours(1))
+        self.assertEqual(len(slots.bits), 2 * HORIZON_MINUTES)
+
+    def test_booking_across_the_horizon_edge_closes_both_horizons(self):
+        slots = availability([(EDGE - hours(1), EDGE + hours(1), "JC-1", None)], not_before=EDGE - hours(3))
+        self.assertEqual(slots.first_free_slot(EDGE - hours(3), 120), EDGE - hours(3))
+        self.assertEqual(slots.first_free_slot(EDGE - hours(2), 120), EDGE + hours(1))
+
+    def test_reserve_across_the_edge_applies_to_the_next_horizon(self):
+        slots = availability()
+        slots.first_free_slot(HORIZON, 60)
+        self.assertEqual(len(slots.bits), HORIZON_MINUTES)
+
+        slots.reserve(EDGE - timedelta(minutes=30), EDGE + timedelta(minutes=30))
+        self.assertEqual(slots.first_free_slot(EDGE - timedelta(minutes=30), 60), EDGE + timedelta(minutes=30))
+        self.assertEqual(slots.bits[HORIZON_MINUTES:HORIZON_MINUTES + 30], CLOSED * 30)
+
+    def test_no_slot_within_max_horizons(self):
+        slots = availability([(HORIZON, EDGE + timedelta(days=HORIZON_DAYS), "JC-1", None)])
+        self.assertIsNone(slots.first_free_slot(HORIZON, 60, max_horizons=2))
+        self.assertEqual(slots.first_free_slot(HORIZON, 60, max_horizons=3), EDGE + timedelta(days=HORIZON_DAYS))
+
+    def test_last_free_slot(self):
+        slots = availability([(HORIZON + hours(14), HORIZON + hours(16), "JC-1", None)], DAY_SHIFT)
+        self.assertEqual(slots.last_free_slot(HORIZON + hours(20), 60), HORIZON + hours(13))
+        self.assertIsNone(slots.last_free_slot(HORIZON + hours(20), 60, not_before=HORIZON + hours(13.5)))
@@ -0,0 +1,55 @@
+import unittest
+from datetime import datetime, timedelta
+
+from kk_new_app.api.conflict_scanner import sweep_conflicts
+
+def at(hour, minute=0):
+    return datetime(2025, 1, 6) + timedelta(hours=hour, minutes=minute)
+
+def pairs(rows):
+    return [(pair["job_card"], pair["other_job_card"], pair["overlap_minutes"]) for pair in sweep_conflicts(rows)]
+
+class TestSweepConflicts(unittest.TestCase):
+    def test_back_to_back_cards_do_not_conflict(self):
+        rows = [
+            ("WS-1", "JC-1", "Cut", at(8), at(10)),
+            ("WS-1", "JC-2", "Cut", at(10), at(11)),
+            ("WS-1", "JC-3", "Cut", at(11), at(12)),
+        ]
+        self.assertEqual(pairs(rows), [])
+
+    def test_long_card_stays_running_after_shorter_ones_are_evicted(self):
+        rows = [
+            ("WS-1", "JC-1", "Cut", at(8), at(16)),
+            ("WS-1", "JC-2", "Cut", at(9), at(10)),
+            ("WS-1", "JC-3", "Cut", at(10), at(11)),
+            ("WS-1", "JC-4", "Cut", at(12), at(12, 30)),
+        ]
+        self.assertEqual(pairs(rows), [("JC-1", "JC-2", 60), ("JC-1", "JC-3", 60), ("JC-1", "JC-4", 30)])
+
+    def test_overlap_ends_at_the_earlier_end(self):
+        rows = [
+            ("WS-1", "JC-1", "Cut", at(8), at(10)),
+            ("WS-1", "JC-2", "Paint", at(9, 30), at(11)),
+        ]
+        [pair] = sweep_conflicts(rows)
+        self.assertEqual(pair["workstation"], "WS-1")
+        self.assertEqual((pair["operation"], pair["other_operation"]), ("Cut", "Paint"))
+        self.assertEqual((pair["overlap_start"], pair["overlap_end"]), (at(9, 30), at(10)))
+
+    def test_cards_of_other_workstations_never_conflict(self):
+        rows = [
+            ("WS-1", "JC-1", "Cut", at(8), at(12)),
+            ("WS-2", "JC-2", "Cut", at(9), at(10)),
+        ]
+        self.assertEqual(pairs(rows), [])
+
+    def test_zero_length_cards_are_counted_but_never_conflict(self):
+        summary = {}
+        rows = [
+            ("WS-1", "JC-1", "Cut", at(8), at(12)),
+            ("WS-1", "JC-2", "Cut", at(9), at(9)),
+            ("WS-1", "JC-3", "Cut", at(9), at(10)),
+        ]
+        self.assertEqual([pair["other_job_card"] for pair in sweep_conflicts(rows, summary)], ["JC-3"])
+        self.assertEqual(summary, {"job_cards": 3})
@@ -0,0 +1,46 @@
+import unittest
+from datetime import datetime, timedelta
+
+from kk_new_app.api.work_order_scheduler import cascade_bookings
+
+def at(hour, minute=0):
+    return datetime(2025, 1, 6) + timedelta(hours=hour, minutes=minute)
+
+def moved(moves):
+    return {move["name"]: (move["start"], move["end"]) for move in moves}
+
+class TestCascadeBookings(unittest.TestCase):
+    def test_followers_shift_in_start_order(self):
+        moves = cascade_bookings({"WO-1": (at(10), at(12))}, [
+            ("WO-3", at(13), at(14)),
+            ("WO-2", at(11), at(13)),
+            ("WO-4", at(16), at(17)),
+        ])
+        self.assertEqual([move["name"] for move in moves], ["WO-2", "WO-3"])
+        self.assertEqual(moved(moves), {"WO-2": (at(12), at(14)), "WO-3": (at(14), at(15))})
+        self.assertEqual((moves[0]["old_start"], moves[0]["old_end"]), (at(11), at(13)))
+
+    def test_back_to_back_orders_stay(self):
+        moves = cascade_bookings({"WO-1": (at(10), at(12))}, [
+            ("WO-2", at(12), at(13)),
+            ("WO-3", at(13), at(14)),
+        ])
+        self.assertEqual(moves, [])
+
+    def test_pinned_order_goes_first_on_equal_start(self):
+        moves = cascade_bookings({"WO-9": (at(10), at(11))}, [("WO-1", at(10), at(12))])
+        self.assertEqual(moved(moves), {"WO-1": (at(11), at(13))})
+
+    def test_shifted_order_jumps_past_a_later_pinned_order(self):
+        moves = cascade_bookings({"WO-1": (at(10), at(12)), "WO-5": (at(14), at(16))}, [
+            ("WO-2", at(11), at(14)),
+            ("WO-3", at(14, 30), at(15)),
+        ])
+        # WO-2 would cover WO-5 at 12-15, so it goes after it; WO-3 follows WO-2
+        self.assertEqual(moved(moves), {"WO-2": (at(16), at(19)), "WO-3": (at(19), at(19, 30))})
+
+    def test_shifted_order_fitting_before_a_later_pinned_order_stays_there(self):
+        moves = cascade_bookings({"WO-1": (at(10), at(12)), "WO-5": (at(14), at(16))}, [
+            ("WO-2", at(11), at(13)),
+        ])
+        self.assertEqual(moved(moves), {"WO-2": (at(12), at(14))})
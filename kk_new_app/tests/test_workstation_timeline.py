@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timedelta
+
+from kk_new_app.api.workstation_timeline import WorkstationTimeline
+
+def at(hour, minute=0):
+    return datetime(2025, 1, 6) + timedelta(hours=hour, minutes=minute)
+
+def hours(value):
+    return timedelta(hours=value)
+
+class TestWorkstationTimeline(unittest.TestCase):
+    def setUp(self):
+        # Busy 08-10 and 12-13, free 10-12 and from 13 on
+        self.timeline = WorkstationTimeline([
+            (at(12), at(13), "JC-2", "Paint"),
+            (at(8), at(10), "JC-1", "Cut"),
+        ])
+
+    def test_first_free_slot(self):
+        self.assertEqual(self.timeline.first_free_slot(at(7), hours(1)), at(7))
+        self.assertEqual(self.timeline.first_free_slot(at(7), hours(2)), at(10))
+        self.assertEqual(self.timeline.first_free_slot(at(9), hours(2)), at(10))
+        self.assertEqual(self.timeline.first_free_slot(at(9), hours(3)), at(13))
+        self.assertEqual(self.timeline.first_free_slot(at(11), hours(1)), at(11))
+
+    def test_back_to_back_bookings_merge_into_one_block(self):
+        timeline = WorkstationTimeline([
+            (at(8), at(10), "JC-1", None),
+            (at(10), at(11), "JC-2", None),
+        ])
+        self.assertEqual(timeline.gap_starts, [datetime.min, at(11)])
+        self.assertEqual(timeline.gap_ends, [at(8), datetime.max])
+
+    def test_overlaps_ignore_bookings_ending_exactly_at_start(self):
+        self.assertEqual(self.timeline.overlaps(at(10), at(12)), [])
+        self.assertEqual([row[2] for row in self.timeline.overlaps(at(9, 59), at(12, 1))], ["JC-1", "JC-2"])
+        self.assertEqual([row[2] for row in self.timeline.overlaps(at(9), at(12), exclude="JC-1")], [])
+
+    def test_overlaps_find_a_long_booking_behind_short_ones(self):
+        timeline = WorkstationTimeline([(at(0), at(20), "LONG", None)]
+            + [(at(hour), at(hour, 30), f"JC-{hour}", None) for hour in range(1, 10)])
+        self.assertEqual([row[2] for row in timeline.overlaps(at(15), at(16))], ["LONG"])
+
+    def test_reserve_at_gap_start_shrinks_the_gap(self):
+        self.timeline.reserve(at(10), at(11), "JC-3")
+        self.assertEqual(self.timeline.gap_starts, [datetime.min, at(11), at(13)])
+        self.assertEqual(self.timeline.gap_ends, [at(8), at(12), datetime.max])
+        self.assertEqual(self.timeline.first_free_slot(at(7), hours(1)), at(7))
+        self.assertEqual(self.timeline.first_free_slot(at(9), hours(1)), at(11))
+        self.assertEqual(self.timeline.first_free_slot(at(9), hours(2)), at(13))
+
+    def test_reserve_at_gap_end_shrinks_the_gap(self):
+        self.timeline.reserve(at(11), at(12), "JC-3")
+        self.assertEqual(self.timeline.gap_starts, [datetime.min, at(10), at(13)])
+        self.assertEqual(self.timeline.gap_ends, [at(8), at(11), datetime.max])
+
+    def test_reserve_inside_a_gap_splits_it(self):
+        self.timeline.reserve(at(10, 30), at(11), "JC-3")
+        self.assertEqual(self.timeline.gap_starts, [datetime.min, at(10), at(11), at(13)])
+        self.assertEqual(self.timeline.gap_ends, [at(8), at(10, 30), at(12), datetime.max])
+        self.assertEqual(self.timeline.first_free_slot(at(9), hours(1)), at(11))
+
+    def test_reserve_spanning_two_gaps_rebuilds_the_blocks(self):
+        # Covers the 10-12 gap, the 12-13 booking and the start of the open gap
+        self.timeline.reserve(at(9), at(14), "JC-3")
+        self.assertEqual(self.timeline.gap_starts, [datetime.min, at(14)])
+        self.assertEqual(self.timeline.gap_ends, [at(8), datetime.max])
+        self.assertEqual(self.timeline.first_free_slot(at(9), hours(1)), at(14))
+        self.assertEqual([row[2] for row in self.timeline.overlaps(at(12, 30), at(13))], ["JC-3", "JC-2"])
+
+    def test_reserved_bookings_show_in_overlaps(self):
+        self.timeline.overlaps(at(0), at(1))
+        self.timeline.reserve(at(10), at(11), "JC-3")
+        self.assertEqual([row[2] for row in self.timeline.overlaps(at(10, 30), at(10, 45))], ["JC-3"])